@@ -1,19 +1,28 @@
-from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for
+from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for, g, Response
 from flask_cors import CORS
-import sqlite3
 import json
 from datetime import datetime, timedelta
 import os
-import requests
-from threading import Thread
 from functools import wraps
 from dotenv import load_dotenv
 import time
 import io
 import base64
-import cloudinary
-import cloudinary.uploader
-from prompt_core import run_prompt_pipeline
+import hashlib
+import hmac
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from prompt_core import run_prompt_pipeline, analyze_brand_assets, StageTimings, is_transient_llm_error
+from uploads import cloudinary_upload_bytes
+from db import pool, connection, init_db, put_blob, get_blob, hold_blobs, release_blobs, release_blob_holds
+from jobs import executor, job_handler, JobFailed, QueueFull
+from kie_poller import KiePoller
+from http_clients import session_for
+from default_assets import DefaultAsset, preload
+from changes import change_feed
+import metrics
 
 # Load environment variables
 load_dotenv()
@@ -34,27 +43,76 @@ USER_CREDENTIALS = {
     'name': 'IV Infotech Admin'
 }
 
-# Database configuration
-DATABASE = 'iv_studio.db'
-WEBHOOK_URL = 'https://n8n.srv1010073.hstgr.cloud/webhook/iv-infotech-ai-video-gen'
+# Upstream URLs can be pointed elsewhere (e.g. at `python -m fake_upstream` for offline load tests)
+WEBHOOK_URL = os.getenv('N8N_WEBHOOK_URL', 'https://n8n.srv1010073.hstgr.cloud/webhook/iv-infotech-ai-video-gen')
+
+# Callback mode (both set): the webhook only acknowledges the job and n8n POSTs the
+# result to a signed /api/projects/<id>/callback URL, so no thread waits on the render
+N8N_CALLBACK_SECRET = os.getenv('N8N_CALLBACK_SECRET', '')
+N8N_CALLBACK_BASE_URL = os.getenv('N8N_CALLBACK_BASE_URL', '').rstrip('/')
+VIDEO_CALLBACK_MODE = bool(N8N_CALLBACK_SECRET and N8N_CALLBACK_BASE_URL)
+# Read timeouts for the webhook: the acknowledgement in callback mode, the whole render otherwise
+N8N_ACK_TIMEOUT = float(os.getenv('N8N_ACK_TIMEOUT', '30'))
+N8N_WEBHOOK_TIMEOUT = float(os.getenv('N8N_WEBHOOK_TIMEOUT', '900'))
+# Projects whose callback has not arrived this long after submission are marked failed
+VIDEO_CALLBACK_TIMEOUT = float(os.getenv('VIDEO_CALLBACK_TIMEOUT', '1800'))
+VIDEO_WATCHDOG_INTERVAL = float(os.getenv('VIDEO_WATCHDOG_INTERVAL', '60'))
 
 # KIE.ai API configuration for Flux2 Pro Image-to-Image
 KIE_API_KEY = os.getenv('KIE_API_KEY')
-KIE_UPLOAD_URL = "https://kieai.redpandaai.co/api/file-stream-upload"
-KIE_CREATE_TASK_URL = "https://api.kie.ai/api/v1/jobs/createTask"
-KIE_TASK_STATUS_URL = "https://api.kie.ai/api/v1/jobs/recordInfo"
-
-# Cloudinary configuration
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+KIE_API_BASE_URL = os.getenv('KIE_API_BASE_URL', 'https://api.kie.ai').rstrip('/')
+KIE_UPLOAD_BASE_URL = os.getenv('KIE_UPLOAD_BASE_URL', 'https://kieai.redpandaai.co').rstrip('/')
+KIE_UPLOAD_URL = f"{KIE_UPLOAD_BASE_URL}/api/file-stream-upload"
+KIE_CREATE_TASK_URL = f"{KIE_API_BASE_URL}/api/v1/jobs/createTask"
+KIE_TASK_STATUS_URL = f"{KIE_API_BASE_URL}/api/v1/jobs/recordInfo"
+
+# One thread polls every outstanding KIE task for this process
+kie_poller = KiePoller(KIE_TASK_STATUS_URL, KIE_API_KEY)
 
 # Default logo and character URLs (from Cloudinary)
-DEFAULT_LOGO_URL = "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770974447/mwkdoaojy5wpwzoewyb5.png"
-DEFAULT_CHARACTER_URL = "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770972383/jyn46erxuogos2dlgmae.jpg"
+DEFAULT_LOGO_URL = os.getenv('DEFAULT_LOGO_URL', "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770974447/mwkdoaojy5wpwzoewyb5.png")
+DEFAULT_CHARACTER_URL = os.getenv('DEFAULT_CHARACTER_URL', "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770972383/jyn46erxuogos2dlgmae.jpg")
+
+# Default image bytes, fetched once and shared through the on-disk asset cache
+default_logo = DefaultAsset(DEFAULT_LOGO_URL)
+default_character = DefaultAsset(DEFAULT_CHARACTER_URL)
+
+# Columns exposed by the list endpoints (fields= must be a subset)
+PROJECT_FIELDS = [
+    'id', 'title', 'description', 'company_service', 'status', 'has_custom_character',
+    'scene_1_img', 'scene_1_vid', 'scene_2_img', 'scene_2_vid',
+    'error_message', 'webhook_response', 'created_at', 'updated_at'
+]
+INSTA_POST_FIELDS = [
+    'id', 'keyword', 'mode', 'status', 'primary_hex', 'secondary_hex', 'concept',
+    'title', 'subtitle', 'address_line', 'final_prompt', 'position', 'experience',
+    'location', 'post', 'error_message', 'generated_image_urls', 'logo_hash', 'character_hash',
+    'batch_id', 'created_at', 'updated_at'
+]
+# Default list shape: everything the cards need, none of the large text columns
+PROJECT_SUMMARY_FIELDS = [f for f in PROJECT_FIELDS if f not in ('webhook_response',)]
+INSTA_POST_SUMMARY_FIELDS = [
+    f for f in INSTA_POST_FIELDS
+    if f not in ('concept', 'final_prompt', 'logo_hash', 'character_hash')
+]
+LIST_DEFAULT_LIMIT = 20
+LIST_MAX_LIMIT = 100
+
+# Longest ?wait= accepted by /api/tasks/<id> (keep below the gunicorn worker timeout)
+TASK_MAX_WAIT = float(os.getenv('TASK_MAX_WAIT', '20'))
+TASK_WAIT_INTERVAL = 0.5
+
+# Rows accepted by one batch request, and how many of them are prompted at once
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+
+# Idle streams get a comment line this often so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+# Scrapers have no session, so /metrics takes "Authorization: Bearer <METRICS_TOKEN>" or a logged-in
+# session; METRICS_PUBLIC=1 opts out and serves it to anyone (e.g. behind a private network)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', '0') == '1'
 
 # Authentication decorator
 def login_required(f):
@@ -66,31 +124,136 @@ def login_required(f):
     return decorated_function
 
 def get_db():
-    """Get database connection"""
-    db = sqlite3.connect(DATABASE, check_same_thread=False)
-    db.row_factory = sqlite3.Row
-    return db
+    """Pooled database connection for the current request (returned at teardown)"""
+    if 'db' not in g:
+        g.db = pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Return the request's connection to the pool"""
+    db = g.pop('db', None)
+    if db is not None:
+        pool.release(db)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe the request's latency under its route pattern (not the raw path, to keep label counts bounded)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUEST_DURATION.labels(
+            request.method, route, str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+def busy_response(e: QueueFull):
+    """503 + Retry-After when the background job queue is saturated"""
+    response = jsonify({'error': 'Server is busy, please retry shortly', 'retry_after': e.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 # Helper Functions
+def sse_message(event: str, data, event_id=None) -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def not_modified(etag: str):
+    """Empty 304 when the client's If-None-Match already has etag, else None"""
+    if request.if_none_match.contains(etag):
+        return with_etag(Response(status=304), etag)
+    return None
+
+def with_etag(response, etag: str):
+    """Tag a response and make clients revalidate it on every use"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 def download_bytes(url: str, timeout: int = 30) -> bytes:
     """Download an image URL and return raw bytes."""
-    r = requests.get(url, timeout=timeout)
+    r = session_for(url).get(url, timeout=timeout)
     r.raise_for_status()
     return r.content
 
-def cloudinary_upload_bytes(file_bytes: bytes, filename: str, folder="kie-inputs"):
-    """Upload image bytes to Cloudinary and return public HTTPS URL."""
-    if not (os.getenv("CLOUDINARY_CLOUD_NAME") and os.getenv("CLOUDINARY_API_KEY") and os.getenv("CLOUDINARY_API_SECRET")):
-        raise RuntimeError("Cloudinary credentials missing (CLOUDINARY_CLOUD_NAME / KEY / SECRET).")
-    
-    result = cloudinary.uploader.upload(
-        file_bytes,
-        folder=folder,
-        public_id=os.path.splitext(filename)[0],
-        overwrite=True,
-        resource_type="image"
-    )
-    return result["secure_url"]
+def encode_cursor(created_at, row_id) -> str:
+    """Opaque keyset cursor for (created_at, id)."""
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode()).decode()
+
+def decode_cursor(cursor: str):
+    created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return created_at, int(row_id)
+
+def list_rows(table: str, all_fields: list, summary_fields: list):
+    """
+    Keyset-paginated listing shared by /api/projects and /api/insta-posts.
+
+    Query params: limit, cursor (from a previous next_cursor), fields (comma
+    separated projection) and status (comma separated filter). Rows come
+    newest first ordered by (created_at, id).
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', LIST_DEFAULT_LIMIT)), 1), LIST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in all_fields]
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+    else:
+        fields = list(summary_fields)
+    # Needed to build the next cursor
+    for required in ('id', 'created_at'):
+        if required not in fields:
+            fields.append(required)
+    
+    where = []
+    params = []
+    if args.get('status'):
+        statuses = [st.strip() for st in args['status'].split(',') if st.strip()]
+        where.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if args.get('cursor'):
+        try:
+            cursor_created_at, cursor_id = decode_cursor(args['cursor'])
+        except Exception:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        where.append('(created_at < ? OR (created_at = ? AND id < ?))')
+        params.extend([cursor_created_at, cursor_created_at, cursor_id])
+    
+    # Any insert/update/delete bumps the table version, so (version, query) identifies the page.
+    # Read it before the rows: a concurrent write can only make the tag stale, never wrong.
+    db = get_db()
+    version = db.execute('SELECT version FROM table_versions WHERE name = ?', (table,)).fetchone()[0]
+    query_key = hashlib.sha1(json.dumps(sorted(args.items(multi=True))).encode()).hexdigest()[:16]
+    etag = f'{table}-{version}-{query_key}'
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    query = f"SELECT {', '.join(fields)} FROM {table}"
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+    
+    rows = [dict(row) for row in db.execute(query, params).fetchall()]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    
+    return with_etag(jsonify({'items': rows, 'next_cursor': next_cursor}), etag)
 
 # KIE.ai Helper Functions
 def kie_upload_bytes(file_bytes: bytes, filename: str, mimetype: str = "image/png", upload_path="images/user-uploads"):
@@ -103,7 +266,7 @@ def kie_upload_bytes(file_bytes: bytes, filename: str, mimetype: str = "image/pn
     data = {"uploadPath": upload_path, "fileName": filename}
     headers = {"Authorization": f"Bearer {KIE_API_KEY}"}
     
-    r = requests.post(KIE_UPLOAD_URL, headers=headers, files=files, data=data, timeout=60)
+    r = session_for(KIE_UPLOAD_URL).post(KIE_UPLOAD_URL, headers=headers, files=files, data=data, timeout=60)
     r.raise_for_status()
     j = r.json()
     if not j.get("success"):
@@ -123,7 +286,7 @@ def kie_create_flux2_pro_i2i_task(prompt: str, input_urls: list, aspect_ratio="1
         },
     }
     
-    r = requests.post(KIE_CREATE_TASK_URL, headers=headers, json=payload, timeout=60)
+    r = session_for(KIE_CREATE_TASK_URL).post(KIE_CREATE_TASK_URL, headers=headers, json=payload, timeout=60)
     r.raise_for_status()
     j = r.json()
     
@@ -132,128 +295,9 @@ def kie_create_flux2_pro_i2i_task(prompt: str, input_urls: list, aspect_ratio="1
     
     return j["data"]["taskId"]
 
-def kie_poll_task(task_id: str, timeout_sec=240, poll_interval=3):
-    """Poll KIE.ai task for completion"""
-    import time
-    headers = {"Authorization": f"Bearer {KIE_API_KEY}"}
-    end = time.time() + timeout_sec
-    
-    while time.time() < end:
-        r = requests.get(KIE_TASK_STATUS_URL, headers=headers, params={"taskId": task_id}, timeout=30)
-        r.raise_for_status()
-        j = r.json()
-        data = j.get("data") or {}
-        state = (data.get("state") or "").lower().strip()
-        
-        if state == "success":
-            result_json_str = data.get("resultJson") or "{}"
-            result_obj = json.loads(result_json_str)
-            return result_obj.get("resultUrls") or []
-        
-        if state == "fail":
-            raise RuntimeError(f"Generation failed: {data.get('failMsg')}")
-        
-        time.sleep(poll_interval)
-    
-    raise TimeoutError("Timed out waiting for image generation task.")
-
-def init_db():
-    """Initialize database with schema"""
-    db = get_db()
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            company_service TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            has_custom_character INTEGER DEFAULT 0,
-            scene_1_img TEXT,
-            scene_1_vid TEXT,
-            scene_2_img TEXT,
-            scene_2_vid TEXT,
-            error_message TEXT,
-            webhook_response TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS insta_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            keyword TEXT NOT NULL,
-            mode TEXT NOT NULL,
-            status TEXT DEFAULT 'processing',
-            primary_hex TEXT,
-            secondary_hex TEXT,
-            concept TEXT,
-            title TEXT,
-            subtitle TEXT,
-            address_line TEXT,
-            final_prompt TEXT,
-            position TEXT,
-            experience TEXT,
-            location TEXT,
-            post TEXT,
-            error_message TEXT,
-            generated_image_urls TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Migration: Add status column if it doesn't exist
-    try:
-        cursor = db.execute("PRAGMA table_info(insta_posts)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        if 'status' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN status TEXT DEFAULT 'completed'")
-            print("Added status column to insta_posts table")
-        
-        if 'error_message' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN error_message TEXT")
-            print("Added error_message column to insta_posts table")
-        
-        if 'updated_at' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN updated_at TIMESTAMP")
-            # Update existing rows with current timestamp
-            db.execute("UPDATE insta_posts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
-            print("Added updated_at column to insta_posts table")
-        
-        if 'position' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN position TEXT")
-            print("Added position column to insta_posts table")
-        
-        if 'experience' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN experience TEXT")
-            print("Added experience column to insta_posts table")
-        
-        if 'location' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN location TEXT")
-            print("Added location column to insta_posts table")
-        
-        if 'generated_image_urls' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN generated_image_urls TEXT")
-            print("Added generated_image_urls column to insta_posts table")
-        
-        if 'logo_base64' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN logo_base64 LONGTEXT")
-            print("Added logo_base64 column to insta_posts table")
-        
-        if 'character_base64' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN character_base64 LONGTEXT")
-            print("Added character_base64 column to insta_posts table")
-        
-        if 'post' not in columns:
-            db.execute("ALTER TABLE insta_posts ADD COLUMN post TEXT")
-            print("Added post column to insta_posts table")
-            
-    except Exception as e:
-        print(f"Migration error: {e}")
-    
-    db.commit()
-    db.close()
+def kie_poll_task(task_id: str, timeout_sec=240):
+    """Wait for a KIE.ai task via the shared poller and return its result URLs"""
+    return kie_poller.watch(task_id, timeout_sec).result()
 
 # Initialize database on startup
 init_db()
@@ -312,27 +356,26 @@ def serve_static(path):
 @app.route('/api/projects', methods=['GET'])
 @login_required
 def get_projects():
-    """Get all projects"""
-    db = get_db()
-    cursor = db.execute('''
-        SELECT * FROM projects 
-        ORDER BY created_at DESC
-    ''')
-    projects = [dict(row) for row in cursor.fetchall()]
-    db.close()
-    return jsonify(projects)
+    """List projects (keyset paginated, summary fields unless fields= is given)"""
+    return list_rows('projects', PROJECT_FIELDS, PROJECT_SUMMARY_FIELDS)
 
 @app.route('/api/projects/<int:project_id>', methods=['GET'])
 @login_required
 def get_project(project_id):
     """Get single project by ID"""
     db = get_db()
+    # Answer revalidations from the version alone, without reading the row
+    version = db.execute('SELECT row_version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if version:
+        cached = not_modified(f'project-{project_id}-{version[0]}')
+        if cached:
+            return cached
+    
     cursor = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
     project = cursor.fetchone()
-    db.close()
     
     if project:
-        return jsonify(dict(project))
+        return with_etag(jsonify(dict(project)), f"project-{project_id}-{project['row_version']}")
     return jsonify({'error': 'Project not found'}), 404
 
 @app.route('/api/projects', methods=['POST'])
@@ -359,7 +402,7 @@ def create_project():
             'character_image': data.get('character_image', 'false')
         }
         
-        # Handle file upload if present (read file data before thread)
+        # Handle file upload if present (read file data before queueing)
         file_data = None
         has_custom_character = 1 if data.get('character_image') == 'true' else 0
         if 'character_image_file' in request.files:
@@ -382,13 +425,25 @@ def create_project():
             VALUES (?, ?, ?, 'pending', ?)
         ''', (title, video_description, company_service, has_custom_character))
         project_id = cursor.lastrowid
+        # Job payloads are JSON, so the uploaded file travels through the blob store
+        file_hash = put_blob(db, file_data['content'], hold=True) if file_data else None
         db.commit()
-        db.close()
         
-        # Start background task to call webhook
-        thread = Thread(target=process_video_generation, args=(project_id, webhook_data, file_data))
-        thread.daemon = True
-        thread.start()
+        # Queue background task to call webhook
+        try:
+            executor.submit(
+                'video',
+                project_id=project_id,
+                webhook_data=webhook_data,
+                file_hash=file_hash,
+                filename=file_data['filename'] if file_data else None,
+                content_type=file_data['content_type'] if file_data else None
+            )
+        except QueueFull as e:
+            db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+            release_blob_holds(db, file_hash)
+            db.commit()
+            return busy_response(e)
         
         return jsonify({
             'success': True,
@@ -402,36 +457,120 @@ def create_project():
             'error': str(e)
         }), 500
 
-def process_video_generation(project_id, webhook_data, file_data):
-    """Background task to process video generation"""
-    db = None
+def mark_project_failed(project_id, error, only_if_unsettled=False):
+    """Record a failed video generation; only_if_unsettled leaves projects a callback already settled alone"""
+    status_guard = " AND status IN ('pending', 'processing')" if only_if_unsettled else ''
     try:
-        # Update status to processing
-        db = sqlite3.connect(DATABASE, check_same_thread=False)
+        with connection() as db:
+            db.execute(f'''
+                UPDATE projects 
+                SET status = 'failed',
+                    error_message = ?,
+                    callback_deadline = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?{status_guard}
+            ''', (str(error), project_id))
+            db.commit()
+    except Exception as db_error:
+        print(f'Error updating database: {db_error}')
+
+def save_video_result(project_id, result):
+    """Store the scenes returned by the n8n workflow and complete the project"""
+    with connection() as db:
         db.execute('''
             UPDATE projects 
-            SET status = 'processing', updated_at = CURRENT_TIMESTAMP
+            SET status = 'completed',
+                scene_1_img = ?,
+                scene_1_vid = ?,
+                scene_2_img = ?,
+                scene_2_vid = ?,
+                webhook_response = ?,
+                error_message = NULL,
+                callback_deadline = NULL,
+                updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        ''', (project_id,))
+        ''', (
+            result.get('scene_1_img'),
+            result.get('scene_1_vid'),
+            result.get('scene_2_img'),
+            result.get('scene_2_vid'),
+            json.dumps(result),
+            project_id
+        ))
         db.commit()
-        db.close()
-        db = None
+
+def project_callback_signature(project_id, expires) -> str:
+    """HMAC-SHA256 over project id and expiry with N8N_CALLBACK_SECRET"""
+    message = f'{project_id}:{expires}'.encode()
+    return hmac.new(N8N_CALLBACK_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+def project_callback_url(project_id) -> str:
+    """Signed URL n8n posts the render result to"""
+    # Valid for twice the watchdog timeout so a late result still lands on the project
+    expires = int(time.time() + 2 * VIDEO_CALLBACK_TIMEOUT)
+    signature = project_callback_signature(project_id, expires)
+    return f'{N8N_CALLBACK_BASE_URL}/api/projects/{project_id}/callback?expires={expires}&signature={signature}'
+
+def release_video_input(file_hash):
+    """Give back a video job's hold on its character image (once: at the end of the job or from on_abandon)"""
+    if not file_hash:
+        return
+    try:
+        with connection() as db:
+            release_blob_holds(db, file_hash)
+            db.commit()
+    except Exception as e:
+        print(f'Error releasing video input: {e}')
+
+def abandon_video_generation(payload, error):
+    mark_project_failed(payload['project_id'], error, only_if_unsettled=True)
+    release_video_input(payload.get('file_hash'))
+
+@job_handler('video', on_abandon=abandon_video_generation)
+def process_video_generation(job, project_id, webhook_data, file_hash=None, filename=None, content_type=None):
+    """Background job to process video generation"""
+    try:
+        # Update status to processing (the deadline is set first so an early callback is accepted)
+        callback_deadline = time.time() + VIDEO_CALLBACK_TIMEOUT if VIDEO_CALLBACK_MODE else None
+        with connection() as db:
+            db.execute('''
+                UPDATE projects 
+                SET status = 'processing', callback_deadline = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (callback_deadline, project_id))
+            db.commit()
         
         # Prepare file for webhook if present
         webhook_files = None
-        if file_data:
+        if file_hash:
+            with connection() as db:
+                content = get_blob(db, file_hash)
+            if content is None:
+                raise Exception('Stored character image not found')
             webhook_files = {
                 'character_image_file': (
-                    file_data['filename'], 
-                    file_data['content'], 
-                    file_data['content_type']
+                    filename, 
+                    content, 
+                    content_type
                 )
             }
         
-        # Call webhook
-        response = requests.post(WEBHOOK_URL, data=webhook_data, files=webhook_files, timeout=None)
-        
-        if response.status_code == 200:
+        if VIDEO_CALLBACK_MODE:
+            webhook_data = dict(webhook_data, project_id=project_id, callback_url=project_callback_url(project_id))
+            timeout = (10, N8N_ACK_TIMEOUT)
+        else:
+            timeout = (10, N8N_WEBHOOK_TIMEOUT)
+        
+        # Call webhook. This is not idempotent: if the job runs again (its worker died and the lease
+        # was recovered) the render is POSTed again and n8n renders the project a second time.
+        response = session_for(WEBHOOK_URL).post(WEBHOOK_URL, data=webhook_data, files=webhook_files, timeout=timeout)
+        
+        if VIDEO_CALLBACK_MODE:
+            # n8n accepted the job; the result arrives on the callback (or the watchdog fails it)
+            if not response.ok:
+                raise Exception(f'Webhook returned status {response.status_code}')
+            print(f"[Video] Project {project_id} submitted, waiting for callback")
+        elif response.status_code == 200:
             result = response.json()
             
             # Handle array response
@@ -439,54 +578,83 @@ def process_video_generation(project_id, webhook_data, file_data):
                 result = result[0]
             
             # Update database with success
-            db = sqlite3.connect(DATABASE, check_same_thread=False)
-            db.execute('''
-                UPDATE projects 
-                SET status = 'completed',
-                    scene_1_img = ?,
-                    scene_1_vid = ?,
-                    scene_2_img = ?,
-                    scene_2_vid = ?,
-                    webhook_response = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (
-                result.get('scene_1_img'),
-                result.get('scene_1_vid'),
-                result.get('scene_2_img'),
-                result.get('scene_2_vid'),
-                json.dumps(result),
-                project_id
-            ))
-            db.commit()
-            db.close()
-            db = None
+            save_video_result(project_id, result)
         else:
             raise Exception(f'Webhook returned status {response.status_code}')
             
     except Exception as e:
-        # Update database with error
-        try:
-            if db:
-                db.close()
-            db = sqlite3.connect(DATABASE, check_same_thread=False)
-            db.execute('''
-                UPDATE projects 
-                SET status = 'failed',
-                    error_message = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (str(e), project_id))
-            db.commit()
-            db.close()
-        except Exception as db_error:
-            print(f'Error updating database: {db_error}')
+        # Update database with error. In callback mode the render may still finish (e.g. the ack
+        # timed out after n8n took the job) and its callback may already have completed the project.
+        mark_project_failed(project_id, e, only_if_unsettled=True)
     finally:
-        if db:
-            try:
-                db.close()
-            except:
-                pass
+        release_video_input(file_hash)
+
+@app.route('/api/projects/<int:project_id>/callback', methods=['POST'])
+def project_callback(project_id):
+    """Render result posted by n8n to the signed URL it was given (no session, the signature is the auth)"""
+    if not VIDEO_CALLBACK_MODE:
+        return jsonify({'error': 'Callbacks are not enabled'}), 404
+    
+    expires = request.args.get('expires', type=int)
+    signature = request.args.get('signature', '')
+    if not expires or not hmac.compare_digest(signature, project_callback_signature(project_id, expires)):
+        return jsonify({'error': 'Invalid signature'}), 403
+    if time.time() > expires:
+        return jsonify({'error': 'Callback URL expired'}), 403
+    
+    result = request.get_json(silent=True)
+    # Same shape as the synchronous webhook response, which may be wrapped in an array
+    if isinstance(result, list) and len(result) > 0:
+        result = result[0]
+    if not isinstance(result, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    try:
+        row = get_db().execute('SELECT status FROM projects WHERE id = ?', (project_id,)).fetchone()
+        if not row:
+            return jsonify({'error': 'Project not found'}), 404
+        if row['status'] == 'completed':
+            # n8n retried a delivered callback
+            return jsonify({'success': True, 'message': 'Project already completed'})
+        
+        if result.get('status') == 'failed' or result.get('error'):
+            mark_project_failed(project_id, result.get('error') or 'Video generation failed')
+        else:
+            save_video_result(project_id, result)
+        print(f"[Video] Callback received for project {project_id}")
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f'Error handling callback for project {project_id}: {e}')
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def fail_overdue_video_callbacks():
+    """Mark projects failed whose n8n callback did not arrive in time"""
+    with connection() as db:
+        cursor = db.execute('''
+            UPDATE projects 
+            SET status = 'failed',
+                error_message = ?,
+                callback_deadline = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE callback_deadline < ? AND status = 'processing'
+        ''', (f'No result from the video workflow within {int(VIDEO_CALLBACK_TIMEOUT)}s', time.time()))
+        db.commit()
+    if cursor.rowcount:
+        print(f"[Video] Watchdog failed {cursor.rowcount} project(s) with overdue callbacks")
+
+def video_callback_watchdog():
+    while True:
+        time.sleep(VIDEO_WATCHDOG_INTERVAL)
+        try:
+            fail_overdue_video_callbacks()
+        except Exception as e:
+            print(f"[Video] Watchdog check failed: {e}")
+
+def start_video_callback_watchdog():
+    """Start the overdue-callback watchdog (runs next to the job workers)"""
+    threading.Thread(target=video_callback_watchdog, name='video-callback-watchdog', daemon=True).start()
 
 @app.route('/api/projects/<int:project_id>', methods=['DELETE'])
 @login_required
@@ -495,53 +663,162 @@ def delete_project(project_id):
     db = get_db()
     db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
     db.commit()
-    db.close()
     return jsonify({'success': True})
 
 @app.route('/api/stats', methods=['GET'])
 @login_required
 def get_stats():
-    """Get dashboard statistics"""
+    """Get dashboard statistics (read from trigger-maintained counters, optional ?days=N daily breakdown)"""
     db = get_db()
     
-    total_videos = db.execute('SELECT COUNT(*) as count FROM projects WHERE status = "completed"').fetchone()['count']
-    total_insta_posts = db.execute('SELECT COUNT(*) as count FROM insta_posts').fetchone()['count']
-    custom_characters = db.execute('SELECT COUNT(*) as count FROM projects WHERE has_custom_character = 1 AND status = "completed"').fetchone()['count']
+    counters = {}
+    rows = db.execute('''
+        SELECT metric, dimension, value FROM stat_counters
+        WHERE metric IN ('projects_by_status', 'projects_custom_by_status',
+                         'insta_posts_by_status', 'insta_posts_by_mode')
+    ''').fetchall()
+    for row in rows:
+        counters.setdefault(row['metric'], {})[row['dimension']] = row['value']
     
-    db.close()
+    projects_by_status = counters.get('projects_by_status', {})
+    insta_posts_by_status = counters.get('insta_posts_by_status', {})
+    
+    stats = {
+        'totalVideos': projects_by_status.get('completed', 0),
+        'totalInstaPosts': sum(insta_posts_by_status.values()),
+        'customCharacters': counters.get('projects_custom_by_status', {}).get('completed', 0),
+        'projects': {
+            'byStatus': projects_by_status,
+            'failed': projects_by_status.get('failed', 0)
+        },
+        'instaPosts': {
+            'byStatus': insta_posts_by_status,
+            'byMode': counters.get('insta_posts_by_mode', {}),
+            'failed': insta_posts_by_status.get('failed', 0)
+        }
+    }
+    
+    days = request.args.get('days', type=int)
+    if days:
+        days = min(max(days, 1), 366)
+        per_day = {'projects': {}, 'instaPosts': {}}
+        rows = db.execute('''
+            SELECT metric, dimension, value FROM stat_counters
+            WHERE metric IN ('projects_by_day', 'insta_posts_by_day') AND dimension >= date('now', ?)
+            ORDER BY dimension
+        ''', (f'-{days - 1} days',)).fetchall()
+        for row in rows:
+            key = 'projects' if row['metric'] == 'projects_by_day' else 'instaPosts'
+            per_day[key][row['dimension']] = row['value']
+        stats['perDay'] = per_day
+    
+    return jsonify(stats)
+
+@app.route('/api/changes', methods=['GET'])
+@login_required
+def change_stream():
+    """Server-Sent Events feed of project / Instagram post status transitions"""
+    # EventSource sends Last-Event-ID on reconnect; ?since= lets other clients pick a start point
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+    
+    def stream():
+        subscription = change_feed.subscribe()
+        try:
+            last_id = since if since is not None else change_feed.latest_id()
+            yield 'retry: 3000\n\n'
+            for change in change_feed.backlog(last_id):
+                last_id = change['id']
+                yield sse_message('change', change, event_id=change['id'])
+            while True:
+                try:
+                    change = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if change is None:
+                    # Fell behind; closing makes the browser reconnect and replay from last_id
+                    return
+                if change['id'] <= last_id:
+                    continue
+                last_id = change['id']
+                yield sse_message('change', change, event_id=change['id'])
+        finally:
+            change_feed.unsubscribe(subscription)
     
-    return jsonify({
-        'totalVideos': total_videos,
-        'totalInstaPosts': total_insta_posts,
-        'customCharacters': custom_characters
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @app.route('/api/insta-posts', methods=['GET'])
 @login_required
 def get_insta_posts():
-    """Get all Instagram posts"""
+    """List Instagram posts (keyset paginated, summary fields unless fields= is given)"""
+    return list_rows('insta_posts', INSTA_POST_FIELDS, INSTA_POST_SUMMARY_FIELDS)
+
+@app.route('/api/insta-posts/stage-timings', methods=['GET'])
+@login_required
+def get_prompt_stage_timings():
+    """Latency percentiles, token usage and cache hit rate per prompt pipeline stage over the last ?days=N (default 7)"""
+    days = min(max(request.args.get('days', 7, type=int), 1), 366)
     db = get_db()
-    cursor = db.execute('''
-        SELECT * FROM insta_posts 
-        ORDER BY created_at DESC
-    ''')
-    posts = [dict(row) for row in cursor.fetchall()]
-    db.close()
-    return jsonify(posts)
+    rows = db.execute('''
+        SELECT stage, status, duration_ms, prompt_tokens, completion_tokens, cache_hits
+        FROM insta_post_stage_timings WHERE created_at >= datetime('now', ?)
+        ORDER BY stage, duration_ms
+    ''', (f'-{days} days',)).fetchall()
+    
+    by_stage = {}
+    for row in rows:
+        by_stage.setdefault(row['stage'], []).append(row)
+    
+    stages = {}
+    for stage, stage_rows in by_stage.items():
+        # Rows come sorted by duration, so percentiles are a nearest-rank lookup
+        durations = [row['duration_ms'] for row in stage_rows]
+        count = len(stage_rows)
+        percentile = lambda pct: durations[max(0, math.ceil(pct / 100 * count) - 1)]
+        stages[stage] = {
+            'count': count,
+            'errors': sum(1 for row in stage_rows if row['status'] == 'error'),
+            'rejected': sum(1 for row in stage_rows if row['status'] == 'rejected'),
+            'cacheHitRate': round(sum(1 for row in stage_rows if row['cache_hits']) / count, 3),
+            'durationMs': {
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'p99': percentile(99),
+                'max': durations[-1],
+                'mean': round(sum(durations) / count, 1)
+            },
+            'avgPromptTokens': round(sum(row['prompt_tokens'] for row in stage_rows) / count, 1),
+            'avgCompletionTokens': round(sum(row['completion_tokens'] for row in stage_rows) / count, 1)
+        }
+    
+    return jsonify({'days': days, 'stages': stages})
 
 @app.route('/api/insta-posts/<int:post_id>', methods=['GET'])
 @login_required
 def get_insta_post(post_id):
     """Get single Instagram post by ID"""
     db = get_db()
+    # Answer revalidations from the version alone, without reading the row
+    version = db.execute('SELECT row_version FROM insta_posts WHERE id = ?', (post_id,)).fetchone()
+    if version:
+        cached = not_modified(f'insta-post-{post_id}-{version[0]}')
+        if cached:
+            return cached
+    
     cursor = db.execute('SELECT * FROM insta_posts WHERE id = ?', (post_id,))
     post = cursor.fetchone()
-    db.close()
     
     if post:
         post_dict = dict(post)
         print(f"Fetching post {post_id}, generated_image_urls: {post_dict.get('generated_image_urls')}")
-        return jsonify(post_dict)
+        return with_etag(jsonify(post_dict), f"insta-post-{post_id}-{post['row_version']}")
     return jsonify({'error': 'Post not found'}), 404
 
 @app.route('/api/insta-posts/<int:post_id>', methods=['DELETE'])
@@ -549,9 +826,11 @@ def get_insta_post(post_id):
 def delete_insta_post(post_id):
     """Delete an Instagram post"""
     db = get_db()
+    row = db.execute('SELECT logo_hash, character_hash FROM insta_posts WHERE id = ?', (post_id,)).fetchone()
     db.execute('DELETE FROM insta_posts WHERE id = ?', (post_id,))
+    if row:
+        release_blobs(db, row['logo_hash'], row['character_hash'])
     db.commit()
-    db.close()
     return jsonify({'success': True})
 
 @app.route('/api/insta-posts/<int:post_id>/save-images', methods=['POST'])
@@ -576,7 +855,6 @@ def save_insta_post_images(post_id):
         saved_data = cursor.fetchone()
         print(f"Verified saved data: {saved_data['generated_image_urls'] if saved_data else 'None'}")
         
-        db.close()
         
         return jsonify({'success': True, 'message': 'Images saved successfully'})
     except Exception as e:
@@ -585,7 +863,6 @@ def save_insta_post_images(post_id):
 
 def process_insta_post_background(post_id, keyword, mode, logo_bytes, character_bytes, api_key, position="", experience="", location="", post=""):
     """Background task to process Instagram post"""
-    db = None
     try:
         print(f"[Background Task] Starting processing for post {post_id}")
         
@@ -605,8 +882,8 @@ def process_insta_post_background(post_id, keyword, mode, logo_bytes, character_
         print(f"[Background Task] Prompt generated for post {post_id}")
         
         # Upload images to Cloudinary for KIE API
-        logo_url = cloudinary_upload_bytes(logo_bytes, filename="logo.png", folder="kie-inputs")
-        char_url = cloudinary_upload_bytes(character_bytes, filename="character.png", folder="kie-inputs")
+        logo_url = cloudinary_upload_bytes(logo_bytes, folder="kie-inputs")
+        char_url = cloudinary_upload_bytes(character_bytes, folder="kie-inputs")
         
         print(f"[Background Task] Images uploaded - Logo: {logo_url}, Character: {char_url}")
         
@@ -626,40 +903,38 @@ def process_insta_post_background(post_id, keyword, mode, logo_bytes, character_
         print(f"[Background Task] Images generated: {result_urls}")
         
         # Update database with results including generated images
-        db = get_db()
-        db.execute('''
-            UPDATE insta_posts 
-            SET status = 'completed',
-                primary_hex = ?,
-                secondary_hex = ?,
-                concept = ?,
-                title = ?,
-                subtitle = ?,
-                address_line = ?,
-                final_prompt = ?,
-                position = ?,
-                experience = ?,
-                location = ?,
-                generated_image_urls = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (
-            result.get('primary_hex'),
-            result.get('secondary_hex'),
-            result.get('concept'),
-            result.get('title'),
-            result.get('subtitle'),
-            result.get('address_line'),
-            result.get('final_prompt'),
-            position,
-            experience,
-            location,
-            json.dumps(result_urls),
-            post_id
-        ))
-        db.commit()
-        db.close()
-        db = None
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts 
+                SET status = 'completed',
+                    primary_hex = ?,
+                    secondary_hex = ?,
+                    concept = ?,
+                    title = ?,
+                    subtitle = ?,
+                    address_line = ?,
+                    final_prompt = ?,
+                    position = ?,
+                    experience = ?,
+                    location = ?,
+                    generated_image_urls = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (
+                result.get('primary_hex'),
+                result.get('secondary_hex'),
+                result.get('concept'),
+                result.get('title'),
+                result.get('subtitle'),
+                result.get('address_line'),
+                result.get('final_prompt'),
+                position,
+                experience,
+                location,
+                json.dumps(result_urls),
+                post_id
+            ))
+            db.commit()
         
         print(f"[Background Task] Post {post_id} completed successfully!")
         
@@ -670,26 +945,192 @@ def process_insta_post_background(post_id, keyword, mode, logo_bytes, character_
         
         # Update database with error
         try:
-            if db:
-                db.close()
-            db = sqlite3.connect(DATABASE, check_same_thread=False)
-            db.execute('''
-                UPDATE insta_posts 
-                SET status = 'failed',
-                    error_message = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (str(e), post_id))
-            db.commit()
-            db.close()
+            with connection() as db:
+                db.execute('''
+                    UPDATE insta_posts 
+                    SET status = 'failed',
+                        error_message = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (str(e), post_id))
+                db.commit()
         except Exception as db_error:
             print(f'Error updating database: {db_error}')
-    finally:
-        if db:
-            try:
-                db.close()
-            except:
-                pass
+
+def validate_insta_post_fields(keyword, mode, position, experience, location, post):
+    """Return the error message for invalid generate-insta-post fields, or None"""
+    if not keyword:
+        return 'Keyword is required'
+    
+    if mode not in ['HIRING', 'MARKETING']:
+        return 'Invalid mode. Must be HIRING or MARKETING'
+    
+    # Validate hiring-specific fields when mode is HIRING
+    if mode == 'HIRING':
+        if not position:
+            return 'Position is required for HIRING mode'
+        if not experience:
+            return 'Experience is required for HIRING mode'
+        if not location:
+            return 'Location is required for HIRING mode'
+        if not post:
+            return 'Post (number of openings) is required for HIRING mode'
+    return None
+
+def read_insta_post_form():
+    """Parse and validate the generate-insta-post form; returns (inputs, error_response)"""
+    # Get form data
+    keyword = (request.form.get('keyword') or '').strip()
+    mode = (request.form.get('mode') or '').strip()
+    
+    # Files are OPTIONAL now
+    logo = request.files.get('logo')
+    character = request.files.get('character')
+    
+    # Get hiring-specific fields
+    position = (request.form.get('position') or '').strip()
+    experience = (request.form.get('experience') or '').strip()
+    location = (request.form.get('location') or '').strip()
+    post = (request.form.get('post') or '').strip()  # Number of openings
+    
+    # Validate required fields
+    error = validate_insta_post_fields(keyword, mode, position, experience, location, post)
+    if error:
+        return None, (jsonify({'error': error}), 400)
+    
+    # Missing uploads fall back to the default images, which already have public URLs
+    if logo and logo.filename:
+        logo_bytes = logo.read()
+        logo_used = "uploaded"
+    else:
+        logo_bytes = None
+        logo_used = "default_url"
+    
+    if character and character.filename:
+        character_bytes = character.read()
+        character_used = "uploaded"
+    else:
+        character_bytes = None
+        character_used = "default_url"
+    
+    print(f"Logo source: {logo_used} | Character source: {character_used}")
+    
+    return {
+        'keyword': keyword,
+        'mode': mode,
+        'position': position,
+        'experience': experience,
+        'location': location,
+        'post': post,
+        'logo_bytes': logo_bytes,
+        'character_bytes': character_bytes,
+        'logo_used': logo_used,
+        'character_used': character_used
+    }, None
+
+def run_insta_post_pipeline(inputs, on_event=None):
+    """Run the prompt pipeline for parsed generate-insta-post inputs"""
+    print(f"[Insta Post] Generating prompt for keyword: {inputs['keyword']}")
+    print(f"[Insta Post] Banner mode: {inputs['mode']}")
+    print(f"[Insta Post] Starting prompt pipeline...")
+    
+    result = run_prompt_pipeline(
+        keyword=inputs['keyword'],
+        banner_mode=inputs['mode'],
+        logo_bytes=inputs['logo_bytes'],
+        character_bytes=inputs['character_bytes'],
+        api_key=OPENAI_API_KEY,
+        position=inputs['position'],
+        experience=inputs['experience'],
+        location=inputs['location'],
+        post=inputs['post'],
+        on_event=on_event
+    )
+    print(f"[Insta Post] Prompt pipeline completed successfully")
+    print(f"[Insta Post] Result keys: {result.keys() if result else 'None'}")
+    return result
+
+def save_prompt_timings(db, post_id, timings, total_stage='total', status='ok'):
+    """Store the pipeline's stage spans for a post, plus a total_stage row with the run's status (the caller commits)"""
+    if not timings:
+        return
+    spans = timings.get('spans', [])
+    rows = [(
+        post_id, span['stage'], span.get('attempt'), span['status'], span.get('detail'),
+        span['start_ms'], span['duration_ms'], span['model'],
+        span['llm_calls'], span['prompt_tokens'], span['completion_tokens'],
+        ','.join(span['cache_hits']) or None
+    ) for span in spans]
+    rows.append((
+        post_id, total_stage, None, status, None, 0, timings['total_ms'], None,
+        sum(span['llm_calls'] for span in spans),
+        sum(span['prompt_tokens'] for span in spans),
+        sum(span['completion_tokens'] for span in spans),
+        None
+    ))
+    db.executemany('''
+        INSERT INTO insta_post_stage_timings (
+            post_id, stage, attempt, status, detail, start_ms, duration_ms, model,
+            llm_calls, prompt_tokens, completion_tokens, cache_hits
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+def save_insta_post(db, inputs, result):
+    """Insert the post with its prompt results (status='pending_image') and return the API payload"""
+    # Images are stored once in image_blobs and referenced by hash
+    logo_hash = put_blob(db, inputs['logo_bytes'] or default_logo.get_bytes())
+    character_hash = put_blob(db, inputs['character_bytes'] or default_character.get_bytes())
+    cursor = db.execute('''
+        INSERT INTO insta_posts (
+            keyword, mode, status, position, experience, location, post,
+            logo_hash, character_hash,
+            primary_hex, secondary_hex, concept, title, subtitle, address_line, final_prompt
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        inputs['keyword'], 
+        inputs['mode'], 
+        'pending_image',  # status
+        inputs['position'], 
+        inputs['experience'], 
+        inputs['location'], 
+        inputs['post'],
+        logo_hash, 
+        character_hash,
+        result.get('primary_hex'),
+        result.get('secondary_hex'),
+        result.get('concept'),
+        result.get('title'),
+        result.get('subtitle'),
+        result.get('address_line'),
+        result.get('final_prompt')
+    ))
+    post_id = cursor.lastrowid
+    save_prompt_timings(db, post_id, result.get('_timings'))
+    db.commit()
+    print(f"[Insta Post] Created post #{post_id} with status='pending_image'")
+    
+    # Prompt data for the user to review
+    return {
+        'id': post_id,
+        'status': 'pending_image',
+        'keyword': inputs['keyword'],
+        'mode': inputs['mode'],
+        'position': inputs['position'],
+        'experience': inputs['experience'],
+        'location': inputs['location'],
+        'post': inputs['post'],
+        'primary_hex': result.get('primary_hex'),
+        'secondary_hex': result.get('secondary_hex'),
+        'concept': result.get('concept'),
+        'title': result.get('title'),
+        'subtitle': result.get('subtitle'),
+        'address_line': result.get('address_line'),
+        'final_prompt': result.get('final_prompt'),
+        '_logo_source': inputs['logo_used'],
+        '_character_source': inputs['character_used'],
+        '_cache_hits': result.get('_cache_hits', []),
+        '_timings': result.get('_timings')
+    }
 
 @app.route('/api/generate-insta-post', methods=['POST'])
 @login_required
@@ -700,79 +1141,14 @@ def generate_insta_post():
         if not OPENAI_API_KEY:
             return jsonify({'error': 'OpenAI API key is not configured'}), 500
         
-        # Get form data
-        keyword = (request.form.get('keyword') or '').strip()
-        mode = (request.form.get('mode') or '').strip()
-        
-        # Files are OPTIONAL now
-        logo = request.files.get('logo')
-        character = request.files.get('character')
-        
-        # Get hiring-specific fields
-        position = (request.form.get('position') or '').strip()
-        experience = (request.form.get('experience') or '').strip()
-        location = (request.form.get('location') or '').strip()
-        post = (request.form.get('post') or '').strip()  # Number of openings
-        
-        # Validate required fields
-        if not keyword:
-            return jsonify({'error': 'Keyword is required'}), 400
-        
-        if mode not in ['HIRING', 'MARKETING']:
-            return jsonify({'error': 'Invalid mode. Must be HIRING or MARKETING'}), 400
-        
-        # Validate hiring-specific fields when mode is HIRING
-        if mode == 'HIRING':
-            if not position:
-                return jsonify({'error': 'Position is required for HIRING mode'}), 400
-            if not experience:
-                return jsonify({'error': 'Experience is required for HIRING mode'}), 400
-            if not location:
-                return jsonify({'error': 'Location is required for HIRING mode'}), 400
-            if not post:
-                return jsonify({'error': 'Post (number of openings) is required for HIRING mode'}), 400
-        
-        # If missing uploads, download default Cloudinary images as bytes
-        if logo and logo.filename:
-            logo_bytes = logo.read()
-            logo_used = "uploaded"
-        else:
-            logo_bytes = download_bytes(DEFAULT_LOGO_URL)
-            logo_used = "default_url"
-        
-        if character and character.filename:
-            character_bytes = character.read()
-            character_used = "uploaded"
-        else:
-            character_bytes = download_bytes(DEFAULT_CHARACTER_URL)
-            character_used = "default_url"
-        
-        print(f"Logo source: {logo_used} | Character source: {character_used}")
-        
-        # Convert to base64 for storage
-        logo_base64 = base64.b64encode(logo_bytes).decode('utf-8')
-        character_base64 = base64.b64encode(character_bytes).decode('utf-8')
+        inputs, error = read_insta_post_form()
+        if error:
+            return error
         
         # Run prompt generation immediately (not in background)
-        print(f"[Insta Post] Generating prompt for keyword: {keyword}")
-        print(f"[Insta Post] Banner mode: {mode}")
-        print(f"[Insta Post] Starting prompt pipeline...")
-        
         result = None
         try:
-            result = run_prompt_pipeline(
-                keyword=keyword,
-                banner_mode=mode,
-                logo_bytes=logo_bytes,
-                character_bytes=character_bytes,
-                api_key=OPENAI_API_KEY,
-                position=position,
-                experience=experience,
-                location=location,
-                post=post
-            )
-            print(f"[Insta Post] Prompt pipeline completed successfully")
-            print(f"[Insta Post] Result keys: {result.keys() if result else 'None'}")
+            result = run_insta_post_pipeline(inputs)
         except ValueError as ve:
             print(f"[ERROR] Prompt validation failed: {str(ve)}")
             import traceback
@@ -791,63 +1167,17 @@ def generate_insta_post():
         
         # Create record with prompt results (status='pending_image')
         try:
-            db = get_db()
-            cursor = db.execute('''
-                INSERT INTO insta_posts (
-                    keyword, mode, status, position, experience, location, post,
-                    logo_base64, character_base64,
-                    primary_hex, secondary_hex, concept, title, subtitle, address_line, final_prompt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                keyword, 
-                mode, 
-                'pending_image',  # status
-                position, 
-                experience, 
-                location, 
-                post,
-                logo_base64, 
-                character_base64,
-                result.get('primary_hex'),
-                result.get('secondary_hex'),
-                result.get('concept'),
-                result.get('title'),
-                result.get('subtitle'),
-                result.get('address_line'),
-                result.get('final_prompt')
-            ))
-            db.commit()
-            post_id = cursor.lastrowid
-            print(f"[Insta Post] Created post #{post_id} with status='pending_image'")
-            
+            post_data = save_insta_post(get_db(), inputs, result)
         except Exception as db_error:
             print(f"[ERROR] Database insert failed: {str(db_error)}")
             import traceback
             traceback.print_exc()
             return jsonify({'error': f'Failed to save post: {str(db_error)}'}), 500
         
-        print(f"[Insta Post] Prompt generated successfully for post {post_id}")
+        print(f"[Insta Post] Prompt generated successfully for post {post_data['id']}")
         
         # Return response with prompt data for user to review
-        return jsonify({
-            'id': post_id,
-            'status': 'pending_image',
-            'keyword': keyword,
-            'mode': mode,
-            'position': position,
-            'experience': experience,
-            'location': location,
-            'post': post,
-            'primary_hex': result.get('primary_hex'),
-            'secondary_hex': result.get('secondary_hex'),
-            'concept': result.get('concept'),
-            'title': result.get('title'),
-            'subtitle': result.get('subtitle'),
-            'address_line': result.get('address_line'),
-            'final_prompt': result.get('final_prompt'),
-            '_logo_source': logo_used,
-            '_character_source': character_used
-        }), 200
+        return jsonify(post_data), 200
             
     except Exception as e:
         print(f'Error creating Instagram post: {e}')
@@ -855,6 +1185,63 @@ def generate_insta_post():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/generate-insta-post/stream', methods=['POST'])
+@login_required
+def generate_insta_post_stream():
+    """Same as /api/generate-insta-post, but streams pipeline progress as Server-Sent Events"""
+    if not OPENAI_API_KEY:
+        return jsonify({'error': 'OpenAI API key is not configured'}), 500
+    
+    inputs, error = read_insta_post_form()
+    if error:
+        return error
+    
+    events = queue.Queue()
+    
+    def on_event(event, **data):
+        events.put((event, data))
+    
+    def run():
+        # Runs outside the request so the response can stream while the pipeline works.
+        # If the client disconnects the post is still saved and shows up in the list.
+        try:
+            result = run_insta_post_pipeline(inputs, on_event=on_event)
+            if not result:
+                raise RuntimeError('Prompt generation returned empty result')
+            with connection() as db:
+                post_data = save_insta_post(db, inputs, result)
+            events.put(('done', post_data))
+        except ValueError as ve:
+            print(f"[ERROR] Prompt validation failed: {str(ve)}")
+            events.put(('error', {'error': f'Prompt validation failed: {str(ve)}'}))
+        except Exception as e:
+            print(f"[ERROR] Prompt pipeline failed: {type(e).__name__}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            events.put(('error', {'error': f'Prompt generation failed: {str(e)}'}))
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, name='insta-post-stream', daemon=True).start()
+    
+    def stream():
+        yield sse_message('stage', {'stage': 'queued', 'status': 'started'})
+        while True:
+            try:
+                item = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            if item is None:
+                return
+            yield sse_message(*item)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/generate-insta-image/<int:post_id>', methods=['POST'])
 @login_required
 def generate_insta_image(post_id):
@@ -866,16 +1253,15 @@ def generate_insta_image(post_id):
         # Retrieve post from database
         db = get_db()
         cursor = db.execute('''
-            SELECT logo_base64, character_base64, final_prompt, status 
+            SELECT logo_hash, character_hash, final_prompt, status 
             FROM insta_posts WHERE id = ?
         ''', (post_id,))
         row = cursor.fetchone()
-        db.close()
         
         if not row:
             return jsonify({'error': 'Post not found'}), 404
         
-        logo_b64, character_b64, original_prompt, status = row
+        logo_hash, character_hash, original_prompt, status = row
         
         # If prompt was updated, use the new one
         final_prompt = updated_prompt if updated_prompt else original_prompt
@@ -883,26 +1269,25 @@ def generate_insta_image(post_id):
         if not final_prompt:
             return jsonify({'error': 'No prompt available for this post'}), 400
         
-        # Decode images from base64
-        logo_bytes = base64.b64decode(logo_b64)
-        character_bytes = base64.b64decode(character_b64)
+        if not logo_hash or not character_hash:
+            return jsonify({'error': 'Stored images not found for this post'}), 404
         
         # Update status to processing
         db = get_db()
         db.execute('UPDATE insta_posts SET status = ?, final_prompt = ? WHERE id = ?', 
                    ('processing', final_prompt, post_id))
         db.commit()
-        db.close()
         
         print(f"[Insta Image] Starting image generation for post {post_id}")
         
-        # Start background image generation
-        thread = Thread(
-            target=generate_insta_image_background,
-            args=(post_id, final_prompt, logo_bytes, character_bytes)
-        )
-        thread.daemon = True
-        thread.start()
+        # Queue background image generation
+        try:
+            executor.submit('insta_image', post_id=post_id, final_prompt=final_prompt)
+        except QueueFull as e:
+            db.execute('UPDATE insta_posts SET status = ?, final_prompt = ? WHERE id = ?',
+                       (status, original_prompt, post_id))
+            db.commit()
+            return busy_response(e)
         
         return jsonify({
             'id': post_id,
@@ -916,27 +1301,56 @@ def generate_insta_image(post_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def generate_insta_image_background(post_id, final_prompt, logo_bytes, character_bytes):
-    """Background task to generate images for Instagram post"""
-    db = None
+def mark_insta_post_failed(post_id, error):
+    """Record a failed Instagram post generation"""
     try:
-        print(f"[Background Image] Starting for post {post_id}")
-        
-        # Upload images to Cloudinary for KIE API
-        logo_url = cloudinary_upload_bytes(logo_bytes, filename="logo.png", folder="kie-inputs")
-        char_url = cloudinary_upload_bytes(character_bytes, filename="character.png", folder="kie-inputs")
-        
-        print(f"[Background Image] Images uploaded - Logo: {logo_url}, Character: {char_url}")
-        
-        # Generate images using KIE API
-        task_id = kie_create_flux2_pro_i2i_task(
-            prompt=final_prompt,
-            input_urls=[logo_url, char_url],
-            aspect_ratio="1:1",
-            quality="medium"
-        )
-        
-        print(f"[Background Image] KIE task created: {task_id}")
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts 
+                SET status = 'failed',
+                    error_message = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (str(error), post_id))
+            db.commit()
+    except Exception as db_error:
+        print(f'Error updating database: {db_error}')
+
+@job_handler('insta_image', on_abandon=lambda payload, error: mark_insta_post_failed(payload['post_id'], error))
+def generate_insta_image_background(job, post_id, final_prompt):
+    """Background job to generate images for Instagram post"""
+    try:
+        print(f"[Background Image] Starting for post {post_id} (attempt {job.attempts})")
+        
+        # A previous attempt may already have created the KIE task - resume polling it
+        task_id = job.checkpoint.get('kie_task_id')
+        
+        if not task_id:
+            with connection() as db:
+                row = db.execute('SELECT logo_hash, character_hash FROM insta_posts WHERE id = ?', (post_id,)).fetchone()
+                logo_bytes = get_blob(db, row['logo_hash']) if row else None
+                character_bytes = get_blob(db, row['character_hash']) if row else None
+            if not logo_bytes or not character_bytes:
+                raise RuntimeError('Stored images not found for this post')
+            
+            # Upload images to Cloudinary for KIE API
+            logo_url = cloudinary_upload_bytes(logo_bytes, folder="kie-inputs")
+            char_url = cloudinary_upload_bytes(character_bytes, folder="kie-inputs")
+            
+            print(f"[Background Image] Images uploaded - Logo: {logo_url}, Character: {char_url}")
+            
+            # Generate images using KIE API
+            task_id = kie_create_flux2_pro_i2i_task(
+                prompt=final_prompt,
+                input_urls=[logo_url, char_url],
+                aspect_ratio="1:1",
+                quality="medium"
+            )
+            job.save_checkpoint(kie_task_id=task_id)
+            
+            print(f"[Background Image] KIE task created: {task_id}")
+        else:
+            print(f"[Background Image] Resuming KIE task {task_id}")
         
         # Poll for result
         result_urls = kie_poll_task(task_id)
@@ -944,17 +1358,15 @@ def generate_insta_image_background(post_id, final_prompt, logo_bytes, character
         print(f"[Background Image] Images generated: {result_urls}")
         
         # Update database with generated images
-        db = get_db()
-        db.execute('''
-            UPDATE insta_posts 
-            SET status = 'completed',
-                generated_image_urls = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (json.dumps(result_urls), post_id))
-        db.commit()
-        db.close()
-        db = None
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts 
+                SET status = 'completed',
+                    generated_image_urls = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (json.dumps(result_urls), post_id))
+            db.commit()
         
         print(f"[Background Image] Post {post_id} completed successfully!")
         
@@ -964,27 +1376,351 @@ def generate_insta_image_background(post_id, final_prompt, logo_bytes, character
         traceback.print_exc()
         
         # Update database with error
+        mark_insta_post_failed(post_id, e)
+
+@app.route('/api/insta-post-batches', methods=['POST'])
+@login_required
+def create_insta_post_batch():
+    """Queue posts for many keyword / position rows that share one logo and character"""
+    if not OPENAI_API_KEY:
+        return jsonify({'error': 'OpenAI API key is not configured'}), 500
+    
+    # multipart form (items as a JSON string, optional logo/character files) or a JSON body
+    form = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    mode = (form.get('mode') or '').strip()
+    items = form.get('items')
+    try:
+        if isinstance(items, str):
+            items = json.loads(items)
+    except ValueError:
+        return jsonify({'error': 'items must be a JSON array'}), 400
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty JSON array'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'A batch can have at most {BATCH_MAX_ITEMS} items'}), 400
+    
+    # Hiring fields given next to items apply to every row that leaves them out
+    shared = {field: str(form.get(field) or '').strip() for field in ('experience', 'location', 'post')}
+    rows = []
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            return jsonify({'error': f'Item {index}: must be an object'}), 400
+        row = {
+            field: str(item.get(field) or shared.get(field, '')).strip()
+            for field in ('keyword', 'position', 'experience', 'location', 'post')
+        }
+        error = validate_insta_post_fields(mode=mode, **row)
+        if error:
+            return jsonify({'error': f'Item {index}: {error}'}), 400
+        rows.append(row)
+    
+    generate_images = str(form.get('generate_images', '1')).lower() not in ('0', 'false', 'no')
+    
+    logo = request.files.get('logo')
+    character = request.files.get('character')
+    logo_bytes = logo.read() if logo and logo.filename else None
+    character_bytes = character.read() if character and character.filename else None
+    
+    try:
+        db = get_db()
+        # The batch keeps the uploads (NULL = default image); every post references the same blobs
+        batch_logo_hash = put_blob(db, logo_bytes) if logo_bytes else None
+        batch_character_hash = put_blob(db, character_bytes) if character_bytes else None
+        logo_hash = batch_logo_hash or put_blob(db, default_logo.get_bytes())
+        character_hash = batch_character_hash or put_blob(db, default_character.get_bytes())
+        cursor = db.execute('''
+            INSERT INTO insta_post_batches (mode, total, generate_images, logo_hash, character_hash)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (mode, len(rows), int(generate_images), batch_logo_hash, batch_character_hash))
+        batch_id = cursor.lastrowid
+        post_ids = []
+        for row in rows:
+            cursor = db.execute('''
+                INSERT INTO insta_posts (
+                    keyword, mode, status, position, experience, location, post,
+                    logo_hash, character_hash, batch_id
+                ) VALUES (?, ?, 'processing', ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                row['keyword'], mode, row['position'], row['experience'], row['location'], row['post'],
+                logo_hash, character_hash, batch_id
+            ))
+            post_ids.append(cursor.lastrowid)
+        db.commit()
+        
         try:
-            if db:
-                db.close()
-            db = sqlite3.connect(DATABASE, check_same_thread=False)
+            executor.submit('insta_batch', batch_id=batch_id)
+        except QueueFull as e:
+            db.execute('DELETE FROM insta_posts WHERE batch_id = ?', (batch_id,))
+            db.execute('DELETE FROM insta_post_batches WHERE id = ?', (batch_id,))
+            release_blobs(db, logo_hash, character_hash)
+            db.commit()
+            return busy_response(e)
+        
+        print(f"[Batch] Queued batch {batch_id} with {len(rows)} {mode} posts")
+        
+        return jsonify({
+            'batch_id': batch_id,
+            'status': 'queued',
+            'total': len(rows),
+            'items': [
+                {'id': post_id, 'keyword': row['keyword'], 'position': row['position']}
+                for post_id, row in zip(post_ids, rows)
+            ],
+            'status_url': f'/api/insta-post-batches/{batch_id}'
+        }), 202
+    
+    except Exception as e:
+        print(f'Error creating batch: {e}')
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/insta-post-batches/<int:batch_id>', methods=['GET'])
+@login_required
+def get_insta_post_batch(batch_id):
+    """Batch status with the status of every post in it"""
+    try:
+        db = get_db()
+        batch = db.execute('''
+            SELECT id, mode, status, total, generate_images, error_message, created_at, updated_at
+            FROM insta_post_batches WHERE id = ?
+        ''', (batch_id,)).fetchone()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        rows = db.execute('''
+            SELECT id, keyword, position, status, title, error_message, generated_image_urls, updated_at
+            FROM insta_posts WHERE batch_id = ? ORDER BY id
+        ''', (batch_id,)).fetchall()
+        
+        items = []
+        counts = {}
+        for row in rows:
+            item = dict(row)
+            item['generated_image_urls'] = json.loads(row['generated_image_urls']) if row['generated_image_urls'] else []
+            items.append(item)
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        
+        data = dict(batch)
+        data['generate_images'] = bool(batch['generate_images'])
+        data['counts'] = counts
+        data['items'] = items
+        return jsonify(data)
+    
+    except Exception as e:
+        print(f'Error fetching batch: {e}')
+        return jsonify({'error': str(e)}), 500
+
+def mark_insta_batch_failed(batch_id, error):
+    """Fail a batch and every post in it that has not finished"""
+    try:
+        with connection() as db:
             db.execute('''
                 UPDATE insta_posts 
+                SET status = 'failed',
+                    error_message = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE batch_id = ? AND status = 'processing'
+            ''', (str(error), batch_id))
+            db.execute('''
+                UPDATE insta_post_batches 
                 SET status = 'failed',
                     error_message = ?,
                     updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
-            ''', (str(e), post_id))
+            ''', (str(error), batch_id))
             db.commit()
-            db.close()
-        except Exception as db_error:
-            print(f'Error updating database: {db_error}')
-    finally:
-        if db:
-            try:
-                db.close()
-            except:
-                pass
+    except Exception as db_error:
+        print(f'Error updating database: {db_error}')
+
+@job_handler('insta_batch', on_abandon=lambda payload, error: mark_insta_batch_failed(payload['batch_id'], error))
+def process_insta_batch(job, batch_id):
+    """Background job for a batch: shared analysis once, prompts fanned out, KIE tasks awaited together"""
+    with connection() as db:
+        batch = db.execute('''
+            SELECT mode, generate_images, logo_hash, character_hash FROM insta_post_batches WHERE id = ?
+        ''', (batch_id,)).fetchone()
+        if not batch:
+            raise JobFailed(f'Batch {batch_id} not found')
+        logo_bytes = get_blob(db, batch['logo_hash'])
+        character_bytes = get_blob(db, batch['character_hash'])
+        db.execute('''
+            UPDATE insta_post_batches SET status = 'running', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (batch_id,))
+        db.commit()
+    
+    print(f"[Batch] Starting batch {batch_id} (attempt {job.attempts})")
+    
+    # 1) Upload + colors + character description once for the whole batch
+    analysis = analyze_brand_assets(
+        logo_bytes=logo_bytes,
+        character_bytes=character_bytes,
+        api_key=OPENAI_API_KEY
+    )
+    
+    # 2) Concept / copy / final prompt per post; a retried job skips posts that already have one
+    with connection() as db:
+        pending = db.execute('''
+            SELECT id, keyword, position, experience, location, post FROM insta_posts
+            WHERE batch_id = ? AND status = 'processing' AND final_prompt IS NULL ORDER BY id
+        ''', (batch_id,)).fetchall()
+        # The shared analysis ran once, so its spans are stored once, on the batch's first post.
+        # Posts then get a 'batch_total' row, kept apart from single-post totals that include analysis.
+        first_post = db.execute('SELECT MIN(id) FROM insta_posts WHERE batch_id = ?', (batch_id,)).fetchone()[0]
+        if first_post is not None:
+            save_prompt_timings(db, first_post, analysis.get('_timings'), total_stage='batch_analysis')
+            db.commit()
+    
+    # Posts whose prompt hit a transient OpenAI error stay 'processing' and are retried with the job
+    # (unless this is its last attempt)
+    transient_failures = []
+    
+    def prompt_post(row):
+        timings = StageTimings()
+        try:
+            result = run_prompt_pipeline(
+                keyword=row['keyword'],
+                banner_mode=batch['mode'],
+                logo_bytes=logo_bytes,
+                character_bytes=character_bytes,
+                api_key=OPENAI_API_KEY,
+                position=row['position'],
+                experience=row['experience'],
+                location=row['location'],
+                post=row['post'],
+                analysis=analysis,
+                timings=timings
+            )
+        except Exception as e:
+            print(f"[Batch] Prompt failed for post {row['id']}: {e}")
+            with connection() as db:
+                save_prompt_timings(db, row['id'], timings.summary(), total_stage='batch_total', status='error')
+                db.commit()
+            if is_transient_llm_error(e) and not job.is_last_attempt:
+                transient_failures.append((row['id'], e))
+            else:
+                mark_insta_post_failed(row['id'], e)
+            return
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts 
+                SET status = 'pending_image',
+                    primary_hex = ?,
+                    secondary_hex = ?,
+                    concept = ?,
+                    title = ?,
+                    subtitle = ?,
+                    address_line = ?,
+                    final_prompt = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (
+                result.get('primary_hex'),
+                result.get('secondary_hex'),
+                result.get('concept'),
+                result.get('title'),
+                result.get('subtitle'),
+                result.get('address_line'),
+                result.get('final_prompt'),
+                row['id']
+            ))
+            save_prompt_timings(db, row['id'], result.get('_timings'), total_stage='batch_total')
+            db.commit()
+    
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix=f'batch-{batch_id}') as pool:
+        list(pool.map(prompt_post, pending))
+    
+    print(f"[Batch] Prompts done for batch {batch_id}")
+    
+    if batch['generate_images']:
+        generate_insta_batch_images(job, batch_id, [analysis['logo_url'], analysis['character_url']])
+    
+    if transient_failures:
+        # The retried job only re-prompts these posts; posts that already have a prompt are skipped
+        post_id, error = transient_failures[0]
+        raise Exception(f'{len(transient_failures)} prompt(s) failed transiently (post {post_id}: {error})')
+    
+    return finish_insta_batch(batch_id)
+
+def generate_insta_batch_images(job, batch_id, input_urls):
+    """Create a KIE task for every prompted post of the batch, then wait for all of them on the shared poller"""
+    with connection() as db:
+        ready = db.execute('''
+            SELECT id, final_prompt FROM insta_posts
+            WHERE batch_id = ? AND status IN ('pending_image', 'processing') AND final_prompt IS NOT NULL
+            ORDER BY id
+        ''', (batch_id,)).fetchall()
+    
+    # post id -> KIE task id, checkpointed so a retried job polls instead of creating duplicates
+    tasks = dict(job.checkpoint.get('kie_tasks', {}))
+    checkpoint_lock = threading.Lock()
+    
+    def create_task(row):
+        if str(row['id']) in tasks:
+            return
+        try:
+            task_id = kie_create_flux2_pro_i2i_task(
+                prompt=row['final_prompt'],
+                input_urls=input_urls,
+                aspect_ratio="1:1",
+                quality="medium"
+            )
+        except Exception as e:
+            print(f"[Batch] KIE task creation failed for post {row['id']}: {e}")
+            mark_insta_post_failed(row['id'], e)
+            return
+        with checkpoint_lock:
+            tasks[str(row['id'])] = task_id
+            job.save_checkpoint(kie_tasks=tasks)
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts SET status = 'processing', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', (row['id'],))
+            db.commit()
+    
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix=f'batch-{batch_id}-kie') as pool:
+        list(pool.map(create_task, ready))
+    
+    ready_ids = {str(row['id']) for row in ready}
+    futures = {
+        kie_poller.watch(task_id): int(post_id)
+        for post_id, task_id in tasks.items() if post_id in ready_ids
+    }
+    print(f"[Batch] Waiting for {len(futures)} KIE tasks of batch {batch_id}")
+    
+    for future in as_completed(futures):
+        post_id = futures[future]
+        try:
+            result_urls = future.result()
+        except Exception as e:
+            print(f"[Batch] Image generation failed for post {post_id}: {e}")
+            mark_insta_post_failed(post_id, e)
+            continue
+        with connection() as db:
+            db.execute('''
+                UPDATE insta_posts 
+                SET status = 'completed',
+                    generated_image_urls = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (json.dumps(result_urls), post_id))
+            db.commit()
+
+def finish_insta_batch(batch_id):
+    """Close the batch ('failed' only when every post failed) and return its per-status counts"""
+    with connection() as db:
+        counts = {
+            row['status']: row['n'] for row in db.execute('''
+                SELECT status, COUNT(*) AS n FROM insta_posts WHERE batch_id = ? GROUP BY status
+            ''', (batch_id,))
+        }
+        status = 'failed' if counts and set(counts) == {'failed'} else 'completed'
+        db.execute('''
+            UPDATE insta_post_batches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (status, batch_id))
+        db.commit()
+    print(f"[Batch] Batch {batch_id} {status}: {counts}")
+    return {'batch_id': batch_id, 'status': status, 'counts': counts}
 
 @app.route('/api/generate-prompt', methods=['POST'])
 @login_required
@@ -1028,19 +1764,19 @@ def generate_prompt():
             if not post:
                 return jsonify({'error': 'post is required in HIRING mode'}), 400
         
-        # If missing uploads, download default Cloudinary images as bytes
+        # Missing uploads fall back to the default images; the pipeline uses their URLs directly
         if logo_file and logo_file.filename:
             logo_bytes = logo_file.read()
             logo_used = "uploaded"
         else:
-            logo_bytes = download_bytes(DEFAULT_LOGO_URL)
+            logo_bytes = None
             logo_used = "default_url"
         
         if character_file and character_file.filename:
             character_bytes = character_file.read()
             character_used = "uploaded"
         else:
-            character_bytes = download_bytes(DEFAULT_CHARACTER_URL)
+            character_bytes = None
             character_used = "default_url"
         
         print(f"Logo source: {logo_used} | Character source: {character_used}")
@@ -1071,7 +1807,7 @@ def generate_prompt():
 @app.route('/api/generate-image', methods=['POST'])
 @login_required
 def generate_image():
-    """Generate image using Flux2 Pro image-to-image model from KIE.ai"""
+    """Queue a Flux2 Pro image-to-image generation on KIE.ai and return a task handle"""
     try:
         if not KIE_API_KEY:
             return jsonify({'error': 'KIE_API_KEY is not configured'}), 500
@@ -1081,97 +1817,170 @@ def generate_image():
             return jsonify({'error': 'final_prompt is required'}), 400
         
         post_id = request.form.get('post_id')
-        logo_bytes = None
-        character_bytes = None
+        logo_hash = None
+        character_hash = None
         logo_source = "unknown"
         char_source = "unknown"
+        db = get_db()
         
-        # If post_id is provided, retrieve stored images from database
+        # If post_id is provided, reuse the images stored with the post
         if post_id:
-            try:
-                db = get_db()
-                cursor = db.execute('SELECT logo_base64, character_base64 FROM insta_posts WHERE id = ?', (post_id,))
-                row = cursor.fetchone()
-                db.close()
-                
-                if not row or not row[0] or not row[1]:
-                    return jsonify({'error': 'Post or stored images not found'}), 404
-                
-                # Decode base64 to bytes
-                logo_bytes = base64.b64decode(row[0])
-                character_bytes = base64.b64decode(row[1])
-                logo_source = "database"
-                char_source = "database"
-            except Exception as e:
-                return jsonify({'error': f'Failed to retrieve stored images: {str(e)}'}), 400
+            row = db.execute('SELECT logo_hash, character_hash FROM insta_posts WHERE id = ?', (post_id,)).fetchone()
+            if not row or not row['logo_hash'] or not row['character_hash']:
+                return jsonify({'error': 'Post or stored images not found'}), 404
+            logo_hash, character_hash = row['logo_hash'], row['character_hash']
+            logo_source = "database"
+            char_source = "database"
+            # Keep them even if the post is deleted while the task is queued
+            hold_blobs(db, logo_hash, character_hash)
+            db.commit()
         else:
-            # Get images from request files (OPTIONAL now)
+            # Get images from request files (OPTIONAL); missing ones fall back to the defaults in the job
             logo_file = request.files.get('logo')
             character_file = request.files.get('character')
             
-            # If missing uploads, use defaults from Cloudinary
             if logo_file and logo_file.filename:
-                logo_bytes = logo_file.read()
+                logo_hash = put_blob(db, logo_file.read(), hold=True)
                 logo_source = "uploaded"
             else:
-                logo_bytes = download_bytes(DEFAULT_LOGO_URL)
                 logo_source = "default_url"
             
             if character_file and character_file.filename:
-                character_bytes = character_file.read()
+                character_hash = put_blob(db, character_file.read(), hold=True)
                 char_source = "uploaded"
             else:
-                character_bytes = download_bytes(DEFAULT_CHARACTER_URL)
                 char_source = "default_url"
+            db.commit()
         
         aspect_ratio = (request.form.get('aspect_ratio') or '1:1').strip()
         quality = (request.form.get('quality') or 'medium').strip()
         
-        # Upload to Cloudinary first, then use URLs for KIE.ai
-        if post_id:
-            logo_url = cloudinary_upload_bytes(logo_bytes, filename="logo.png", folder="kie-inputs")
-            char_url = cloudinary_upload_bytes(character_bytes, filename="character.png", folder="kie-inputs")
-        else:
-            logo_filename = logo_file.filename if (logo_file and logo_file.filename) else "logo.png"
-            char_filename = character_file.filename if (character_file and character_file.filename) else "character.png"
-            
-            logo_url = cloudinary_upload_bytes(logo_bytes, filename=logo_filename, folder="kie-inputs")
-            char_url = cloudinary_upload_bytes(character_bytes, filename=char_filename, folder="kie-inputs")
+        try:
+            task_id = executor.submit(
+                'image',
+                final_prompt=final_prompt,
+                logo_hash=logo_hash,
+                character_hash=character_hash,
+                aspect_ratio=aspect_ratio,
+                quality=quality,
+                logo_source=logo_source,
+                char_source=char_source
+            )
+        except QueueFull as e:
+            release_blob_holds(db, logo_hash, character_hash)
+            db.commit()
+            return busy_response(e)
+        
+        print(f"[Image] Queued image task {task_id} (logo: {logo_source}, character: {char_source})")
+        return jsonify({
+            'task_id': task_id,
+            'status': 'queued',
+            'status_url': f'/api/tasks/{task_id}'
+        }), 202
+        
+    except Exception as e:
+        print(f'Error in /api/generate-image: {e}')
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'Server error generating image', 'details': str(e)}), 500
+
+def release_image_inputs(logo_hash=None, character_hash=None):
+    """Give back an image task's holds on its input blobs (called once: on success or from on_abandon)"""
+    try:
+        with connection() as db:
+            release_blob_holds(db, logo_hash, character_hash)
+            db.commit()
+    except Exception as e:
+        print(f'Error releasing image inputs: {e}')
+
+@job_handler('image', on_abandon=lambda payload, error: release_image_inputs(payload.get('logo_hash'), payload.get('character_hash')))
+def generate_image_background(job, final_prompt, logo_hash=None, character_hash=None, aspect_ratio='1:1',
+                              quality='medium', logo_source='unknown', char_source='unknown'):
+    """Background job for /api/generate-image; the returned dict becomes the task result"""
+    # A previous attempt may already have created the KIE task - resume polling it
+    task_id = job.checkpoint.get('kie_task_id')
+    logo_url = job.checkpoint.get('logo_url')
+    char_url = job.checkpoint.get('character_url')
+    
+    if not task_id:
+        with connection() as db:
+            logo_bytes = get_blob(db, logo_hash) if logo_hash else None
+            character_bytes = get_blob(db, character_hash) if character_hash else None
+        if (logo_hash and not logo_bytes) or (character_hash and not character_bytes):
+            raise JobFailed('Stored images not found')
+        
+        # Upload to Cloudinary first (skipped when the same bytes were uploaded before), then use URLs for KIE.ai.
+        # The defaults are already public, so their URLs are passed through as-is.
+        logo_url = cloudinary_upload_bytes(logo_bytes, folder="kie-inputs") if logo_bytes else DEFAULT_LOGO_URL
+        char_url = cloudinary_upload_bytes(character_bytes, folder="kie-inputs") if character_bytes else DEFAULT_CHARACTER_URL
         
         print(f"✅ Using logo_url: {logo_url} | source: {logo_source}")
         print(f"✅ Using char_url: {char_url} | source: {char_source}")
         
-        # Create task
         task_id = kie_create_flux2_pro_i2i_task(
             prompt=final_prompt,
             input_urls=[logo_url, char_url],
             aspect_ratio=aspect_ratio,
             quality=quality
         )
-        
-        # Poll for result
+        job.save_checkpoint(kie_task_id=task_id, logo_url=logo_url, character_url=char_url)
+    else:
+        print(f"[Image] Resuming KIE task {task_id} for image task {job.id}")
+    
+    try:
         result_urls = kie_poll_task(task_id)
-        
-        print("✅ Generation successful! Result URLs:", result_urls)
-        return jsonify({
-            'task_id': task_id,
-            'image_urls': result_urls,  # Frontend expects 'image_urls'
-            'final_prompt': final_prompt,
-            'status': 'completed',
-            'logo_url_used': logo_url,
-            'character_url_used': char_url,
-            '_logo_source': logo_source,
-            '_character_source': char_source
-        }), 200
-        
-    except TimeoutError as e:
-        print(f'Image generation timeout: {e}')
-        return jsonify({'error': 'Image generation timed out', 'details': str(e)}), 500
+    except (RuntimeError, TimeoutError) as e:
+        # KIE reported failure or never finished - polling the same task again will not help
+        raise JobFailed(str(e)) from e
+    
+    release_image_inputs(logo_hash, character_hash)
+    print("✅ Generation successful! Result URLs:", result_urls)
+    return {
+        'kie_task_id': task_id,
+        'image_urls': result_urls,  # Frontend expects 'image_urls'
+        'final_prompt': final_prompt,
+        'logo_url_used': logo_url,
+        'character_url_used': char_url,
+        '_logo_source': logo_source,
+        '_character_source': char_source
+    }
+
+@app.route('/api/tasks/<int:task_id>', methods=['GET'])
+@login_required
+def get_task(task_id):
+    """Status of a background task; answers at once unless ?wait=N opts in to long-polling up to N seconds"""
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0), TASK_MAX_WAIT)
+        deadline = time.time() + wait
+        while True:
+            task = executor.status(task_id)
+            if task is None:
+                return jsonify({'error': 'Task not found'}), 404
+            if task['status'] in ('done', 'failed') or time.time() >= deadline:
+                return jsonify(task)
+            time.sleep(TASK_WAIT_INTERVAL)
     except Exception as e:
-        print(f'Error in /api/generate-image: {e}')
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': 'Server error generating image', 'details': str(e)}), 500
+        print(f'Error fetching task {task_id}: {e}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics of every process sharing PROMETHEUS_MULTIPROC_DIR"""
+    token_ok = bool(METRICS_TOKEN) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'
+    )
+    if not (METRICS_PUBLIC or token_ok or 'user' in session):
+        return jsonify({'error': 'Unauthorized'}), 401
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+# Warm the default images so the first post using them does not wait on Cloudinary
+preload(default_logo, default_character)
+
+# Run job workers inside the web process unless worker.py drains the queue separately
+if os.getenv('JOB_WORKERS_IN_WEB', '1') == '1':
+    executor.start()
+    start_video_callback_watchdog()
 
 if __name__ == '__main__':
     print('🚀 IV Studio AI Video Generator - Starting Server...')
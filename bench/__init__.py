@@ -0,0 +1,12 @@
+"""
+End-to-end load test of the Flask API against the fake_upstream servers.
+
+    python -m bench run --profile fast --duration 60 --users insta_post=4,insta_image=2,poll_posts=8,projects=1
+    python -m bench compare bench/results/<old>.json bench/results/<new>.json
+
+Each run starts the fakes and the app in one process on a fresh database,
+drives the chosen scenarios with closed-loop virtual users and writes a
+JSON result (p50/p95/p99 latency and throughput per endpoint and per
+end-to-end operation, SQLite lock waits, thread counts, job queue and
+upstream stats) named after the current commit.
+"""
@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+
+from . import report
+from .scenarios import SCENARIOS
+
+# Users per scenario when --users is not given
+DEFAULT_USERS = "insta_post=2,insta_image=2,poll_posts=4,projects=1"
+
+
+def _parse_users(spec: str, default: int) -> dict:
+    users = {}
+    for part in spec.split(","):
+        name, _, count = part.strip().partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        users[name] = int(count) if count else default
+    return users
+
+
+def _parse_env(pairs) -> dict:
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"Bad --env {pair!r}, expected KEY=VALUE")
+        env[key] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Load-test the IV Studio API offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run a benchmark and save its results")
+    run_parser.add_argument("--users", default=DEFAULT_USERS,
+                            help=f"scenario=count list (scenarios: {', '.join(SCENARIOS)})")
+    run_parser.add_argument("--concurrency", type=int, default=2, help="users for scenarios listed without a count")
+    run_parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    run_parser.add_argument("--think-time", type=float, default=0.0, help="pause between a user's iterations")
+    run_parser.add_argument("--profile", default="fast", help="fake_upstream profile")
+    run_parser.add_argument("--set", dest="overrides", action="append", default=[],
+                            metavar="SERVICE.FIELD=VALUE", help="fake_upstream profile override")
+    run_parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                            help="app setting for this run, e.g. JOB_WORKERS=16")
+    run_parser.add_argument("--video-callbacks", action="store_true", help="use the n8n callback mode")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--out", help="result file (default bench/results/<commit>-<timestamp>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        report.compare(report.load(args.baseline), report.load(args.candidate))
+        return
+
+    from fake_upstream import parse_overrides
+    from .harness import REPO_ROOT, run
+
+    out = os.path.abspath(args.out) if args.out else None
+    results = run(
+        _parse_users(args.users, args.concurrency),
+        duration=args.duration,
+        warmup=args.warmup,
+        profile=args.profile,
+        overrides=parse_overrides(args.overrides),
+        app_env=_parse_env(args.env),
+        video_callbacks=args.video_callbacks,
+        think_time=args.think_time,
+        seed=args.seed,
+    )
+    report.print_summary(results)
+    path = report.save(results, out, directory=os.path.join(REPO_ROOT, "bench", "results"))
+    print(f"\nResults written to {path}")
+    # Abandoned virtual users and job threads are daemons; don't wait for them
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import logging
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from .instrumentation import ThreadSampler, db_stats, instrument_sqlite, percentile
+from .scenarios import SCENARIOS, Client
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _latency_summary(seconds: list) -> dict:
+    values = sorted(seconds)
+    summary = {name: percentile(values, pct) for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))}
+    summary["max"] = values[-1] if values else None
+    summary["mean"] = sum(values) / len(values) if values else None
+    return {name: round(value * 1000, 2) if value is not None else None for name, value in summary.items()}
+
+
+class Recorder:
+    """Per-request and end-to-end samples, collected only while recording is on (after warmup)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recording = False
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.operations = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+    def record(self, name: str, seconds: float, status=None, error=None):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][str(status) if status is not None else error] += 1
+
+    def record_operation(self, name: str, seconds: float, outcome: str):
+        if not self.recording:
+            return
+        with self._lock:
+            self.operations[name].append(seconds)
+            self.outcomes[name][outcome] += 1
+
+    def summary(self, duration: float) -> dict:
+        with self._lock:
+            requests = {}
+            for name, seconds in sorted(self.latencies.items()):
+                statuses = dict(self.statuses[name])
+                errors = sum(n for status, n in statuses.items() if status[:1] not in ("2", "3"))
+                requests[name] = {
+                    "count": len(seconds),
+                    "errors": errors,
+                    "throughput_rps": round(len(seconds) / duration, 2),
+                    "latency_ms": _latency_summary(seconds),
+                    "statuses": statuses,
+                }
+            operations = {
+                name: {
+                    "count": len(seconds),
+                    "throughput_per_min": round(len(seconds) / duration * 60, 2),
+                    "duration_ms": _latency_summary(seconds),
+                    "outcomes": dict(self.outcomes[name]),
+                }
+                for name, seconds in sorted(self.operations.items())
+            }
+        return {"requests": requests, "operations": operations}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, timeout=30
+        ).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def start_stack(profile: str, overrides: dict, app_env: dict, video_callbacks: bool):
+    """
+    Start the fake upstreams and the app (on a fresh database in a temp
+    directory) in this process. Returns (app module, base_url, services, server).
+    """
+    import fake_upstream
+    from werkzeug.serving import make_server
+
+    services = fake_upstream.start_all(profile, overrides=overrides)
+    port = _free_port()
+    env = fake_upstream.env_for(services)
+    if video_callbacks:
+        env.update(N8N_CALLBACK_SECRET="bench-secret", N8N_CALLBACK_BASE_URL=f"http://127.0.0.1:{port}")
+    env.update(app_env)
+    os.environ.update(env)
+
+    # Relative paths (iv_studio.db, iv_cache.db, .asset_cache) land in the temp dir
+    os.chdir(tempfile.mkdtemp(prefix="iv-bench-"))
+    instrument_sqlite()
+    sys.path.insert(0, REPO_ROOT)
+    import app
+
+    # One access-log line per request would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-http", daemon=True).start()
+    return app, f"http://127.0.0.1:{port}", services, server
+
+
+def run(
+    scenarios: dict,
+    *,
+    duration: float = 30,
+    warmup: float = 5,
+    profile: str = "fast",
+    overrides: dict | None = None,
+    app_env: dict | None = None,
+    video_callbacks: bool = False,
+    think_time: float = 0.0,
+    seed: int = 1,
+) -> dict:
+    """
+    Drive the app with len(users) closed-loop virtual users per scenario
+    ({"insta_post": 4, ...}) for warmup + duration seconds and return the
+    results document.
+    """
+    app, base_url, services, server = start_stack(profile, overrides or {}, app_env or {}, video_callbacks)
+    from jobs import executor
+
+    recorder = Recorder()
+    stop = threading.Event()
+    credentials = {"email": app.USER_CREDENTIALS["email"], "password": app.USER_CREDENTIALS["password"]}
+
+    def user(scenario, index):
+        client = Client(base_url, recorder, credentials, seed=seed * 1000 + index)
+        while not stop.is_set():
+            try:
+                SCENARIOS[scenario](client)
+            except Exception as e:
+                recorder.record(f"{scenario} (exception)", 0.0, error=type(e).__name__)
+                time.sleep(1)
+            if think_time:
+                stop.wait(think_time)
+
+    threads = []
+    for scenario, count in scenarios.items():
+        for _ in range(count):
+            thread = threading.Thread(
+                target=user, args=(scenario, len(threads)), name=f"bench-user-{scenario}", daemon=True
+            )
+            threads.append(thread)
+            thread.start()
+
+    time.sleep(warmup)
+    sampler = ThreadSampler().start()
+    recorder.recording = db_stats.recording = True
+    started = time.perf_counter()
+    time.sleep(duration)
+    recorder.recording = db_stats.recording = False
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    stop.set()
+    for thread in threads:
+        # Users blocked in a long poll are abandoned; their samples are no longer recorded
+        thread.join(timeout=5)
+
+    results = {
+        "meta": {
+            **_git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "profile": profile,
+            "overrides": overrides or {},
+            "app_env": app_env or {},
+            "video_callbacks": video_callbacks,
+            "scenarios": scenarios,
+            "duration_s": round(elapsed, 2),
+            "warmup_s": warmup,
+            "think_time_s": think_time,
+            "seed": seed,
+        },
+        **recorder.summary(elapsed),
+        "db": db_stats.summary(),
+        "threads": sampler.summary(),
+        "jobs": executor.stats(),
+        "upstream": {name: service.stats() for name, service in services.items()},
+    }
+    server.shutdown()
+    return results
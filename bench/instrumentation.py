@@ -0,0 +1,150 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# A write that takes longer than this was almost certainly waiting on the SQLite write lock
+LOCK_WAIT_THRESHOLD = 0.005
+
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|BEGIN)", re.IGNORECASE)
+
+
+def percentile(sorted_values: list, pct: float):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class DbStats:
+    """
+    Timings of SQLite writes and commits on every connection the app opens.
+
+    SQLite does not report how long it waited for the write lock, so writes
+    and commits slower than LOCK_WAIT_THRESHOLD are counted as lock waits;
+    "database is locked" errors are counted separately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recording = False
+        self.write_times = []
+        self.lock_waits = 0
+        self.lock_wait_seconds = 0.0
+        self.locked_errors = 0
+
+    def observe(self, seconds: float):
+        if not self.recording:
+            return
+        with self._lock:
+            self.write_times.append(seconds)
+            if seconds >= LOCK_WAIT_THRESHOLD:
+                self.lock_waits += 1
+                self.lock_wait_seconds += seconds
+
+    def observe_locked(self):
+        with self._lock:
+            self.locked_errors += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            times = sorted(self.write_times)
+            return {
+                "writes": len(times),
+                "lock_waits": self.lock_waits,
+                "lock_wait_seconds": round(self.lock_wait_seconds, 3),
+                "locked_errors": self.locked_errors,
+                "lock_wait_threshold_ms": LOCK_WAIT_THRESHOLD * 1000,
+                "write_ms": {
+                    name: round(percentile(times, pct) * 1000, 3) if times else None
+                    for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))
+                },
+            }
+
+
+db_stats = DbStats()
+
+
+class TimedConnection(sqlite3.Connection):
+    def _timed(self, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e):
+                db_stats.observe_locked()
+            raise
+        finally:
+            db_stats.observe(time.perf_counter() - started)
+
+    def execute(self, sql, *args):
+        if _WRITE_STATEMENT.match(sql):
+            return self._timed(super().execute, sql, *args)
+        return super().execute(sql, *args)
+
+    def commit(self):
+        return self._timed(super().commit)
+
+
+def instrument_sqlite():
+    """Make every sqlite3.connect() in this process return a TimedConnection (on top of its own factory)."""
+    real_connect = sqlite3.connect
+    if getattr(real_connect, "_bench_instrumented", False):
+        return
+    factories = {}
+
+    def connect(*args, **kwargs):
+        base = kwargs.get("factory", sqlite3.Connection)
+        if base not in factories:
+            factories[base] = type(f"Bench{base.__name__}", (TimedConnection, base), {})
+        kwargs["factory"] = factories[base]
+        return real_connect(*args, **kwargs)
+
+    connect._bench_instrumented = True
+    sqlite3.connect = connect
+
+
+class ThreadSampler:
+    """Samples the process thread count (grouped by thread name) at a fixed interval."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.samples = []
+        self.peak = 0
+        self.peak_by_name = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _group(name: str) -> str:
+        # "Thread-12 (process_request_thread)" and "batch-3_0" collapse into one group each
+        return re.sub(r"[-_]\d+", "", name) or name
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="bench-thread-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            threads = threading.enumerate()
+            self.samples.append(len(threads))
+            if len(threads) > self.peak:
+                self.peak = len(threads)
+                self.peak_by_name = dict(Counter(self._group(t.name) for t in threads))
+
+    def summary(self) -> dict:
+        return {
+            "peak": self.peak,
+            "mean": round(sum(self.samples) / len(self.samples), 1) if self.samples else None,
+            "final": threading.active_count(),
+            "at_peak": dict(sorted(self.peak_by_name.items(), key=lambda item: -item[1])),
+        }
@@ -0,0 +1,79 @@
+import json
+import os
+
+
+def save(results: dict, path: str | None = None, directory: str = "bench/results") -> str:
+    """Write results as JSON (default name: <commit>-<timestamp>.json) and return the path."""
+    if path is None:
+        meta = results["meta"]
+        stamp = meta["timestamp"].replace(":", "").replace("-", "")
+        commit = (meta.get("commit") or "nocommit") + ("-dirty" if meta.get("dirty") else "")
+        path = os.path.join(directory, f"{commit}-{stamp}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_summary(results: dict):
+    meta = results["meta"]
+    print(f"\ncommit {meta['commit']}{' (dirty)' if meta['dirty'] else ''} | profile {meta['profile']} | "
+          f"{meta['duration_s']}s | users {meta['scenarios']}")
+    print(f"\n{'request':<40}{'count':>7}{'err':>6}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["requests"].items():
+        latency = stats["latency_ms"]
+        print(f"{name:<40}{stats['count']:>7}{stats['errors']:>6}{stats['throughput_rps']:>8}"
+              f"{_fmt(latency['p50']):>10}{_fmt(latency['p95']):>10}{_fmt(latency['p99']):>10}")
+    if results["operations"]:
+        print(f"\n{'operation':<40}{'count':>7}{'/min':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  outcomes")
+        for name, stats in results["operations"].items():
+            duration = stats["duration_ms"]
+            print(f"{name:<40}{stats['count']:>7}{stats['throughput_per_min']:>8}"
+                  f"{_fmt(duration['p50']):>10}{_fmt(duration['p95']):>10}{_fmt(duration['p99']):>10}  {stats['outcomes']}")
+    db = results["db"]
+    print(f"\ndb: {db['writes']} writes, {db['lock_waits']} lock waits ({db['lock_wait_seconds']}s), "
+          f"{db['locked_errors']} 'database is locked' errors, write p99 {_fmt(db['write_ms']['p99'])} ms")
+    threads = results["threads"]
+    print(f"threads: peak {threads['peak']}, mean {threads['mean']} | at peak: {threads['at_peak']}")
+
+
+def compare(baseline: dict, candidate: dict):
+    """Print p50/p95/p99 and throughput of candidate against baseline, per request and operation."""
+    print(f"baseline  {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print(f"candidate {candidate['meta']['commit']} ({candidate['meta']['timestamp']})\n")
+    for section, latency_key, rate_key in (
+        ("requests", "latency_ms", "throughput_rps"),
+        ("operations", "duration_ms", "throughput_per_min"),
+    ):
+        names = sorted(set(baseline.get(section, {})) | set(candidate.get(section, {})))
+        for name in names:
+            before = baseline.get(section, {}).get(name)
+            after = candidate.get(section, {}).get(name)
+            if not before or not after:
+                print(f"{name}: only in {'candidate' if after else 'baseline'}")
+                continue
+            cells = [
+                f"{key} {_fmt(before[latency_key][key])} -> {_fmt(after[latency_key][key])} ms"
+                f" ({_delta(before[latency_key][key], after[latency_key][key])})"
+                for key in ("p50", "p95", "p99")
+            ]
+            cells.append(f"{rate_key} {before[rate_key]} -> {after[rate_key]} ({_delta(before[rate_key], after[rate_key])})")
+            print(f"{name}\n    " + "\n    ".join(cells))
+    for key in ("lock_waits", "locked_errors"):
+        print(f"db {key}: {baseline['db'][key]} -> {candidate['db'][key]}")
+    print(f"peak threads: {baseline['threads']['peak']} -> {candidate['threads']['peak']}")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def _delta(before, after) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
@@ -0,0 +1,126 @@
+import random
+import time
+
+import requests
+
+# Browser-like polling interval for the end-to-end scenarios
+POLL_INTERVAL = 1.0
+# Give up on an end-to-end operation after this long
+OPERATION_TIMEOUT = 600
+
+KEYWORDS = [
+    "CRM Software", "ERP Solutions", "Mobile Apps", "UI/UX Design", "Digital Marketing",
+    "Cloud Migration", "E-commerce", "Data Analytics", "Custom Software", "SEO Services",
+]
+POSITIONS = [
+    ("Python Developer", "2-4 years"), ("Flutter Developer", "1-3 years"),
+    ("UI/UX Designer", "3+ years"), ("QA Engineer", "1-2 years"), ("Business Analyst", "2+ years"),
+]
+
+
+class Client:
+    """One virtual user: a logged-in HTTP session that records every call."""
+
+    def __init__(self, base_url: str, recorder, credentials: dict, seed: int):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+        # path -> last ETag, for the revalidating list reads
+        self.etags = {}
+        self.session = requests.Session()
+        self.session.post(f"{base_url}/api/login", json=credentials, timeout=30).raise_for_status()
+
+    def call(self, name: str, method: str, path: str, **kwargs):
+        """Timed request; returns the response, or None on a connection error / timeout."""
+        kwargs.setdefault("timeout", 120)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(name, time.perf_counter() - started, error=type(e).__name__)
+            return None
+        self.recorder.record(name, time.perf_counter() - started, status=response.status_code)
+        if response.status_code == 503:
+            # Job queue full: back off like the UI would before trying again
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+        return response
+
+    def wait_for(self, name: str, path: str) -> str:
+        """Poll a project / post with ETag revalidation until it completes or fails."""
+        etag = None
+        deadline = time.time() + OPERATION_TIMEOUT
+        status = "timeout"
+        while time.time() < deadline:
+            headers = {"If-None-Match": etag} if etag else {}
+            response = self.call(name, "GET", path, headers=headers)
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get("ETag")
+                status = response.json().get("status")
+                if status in ("completed", "failed"):
+                    return status
+            time.sleep(POLL_INTERVAL)
+        return status
+
+    def post_fields(self) -> dict:
+        if self.rng.random() < 0.5:
+            return {"keyword": self.rng.choice(KEYWORDS), "mode": "MARKETING"}
+        position, experience = self.rng.choice(POSITIONS)
+        return {
+            "keyword": "Hiring", "mode": "HIRING", "position": position,
+            "experience": experience, "location": "Mehsana, Gujarat", "post": str(self.rng.randint(1, 5)),
+        }
+
+
+def insta_post(client: Client):
+    """Prompt generation only (step 1 of the Instagram flow)."""
+    client.call("POST /api/generate-insta-post", "POST", "/api/generate-insta-post", data=client.post_fields())
+
+
+def insta_image(client: Client):
+    """Prompt, then image generation, polled until the post is done."""
+    response = client.call(
+        "POST /api/generate-insta-post", "POST", "/api/generate-insta-post", data=client.post_fields()
+    )
+    if response is None or response.status_code != 200:
+        return
+    post_id = response.json()["id"]
+    started = time.perf_counter()
+    response = client.call("POST /api/generate-insta-image/<id>", "POST", f"/api/generate-insta-image/{post_id}")
+    if response is None or response.status_code != 200:
+        return
+    status = client.wait_for("GET /api/insta-posts/<id>", f"/api/insta-posts/{post_id}")
+    client.recorder.record_operation("insta_image_end_to_end", time.perf_counter() - started, status)
+
+
+def poll_posts(client: Client):
+    """The post list as the dashboard reads it (first page, revalidated with ETags)."""
+    path = "/api/insta-posts?limit=20"
+    etag = client.etags.get(path)
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.call("GET /api/insta-posts", "GET", path, headers=headers)
+    if response is not None and response.status_code == 200:
+        client.etags[path] = response.headers.get("ETag")
+
+
+def projects(client: Client):
+    """Video project creation, polled until n8n returns (or the callback arrives)."""
+    response = client.call("POST /api/projects", "POST", "/api/projects", data={
+        "title": f"Bench {client.rng.choice(KEYWORDS)}",
+        "raw_description": "Short explainer video for a benchmark run.",
+        "company_service": client.rng.choice(KEYWORDS),
+        "character_image": "false",
+    })
+    if response is None or response.status_code != 200:
+        return
+    started = time.perf_counter()
+    project_id = response.json()["project_id"]
+    status = client.wait_for("GET /api/projects/<id>", f"/api/projects/{project_id}")
+    client.recorder.record_operation("video_end_to_end", time.perf_counter() - started, status)
+
+
+SCENARIOS = {
+    "insta_post": insta_post,
+    "insta_image": insta_image,
+    "poll_posts": poll_posts,
+    "projects": projects,
+}
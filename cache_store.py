@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import CacheTimedConnection
+
+# Separate file from iv_studio.db so the cache can be wiped without touching app data.
+CACHE_DATABASE = os.getenv("CACHE_DATABASE", "iv_cache.db")
+
+
+class SQLiteCache:
+    """
+    Small persistent key/value cache shared by all gunicorn workers.
+
+    Entries live in one table, partitioned by namespace. Every namespace has
+    its own TTL; the whole table is capped at max_entries and trimmed by
+    least-recently-used access time. Caches that must not evict each other
+    use separate tables.
+    """
+
+    def __init__(self, path: str = CACHE_DATABASE, max_entries: int = 2000, table: str = "cache_entries"):
+        self.path = path
+        self.max_entries = max_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10, factory=CacheTimedConnection)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table}(accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get(self, namespace: str, key: str, ttl: float | None = None):
+        """Return the cached value or None when missing / expired."""
+        entry = self.get_entry(namespace, key, ttl=ttl)
+        return entry[0] if entry else None
+
+    def get_entry(self, namespace: str, key: str, ttl: float | None = None):
+        """Return (value, created_at) or None when missing / expired."""
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._conn()
+                row = db.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if not row:
+                    return None
+                value, created_at = row
+                if ttl is not None and now - created_at > ttl:
+                    db.execute(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", (namespace, key))
+                    db.commit()
+                    return None
+                db.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                db.commit()
+            return json.loads(value), created_at
+        except sqlite3.Error as e:
+            print(f"[Cache] get failed for {namespace}: {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._conn()
+                db.execute(f'''
+                    INSERT OR REPLACE INTO {self.table} (namespace, key, value, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (namespace, key, json.dumps(value), now, now))
+                db.execute(f'''
+                    DELETE FROM {self.table} WHERE rowid IN (
+                        SELECT rowid FROM {self.table}
+                        ORDER BY accessed_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"[Cache] set failed for {namespace}: {e}")
+
+
+# Shared instance used by prompt_core (image analysis) and uploads (Cloudinary asset index)
+cache = SQLiteCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "2000")))
+# LLM text responses are many and short-lived, so they get their own table and cap
+# instead of evicting the 30-day analysis entries above
+llm_response_cache = SQLiteCache(max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")), table="llm_cache_entries")
@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+import time
+
+from db import connection
+
+# How often the tail thread looks for new change_log rows while someone is listening
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "0.5"))
+# change_log rows are kept this long so reconnecting clients can catch up
+CHANGE_LOG_RETENTION = float(os.getenv("CHANGE_LOG_RETENTION", str(24 * 3600)))
+# Undelivered changes buffered per subscriber before it is told to resync
+CHANGE_SUBSCRIBER_BUFFER = 1000
+
+
+def _row_to_change(row) -> dict:
+    return {
+        "id": row['id'],
+        "entity": row['entity'],
+        "entity_id": row['entity_id'],
+        "status": row['status'],
+    }
+
+
+class ChangeFeed:
+    """
+    Fan-out of change_log rows to Server-Sent Event subscribers.
+
+    One thread per process tails change_log (filled by triggers, so writes
+    from worker.py are seen too) and copies new rows into every subscriber's
+    queue. Database load is one indexed query per poll interval no matter how
+    many tabs are open, and nothing at all while nobody is subscribed.
+    """
+
+    def __init__(self, poll_interval: float = CHANGE_FEED_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_id = None
+        self._last_prune = 0
+
+    def latest_id(self) -> int:
+        with connection() as db:
+            return db.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+
+    def backlog(self, since_id: int, limit: int = 500) -> list:
+        """Changes after since_id, used to replay what a reconnecting client missed."""
+        with connection() as db:
+            rows = db.execute(
+                "SELECT id, entity, entity_id, status FROM change_log WHERE id > ? ORDER BY id LIMIT ?",
+                (since_id, limit)
+            ).fetchall()
+        return [_row_to_change(row) for row in rows]
+
+    def subscribe(self) -> queue.Queue:
+        """
+        Queue receiving every change from now on. A None item means the
+        subscriber fell too far behind and should reconnect to resync.
+        """
+        subscription = queue.Queue(maxsize=CHANGE_SUBSCRIBER_BUFFER)
+        with self._lock:
+            if self._last_id is None:
+                self._last_id = self.latest_id()
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                listening = bool(self._subscribers)
+                if not listening:
+                    # Re-read the high-water mark when the next subscriber arrives
+                    self._last_id = None
+            if not listening:
+                self._wake.wait(60)
+                self._wake.clear()
+                continue
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"[Changes] Poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        with connection() as db:
+            rows = db.execute(
+                "SELECT id, entity, entity_id, status FROM change_log WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+            if time.time() - self._last_prune > 3600:
+                db.execute("DELETE FROM change_log WHERE created_at < ?", (time.time() - CHANGE_LOG_RETENTION,))
+                db.commit()
+                self._last_prune = time.time()
+        if not rows:
+            return
+        changes = [_row_to_change(row) for row in rows]
+        with self._lock:
+            self._last_id = changes[-1]["id"]
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                for change in changes:
+                    subscription.put_nowait(change)
+            except queue.Full:
+                # Slow client: drop its buffer and make it reconnect with Last-Event-ID
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(None)
+
+
+change_feed = ChangeFeed()
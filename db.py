@@ -0,0 +1,525 @@
+import base64
+import json
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+from metrics import TimedConnection
+from uploads import content_hash
+
+# Database configuration
+DATABASE = 'iv_studio.db'
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def _connect():
+    """Open a connection configured for many readers + background writers."""
+    db = sqlite3.connect(
+        DATABASE, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000, factory=TimedConnection
+    )
+    db.row_factory = sqlite3.Row
+    # WAL lets the /api polling readers run while a background task is writing
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    db.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    return db
+
+
+class ConnectionPool:
+    """
+    LIFO pool of open SQLite connections shared by request handlers and
+    background threads. Connections are handed to one user at a time, so
+    check_same_thread is disabled.
+    """
+
+    def __init__(self, size: int):
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _connect()
+
+    def release(self, db):
+        # Never hand out a connection with someone else's half-done transaction
+        if db.in_transaction:
+            db.rollback()
+        try:
+            self._idle.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+
+pool = ConnectionPool(DB_POOL_SIZE)
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for the duration of a with-block."""
+    db = pool.acquire()
+    try:
+        yield db
+    finally:
+        pool.release(db)
+
+
+# Image blob store (content-addressed, shared by all posts).
+# Posts and batches reference blobs by column; queued jobs that still need a
+# blob take a hold on it (image_blobs.holds) and give it back when they are done.
+def put_blob(db, data: bytes, hold: bool = False) -> str:
+    """Store image bytes once under their sha256 and return the hash (taking a hold when asked)."""
+    digest = content_hash(data)
+    db.execute(
+        'INSERT OR IGNORE INTO image_blobs (hash, data, size) VALUES (?, ?, ?)',
+        (digest, sqlite3.Binary(data), len(data))
+    )
+    if hold:
+        hold_blobs(db, digest)
+    return digest
+
+
+def hold_blobs(db, *digests):
+    """Keep blobs alive for a job until release_blob_holds(); one hold per digest given."""
+    for digest in digests:
+        if digest:
+            db.execute('UPDATE image_blobs SET holds = holds + 1 WHERE hash = ?', (digest,))
+
+
+def get_blob(db, digest: str) -> bytes | None:
+    """Load image bytes by hash (None if missing)."""
+    if not digest:
+        return None
+    row = db.execute('SELECT data FROM image_blobs WHERE hash = ?', (digest,)).fetchone()
+    return bytes(row[0]) if row else None
+
+
+def release_blob_holds(db, *digests):
+    """Give back holds taken by put_blob(hold=True) / hold_blobs(), then delete blobs nobody needs."""
+    for digest in digests:
+        if digest:
+            db.execute('UPDATE image_blobs SET holds = MAX(holds - 1, 0) WHERE hash = ?', (digest,))
+    release_blobs(db, *digests)
+
+
+def release_blobs(db, *digests):
+    """Delete blobs that no post, batch or held job references any more."""
+    for digest in set(d for d in digests if d):
+        db.execute('''
+            DELETE FROM image_blobs WHERE hash = ? AND holds = 0
+              AND NOT EXISTS (SELECT 1 FROM insta_posts WHERE logo_hash = ? OR character_hash = ?)
+              AND NOT EXISTS (SELECT 1 FROM insta_post_batches WHERE logo_hash = ? OR character_hash = ?)
+        ''', (digest, digest, digest, digest, digest))
+
+
+# ======================
+# MIGRATIONS
+# ======================
+# Applied in order; PRAGMA user_version stores the last applied number.
+# Never edit a shipped migration - append a new one instead.
+
+def _migration_1_baseline(db):
+    """Tables as they existed before versioning, plus the old ad-hoc column fixes."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            company_service TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            has_custom_character INTEGER DEFAULT 0,
+            scene_1_img TEXT,
+            scene_1_vid TEXT,
+            scene_2_img TEXT,
+            scene_2_vid TEXT,
+            error_message TEXT,
+            webhook_response TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS insta_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            status TEXT DEFAULT 'processing',
+            primary_hex TEXT,
+            secondary_hex TEXT,
+            concept TEXT,
+            title TEXT,
+            subtitle TEXT,
+            address_line TEXT,
+            final_prompt TEXT,
+            position TEXT,
+            experience TEXT,
+            location TEXT,
+            post TEXT,
+            error_message TEXT,
+            generated_image_urls TEXT,
+            logo_hash TEXT,
+            character_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS image_blobs (
+            hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Columns added over time to older insta_posts tables
+    cursor = db.execute("PRAGMA table_info(insta_posts)")
+    columns = [row[1] for row in cursor.fetchall()]
+    
+    if 'status' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN status TEXT DEFAULT 'completed'")
+        print("Added status column to insta_posts table")
+    
+    if 'error_message' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN error_message TEXT")
+        print("Added error_message column to insta_posts table")
+    
+    if 'updated_at' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN updated_at TIMESTAMP")
+        # Update existing rows with current timestamp
+        db.execute("UPDATE insta_posts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+        print("Added updated_at column to insta_posts table")
+    
+    if 'position' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN position TEXT")
+        print("Added position column to insta_posts table")
+    
+    if 'experience' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN experience TEXT")
+        print("Added experience column to insta_posts table")
+    
+    if 'location' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN location TEXT")
+        print("Added location column to insta_posts table")
+    
+    if 'generated_image_urls' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN generated_image_urls TEXT")
+        print("Added generated_image_urls column to insta_posts table")
+    
+    if 'post' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN post TEXT")
+        print("Added post column to insta_posts table")
+    
+    if 'logo_hash' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN logo_hash TEXT")
+        print("Added logo_hash column to insta_posts table")
+    
+    if 'character_hash' not in columns:
+        db.execute("ALTER TABLE insta_posts ADD COLUMN character_hash TEXT")
+        print("Added character_hash column to insta_posts table")
+    
+    # Move legacy inline base64 images into image_blobs
+    if 'logo_base64' in columns and 'character_base64' in columns:
+        rows = db.execute('''
+            SELECT id, logo_base64, character_base64 FROM insta_posts
+            WHERE logo_base64 IS NOT NULL OR character_base64 IS NOT NULL
+        ''').fetchall()
+        for post_id, logo_b64, character_b64 in rows:
+            logo_hash = put_blob(db, base64.b64decode(logo_b64)) if logo_b64 else None
+            character_hash = put_blob(db, base64.b64decode(character_b64)) if character_b64 else None
+            db.execute('''
+                UPDATE insta_posts
+                SET logo_hash = ?, character_hash = ?, logo_base64 = NULL, character_base64 = NULL
+                WHERE id = ?
+            ''', (logo_hash, character_hash, post_id))
+        if rows:
+            print(f"Moved images of {len(rows)} insta_posts rows into image_blobs")
+            # Reclaim the space the inline images used
+            return True
+
+
+def _migration_2_indexes(db):
+    """Secondary indexes for status filters, list ordering and stats counts."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects(status, created_at, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_projects_custom_status ON projects(has_custom_character, status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_posts_status_created ON insta_posts(status, created_at, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_posts_created ON insta_posts(created_at, id)")
+    # release_blobs() looks posts up by image hash
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_posts_logo_hash ON insta_posts(logo_hash)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_posts_character_hash ON insta_posts(character_hash)")
+
+
+def _migration_3_jobs(db):
+    """Durable background job queue with leases."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            checkpoint TEXT,
+            result TEXT,
+            last_error TEXT,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_id ON jobs(state, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease_owner ON jobs(lease_owner)")
+
+
+def _migration_4_change_log(db):
+    """Change feed of project / Instagram post status transitions, filled by triggers."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            status TEXT,
+            created_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+        )
+    ''')
+    db.execute("CREATE INDEX IF NOT EXISTS idx_change_log_created ON change_log(created_at)")
+    # Triggers see every writer (web workers, worker.py, manual fixes) without touching app code
+    for table, entity in (('projects', 'project'), ('insta_posts', 'insta_post')):
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_change AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (entity, entity_id, status) VALUES ('{entity}', NEW.id, NEW.status);
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_status_change AFTER UPDATE OF status ON {table}
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                INSERT INTO change_log (entity, entity_id, status) VALUES ('{entity}', NEW.id, NEW.status);
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_change AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (entity, entity_id, status) VALUES ('{entity}', OLD.id, 'deleted');
+            END
+        ''')
+
+
+def _migration_5_row_versions(db):
+    """Row versions and per-table version counters for ETags, bumped by triggers."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+    for table in ('projects', 'insta_posts'):
+        columns = [row[1] for row in db.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'row_version' not in columns:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+        db.execute("INSERT OR IGNORE INTO table_versions (name) VALUES (?)", (table,))
+        # The WHEN guard keeps the trigger's own row_version update from re-firing it
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_version AFTER UPDATE ON {table}
+            WHEN NEW.row_version = OLD.row_version
+            BEGIN
+                UPDATE {table} SET row_version = OLD.row_version + 1 WHERE id = NEW.id;
+                UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+            END
+        ''')
+        for event in ('INSERT', 'DELETE'):
+            db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            ''')
+
+
+# (metric, dimension expression, row filter) per table; {r} is NEW or OLD inside triggers
+STAT_COUNTERS = {
+    'projects': [
+        ('projects_by_status', '{r}.status', None),
+        ('projects_custom_by_status', '{r}.status', '{r}.has_custom_character = 1'),
+        ('projects_by_day', 'date({r}.created_at)', None),
+    ],
+    'insta_posts': [
+        ('insta_posts_by_status', '{r}.status', None),
+        ('insta_posts_by_mode', '{r}.mode', None),
+        ('insta_posts_by_day', 'date({r}.created_at)', None),
+    ],
+}
+# Columns the counters above read; updates touching none of them skip the trigger
+STAT_COLUMNS = {
+    'projects': ('status', 'has_custom_character', 'created_at'),
+    'insta_posts': ('status', 'mode', 'created_at'),
+}
+
+
+def _counter_upserts(table: str, row: str, delta: int) -> str:
+    statements = []
+    for metric, dimension, condition in STAT_COUNTERS[table]:
+        statements.append(f'''
+                INSERT INTO stat_counters (metric, dimension, value)
+                SELECT '{metric}', COALESCE({dimension.format(r=row)}, ''), {delta}
+                WHERE {condition.format(r=row) if condition else 1}
+                ON CONFLICT(metric, dimension) DO UPDATE SET value = value + excluded.value;''')
+    return ''.join(statements)
+
+
+def _migration_6_stat_counters(db):
+    """Dashboard counters kept current by triggers in the writing transaction."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            metric TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, dimension)
+        )
+    ''')
+    for table, counters in STAT_COUNTERS.items():
+        # Backfill from the existing rows once; triggers keep it current from here on
+        for metric, dimension, condition in counters:
+            db.execute(f'''
+                INSERT OR REPLACE INTO stat_counters (metric, dimension, value)
+                SELECT '{metric}', COALESCE({dimension.format(r=table)}, ''), COUNT(*)
+                FROM {table} WHERE {condition.format(r=table) if condition else 1}
+                GROUP BY 2
+            ''')
+        
+        changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in STAT_COLUMNS[table])
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_stats AFTER INSERT ON {table}
+            BEGIN{_counter_upserts(table, 'NEW', 1)}
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_stats AFTER DELETE ON {table}
+            BEGIN{_counter_upserts(table, 'OLD', -1)}
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_stats AFTER UPDATE ON {table}
+            WHEN {changed}
+            BEGIN{_counter_upserts(table, 'OLD', -1)}{_counter_upserts(table, 'NEW', 1)}
+            END
+        ''')
+
+
+def _migration_7_insta_post_batches(db):
+    """Batches of Instagram posts that share one logo / character."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS insta_post_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            total INTEGER NOT NULL DEFAULT 0,
+            generate_images INTEGER NOT NULL DEFAULT 1,
+            logo_hash TEXT,
+            character_hash TEXT,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute("ALTER TABLE insta_posts ADD COLUMN batch_id INTEGER")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_posts_batch ON insta_posts(batch_id, id)")
+
+
+def _migration_8_video_callbacks(db):
+    """Deadline for projects waiting on an n8n result callback."""
+    db.execute("ALTER TABLE projects ADD COLUMN callback_deadline REAL")
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_projects_callback_deadline ON projects(callback_deadline) "
+        "WHERE callback_deadline IS NOT NULL"
+    )
+
+
+def _migration_9_prompt_stage_timings(db):
+    """Per-stage wall time and token usage of the prompt pipeline for every Instagram post."""
+    # Rows outlive deleted posts so the latency history stays complete
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS insta_post_stage_timings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            stage TEXT NOT NULL,
+            attempt INTEGER,
+            status TEXT NOT NULL,
+            detail TEXT,
+            start_ms REAL,
+            duration_ms REAL NOT NULL,
+            model TEXT,
+            llm_calls INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_hits TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_post ON insta_post_stage_timings(post_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_stage_created ON insta_post_stage_timings(stage, created_at)")
+
+
+def _migration_10_blob_holds(db):
+    """Hold counts on image blobs still needed by queued image / video jobs."""
+    db.execute("ALTER TABLE image_blobs ADD COLUMN holds INTEGER NOT NULL DEFAULT 0")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_post_batches_logo_hash ON insta_post_batches(logo_hash)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_insta_post_batches_character_hash ON insta_post_batches(character_hash)")
+    # Jobs queued before this migration release their blobs when they finish, so count them now
+    rows = db.execute(
+        "SELECT payload FROM jobs WHERE type IN ('image', 'video') AND state IN ('queued', 'running')"
+    ).fetchall()
+    for (payload,) in rows:
+        payload = json.loads(payload or '{}')
+        hold_blobs(db, payload.get('logo_hash'), payload.get('character_hash'), payload.get('file_hash'))
+
+
+MIGRATIONS = [
+    (1, _migration_1_baseline),
+    (2, _migration_2_indexes),
+    (3, _migration_3_jobs),
+    (4, _migration_4_change_log),
+    (5, _migration_5_row_versions),
+    (6, _migration_6_stat_counters),
+    (7, _migration_7_insta_post_batches),
+    (8, _migration_8_video_callbacks),
+    (9, _migration_9_prompt_stage_timings),
+    (10, _migration_10_blob_holds),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def init_db():
+    """Bring the schema up to SCHEMA_VERSION; a no-op when it is already current."""
+    db = _connect()
+    try:
+        current = db.execute("PRAGMA user_version").fetchone()[0]
+        if current >= SCHEMA_VERSION:
+            return
+        
+        vacuum = False
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            # Each migration and its version bump commit together
+            db.execute("BEGIN")
+            try:
+                vacuum = bool(migration(db)) or vacuum
+                db.execute(f"PRAGMA user_version = {version}")
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            print(f"Applied database migration {version}: {migration.__doc__}")
+        
+        if vacuum:
+            db.execute("VACUUM")
+    finally:
+        db.close()
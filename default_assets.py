@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from http_clients import session_for
+from uploads import content_hash, register_existing_asset
+
+# Directory shared by all workers on the host for the downloaded default images
+DEFAULT_ASSET_DIR = os.getenv("DEFAULT_ASSET_DIR", ".asset_cache")
+# How long a copy is trusted before it is revalidated with If-None-Match
+DEFAULT_ASSET_REVALIDATE = float(os.getenv("DEFAULT_ASSET_REVALIDATE", str(24 * 3600)))
+
+
+class DefaultAsset:
+    """
+    A remote image the app falls back to when the user uploads nothing.
+
+    The bytes are downloaded once, memoized in memory and written to
+    DEFAULT_ASSET_DIR so other workers and restarts skip the download. Stale
+    copies are revalidated with the stored ETag; if the origin is unreachable
+    the last good copy keeps being served.
+    """
+
+    def __init__(self, url: str, cache_dir: str = DEFAULT_ASSET_DIR):
+        self.url = url
+        name = hashlib.sha256(url.encode()).hexdigest()[:32]
+        self._data_path = os.path.join(cache_dir, f"{name}.bin")
+        self._meta_path = os.path.join(cache_dir, f"{name}.json")
+        self._lock = threading.Lock()
+        self._data = None
+        self._etag = None
+        self._checked_at = 0.0
+
+    def get_bytes(self) -> bytes:
+        with self._lock:
+            if self._data is None:
+                self._load_from_disk()
+            if self._data is None or time.time() - self._checked_at > DEFAULT_ASSET_REVALIDATE:
+                self._refresh()
+            return self._data
+
+    def _load_from_disk(self):
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return
+        self._remember(data, meta.get("etag"), meta.get("checked_at", 0.0))
+
+    def _refresh(self):
+        headers = {"If-None-Match": self._etag} if self._data is not None and self._etag else {}
+        try:
+            r = session_for(self.url).get(self.url, headers=headers, timeout=30)
+            if r.status_code == 304:
+                self._checked_at = time.time()
+            else:
+                r.raise_for_status()
+                self._remember(r.content, r.headers.get("ETag"), time.time())
+                print(f"[Defaults] Downloaded {len(r.content)} bytes from {self.url}")
+        except Exception as e:
+            if self._data is None:
+                raise
+            print(f"[Defaults] Revalidation failed for {self.url}, serving cached copy: {e}")
+            self._checked_at = time.time()
+        self._save_to_disk()
+
+    def _remember(self, data: bytes, etag, checked_at: float):
+        self._data = data
+        self._etag = etag
+        self._checked_at = checked_at
+        # The bytes already live at a public URL, so never upload them again
+        register_existing_asset(content_hash(data), self.url)
+
+    def _save_to_disk(self):
+        try:
+            os.makedirs(os.path.dirname(self._data_path) or ".", exist_ok=True)
+            # Write-then-rename so concurrent workers never read a half-written file
+            for path, payload in (
+                (self._data_path, self._data),
+                (self._meta_path, json.dumps({"etag": self._etag, "checked_at": self._checked_at}).encode()),
+            ):
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"[Defaults] Could not write cache for {self.url}: {e}")
+
+
+def preload(*assets: DefaultAsset):
+    """Warm the given assets in a background thread so no request waits on the download."""
+    def run():
+        for asset in assets:
+            try:
+                asset.get_bytes()
+            except Exception as e:
+                print(f"[Defaults] Preload failed for {asset.url}: {e}")
+    threading.Thread(target=run, name="default-assets-preload", daemon=True).start()
@@ -0,0 +1,67 @@
+"""
+Local stand-ins for the upstream services (KIE.ai, n8n, Cloudinary, OpenAI).
+
+    python -m fake_upstream --profile production        # prints the env to export
+    python -m fake_upstream --profile degraded --set openai.throttle_rate=0.2
+
+Point the app at them with the printed variables (KIE_API_BASE_URL,
+KIE_UPLOAD_BASE_URL, N8N_WEBHOOK_URL, CLOUDINARY_UPLOAD_PREFIX,
+OPENAI_BASE_URL, ...) to exercise the job, polling and pipeline code
+offline. Latency, failure and task-duration behaviour comes from the
+presets in profiles.py and can be changed while running via /_profile.
+"""
+from .cloudinary import FakeCloudinary
+from .kie import FakeKie
+from .n8n import FakeN8n
+from .openai import FakeOpenAI
+from .profiles import PROFILES, Profile, build_profiles, parse_overrides
+
+SERVICES = {
+    "kie": FakeKie,
+    "n8n": FakeN8n,
+    "cloudinary": FakeCloudinary,
+    "openai": FakeOpenAI,
+}
+
+# Cloud name used in fake Cloudinary URLs
+FAKE_CLOUD_NAME = "fake-cloud"
+
+
+def start_all(profile: str = "fast", host: str = "127.0.0.1", port: int = 0, overrides=None) -> dict:
+    """
+    Start every fake service and return {name: service}.
+
+    port=0 picks free ports; otherwise services listen on port, port+1, ...
+    in SERVICES order.
+    """
+    profiles = build_profiles(profile, overrides)
+    services = {}
+    for offset, (name, cls) in enumerate(SERVICES.items()):
+        services[name] = cls(profiles[name], host=host, port=port + offset if port else 0).start()
+    return services
+
+
+def env_for(services: dict) -> dict:
+    """Environment variables that point app.py / prompt_core.py / uploads.py at the fakes."""
+    kie = services["kie"].base_url
+    cloudinary = services["cloudinary"].base_url
+    return {
+        "KIE_API_BASE_URL": kie,
+        "KIE_UPLOAD_BASE_URL": kie,
+        "KIE_API_KEY": "fake-kie-key",
+        "N8N_WEBHOOK_URL": f"{services['n8n'].base_url}/webhook/iv-infotech-ai-video-gen",
+        "CLOUDINARY_UPLOAD_PREFIX": cloudinary,
+        "CLOUDINARY_CLOUD_NAME": FAKE_CLOUD_NAME,
+        "CLOUDINARY_API_KEY": "fake-cloudinary-key",
+        "CLOUDINARY_API_SECRET": "fake-cloudinary-secret",
+        "OPENAI_BASE_URL": f"{services['openai'].base_url}/v1",
+        "OPENAI_API_KEY": "sk-fake",
+        "DEFAULT_LOGO_URL": f"{cloudinary}/{FAKE_CLOUD_NAME}/image/upload/v1/defaults/logo.png",
+        "DEFAULT_CHARACTER_URL": f"{cloudinary}/{FAKE_CLOUD_NAME}/image/upload/v1/defaults/character.png",
+    }
+
+
+__all__ = [
+    "FakeCloudinary", "FakeKie", "FakeN8n", "FakeOpenAI",
+    "PROFILES", "Profile", "SERVICES", "build_profiles", "env_for", "parse_overrides", "start_all",
+]
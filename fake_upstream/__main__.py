@@ -0,0 +1,39 @@
+import argparse
+import signal
+import threading
+
+from . import PROFILES, env_for, parse_overrides, start_all
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m fake_upstream",
+        description="Run local fake KIE.ai / n8n / Cloudinary / OpenAI servers for offline load tests."
+    )
+    parser.add_argument("--profile", default="fast", choices=sorted(PROFILES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="first port; services use port..port+3")
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], metavar="SERVICE.FIELD=VALUE",
+        help="override a profile field, e.g. kie.task_seconds=20,60 or openai.error_rate=0.05"
+    )
+    args = parser.parse_args()
+
+    services = start_all(args.profile, args.host, args.port, parse_overrides(args.overrides))
+    print(f"Fake upstreams running with the '{args.profile}' profile:")
+    for name, service in services.items():
+        print(f"  {name:<10} {service.base_url}")
+    print("\nExport these before starting the app:")
+    for key, value in env_for(services).items():
+        print(f"export {key}={value}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+    for service in services.values():
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import base64
+import email.parser
+import email.policy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .profiles import Profile
+
+# 1x1 PNG served for every fake image URL
+PLACEHOLDER_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+class Request:
+    """The parts of an incoming request the fake services look at."""
+
+    def __init__(self, method: str, path: str, headers, body: bytes):
+        parts = urlsplit(path)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    def form(self) -> dict:
+        """Fields of a urlencoded or multipart body (file parts map to their size)."""
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + self.body
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                payload = part.get_payload(decode=True) or b""
+                fields[name] = len(payload) if part.get_filename() else payload.decode("utf-8", "replace")
+            return fields
+        return {key: values[-1] for key, values in parse_qs(self.body.decode("utf-8", "replace")).items()}
+
+
+class FakeService:
+    """
+    A local HTTP stand-in for one upstream API.
+
+    Every request first goes through the service's Profile (fault injection,
+    then latency), then subclasses answer it in handle(), returning
+    (status, payload, headers). payload may be a dict/list (sent as JSON),
+    bytes, or an iterator of bytes (streamed with chunked encoding).
+
+    GET /_stats returns request counts and concurrency; GET/POST /_profile
+    reads or changes the profile while the server runs.
+    """
+
+    name = "fake"
+
+    def __init__(self, profile: Profile | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile or Profile()
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.faults = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request: Request):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "service": self.name,
+                "requests": dict(self.requests),
+                "faults": dict(self.faults),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+    def _count(self, table: dict, key: str):
+        with self._lock:
+            table[key] = table.get(key, 0) + 1
+
+    def _serve(self, request: Request):
+        if request.path == "/_stats":
+            return 200, self.stats(), {}
+        if request.path == "/_profile":
+            if request.method == "POST":
+                try:
+                    self.profile.update(**request.json())
+                except (ValueError, TypeError) as e:
+                    return 400, {"error": str(e)}, {}
+            return 200, self.profile.to_dict(), {}
+
+        self._count(self.requests, f"{request.method} {request.path}")
+        fault = self.profile.draw_fault()
+        if fault:
+            self._count(self.faults, fault)
+        if fault == "error":
+            time.sleep(self.profile.sample_latency())
+            return 500, {"error": {"message": f"Injected failure from fake {self.name}"}}, {}
+        if fault == "throttle":
+            return 429, {"error": {"message": "Rate limit reached (injected)"}}, {"Retry-After": "1"}
+        if fault == "stall":
+            time.sleep(self.profile.stall_seconds)
+        time.sleep(self.profile.sample_latency())
+        return self.handle(request)
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = Request(self.command, self.path, self.headers, self.rfile.read(length) if length else b"")
+                with service._lock:
+                    service.in_flight += 1
+                    service.peak_in_flight = max(service.peak_in_flight, service.in_flight)
+                try:
+                    status, payload, headers = service._serve(request)
+                    self._respond(status, payload, headers)
+                finally:
+                    with service._lock:
+                        service.in_flight -= 1
+
+            def _respond(self, status, payload, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode()
+                    if "Content-Type" not in headers:
+                        self.send_header("Content-Type", "application/json")
+                if payload is None or isinstance(payload, bytes):
+                    payload = payload or b""
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    if self.command != "HEAD":
+                        self.wfile.write(payload)
+                    return
+                # Iterator: stream it chunk by chunk
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in payload:
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def image_response(request: Request, etag: str = '"placeholder"'):
+    """Serve the placeholder image with an ETag (304 on a matching If-None-Match)."""
+    if request.headers.get("If-None-Match") == etag:
+        return 304, None, {"ETag": etag}
+    return 200, PLACEHOLDER_PNG, {"Content-Type": "image/png", "ETag": etag}
+
+
+def not_found(request: Request):
+    return 404, {"error": {"message": f"No fake route for {request.method} {request.path}"}}, {}
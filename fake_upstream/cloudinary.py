@@ -0,0 +1,54 @@
+import re
+import threading
+
+from .base import FakeService, image_response, not_found
+
+_UPLOAD = re.compile(r"/v1_1/([^/]+)/image/upload")
+_RESOURCE = re.compile(r"/v1_1/([^/]+)/resources/image/upload/(.+)")
+_DELIVERY = re.compile(r"/([^/]+)/image/upload/.+")
+
+
+class FakeCloudinary(FakeService):
+    """
+    Cloudinary upload + admin resource lookup (the calls uploads.py makes),
+    and image delivery URLs (with ETags, for the default assets).
+    """
+
+    name = "cloudinary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._assets = set()
+        self._assets_lock = threading.Lock()
+
+    def handle(self, request):
+        match = _UPLOAD.fullmatch(request.path)
+        if match and request.method == "POST":
+            form = request.form()
+            public_id = form.get("public_id") or "upload"
+            if form.get("folder"):
+                public_id = f"{form['folder']}/{public_id}"
+            with self._assets_lock:
+                self._assets.add(public_id)
+            return 200, self._resource(match.group(1), public_id), {}
+
+        match = _RESOURCE.fullmatch(request.path)
+        if match and request.method == "GET":
+            cloud, public_id = match.groups()
+            with self._assets_lock:
+                exists = public_id in self._assets
+            if not exists:
+                return 404, {"error": {"message": f"Resource not found - {public_id}"}}, {}
+            return 200, self._resource(cloud, public_id), {}
+
+        if _DELIVERY.fullmatch(request.path) and request.method in ("GET", "HEAD"):
+            return image_response(request)
+        return not_found(request)
+
+    def _resource(self, cloud: str, public_id: str) -> dict:
+        return {
+            "public_id": public_id,
+            "resource_type": "image",
+            "format": "png",
+            "secure_url": f"{self.base_url}/{cloud}/image/upload/v1/{public_id}.png",
+        }
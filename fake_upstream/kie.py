@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+import uuid
+
+from .base import FakeService, image_response, not_found
+
+
+class FakeKie(FakeService):
+    """
+    KIE.ai task API (createTask / recordInfo) plus the redpandaai file upload.
+
+    Tasks finish after a profile-sampled task_seconds; task_failure_rate of
+    them end in state "fail". Result URLs point back at this server.
+    """
+
+    name = "kie"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tasks = {}
+        self._tasks_lock = threading.Lock()
+
+    def handle(self, request):
+        if request.method == "POST" and request.path == "/api/v1/jobs/createTask":
+            return self._create_task(request)
+        if request.method == "GET" and request.path == "/api/v1/jobs/recordInfo":
+            return self._record_info(request.query.get("taskId", ""))
+        if request.method == "POST" and request.path == "/api/file-stream-upload":
+            return 200, {
+                "success": True,
+                "code": 200,
+                "data": {"downloadUrl": f"{self.base_url}/uploads/{uuid.uuid4().hex}.png"},
+            }, {}
+        if request.method in ("GET", "HEAD") and request.path.startswith(("/results/", "/uploads/")):
+            return image_response(request)
+        return not_found(request)
+
+    def _create_task(self, request):
+        body = request.json()
+        if not (body.get("input") or {}).get("prompt"):
+            return 200, {"code": 422, "msg": "prompt is required", "data": None}, {}
+        task_id = uuid.uuid4().hex
+        with self._tasks_lock:
+            self._tasks[task_id] = {
+                "ready_at": time.time() + self.profile.sample_task_seconds(),
+                "failed": self.profile.task_fails(),
+            }
+        return 200, {"code": 200, "msg": "success", "data": {"taskId": task_id}}, {}
+
+    def _record_info(self, task_id):
+        with self._tasks_lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            return 200, {"code": 422, "msg": "recordInfo is null", "data": None}, {}
+        data = {"taskId": task_id, "state": "waiting"}
+        if time.time() >= task["ready_at"]:
+            if task["failed"]:
+                data.update(state="fail", failMsg="Injected generation failure")
+            else:
+                urls = [f"{self.base_url}/results/{task_id}.png"]
+                data.update(state="success", resultJson=json.dumps({"resultUrls": urls}))
+        return 200, {"code": 200, "msg": "success", "data": data}, {}
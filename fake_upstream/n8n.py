@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+import urllib.request
+import uuid
+
+from .base import FakeService, not_found
+
+# Attempts (and seconds between them) for delivering a callback, like an n8n HTTP node with retries
+CALLBACK_ATTEMPTS = 3
+CALLBACK_RETRY_DELAY = 5
+
+
+class FakeN8n(FakeService):
+    """
+    The n8n video workflow webhook.
+
+    Without a callback_url field the request is held for the whole render
+    (task_seconds), like the synchronous workflow. With one, the webhook
+    answers at once and the result is POSTed to callback_url when the render
+    finishes.
+    """
+
+    name = "n8n"
+
+    def handle(self, request):
+        if request.method != "POST" or not request.path.startswith("/webhook/"):
+            return not_found(request)
+        form = request.form()
+        render_seconds = self.profile.sample_task_seconds()
+        failed = self.profile.task_fails()
+        callback_url = form.get("callback_url")
+
+        if callback_url:
+            result = {"status": "failed", "error": "Injected render failure"} if failed else self._scenes()
+            timer = threading.Timer(render_seconds, self._deliver, (callback_url, result))
+            timer.daemon = True
+            timer.start()
+            return 200, {"message": "Workflow was started"}, {}
+
+        time.sleep(render_seconds)
+        if failed:
+            return 500, {"message": "Error in workflow (injected render failure)"}, {}
+        return 200, [self._scenes()], {}
+
+    def _scenes(self) -> dict:
+        render_id = uuid.uuid4().hex
+        base = f"{self.base_url}/renders/{render_id}"
+        return {
+            "scene_1_img": f"{base}/scene_1.png",
+            "scene_1_vid": f"{base}/scene_1.mp4",
+            "scene_2_img": f"{base}/scene_2.png",
+            "scene_2_vid": f"{base}/scene_2.mp4",
+        }
+
+    def _deliver(self, callback_url: str, result: dict):
+        body = json.dumps(result).encode()
+        for attempt in range(1, CALLBACK_ATTEMPTS + 1):
+            request = urllib.request.Request(
+                callback_url, data=body, method="POST", headers={"Content-Type": "application/json"}
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30):
+                    self._count(self.requests, "callback delivered")
+                    return
+            except Exception as e:
+                print(f"[fake n8n] Callback attempt {attempt} to {callback_url} failed: {e}")
+                time.sleep(CALLBACK_RETRY_DELAY)
+        self._count(self.requests, "callback failed")
@@ -0,0 +1,141 @@
+import json
+import time
+import uuid
+
+from .base import FakeService, not_found
+
+
+def _prompt_text(messages) -> str:
+    parts = []
+    for message in messages or ():
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(item.get("text", "") for item in content if item.get("type") == "text")
+    return "\n".join(parts)
+
+
+# About as long as a real final prompt (~250 tokens), so streaming and token counts look realistic
+_FINAL_PROMPT = (
+    "A premium corporate square social media banner illustration on a clean white background, "
+    "in flat vector style with subtle gradients. ## logo at the top right corner. ## "
+    "The main character from the reference image stands at three-quarter front view, aligning a row of "
+    "glowing modular blocks into a single clean bridge that spans the centre of the frame; each block "
+    "carries a simple line icon of one service, and the finished bridge leads towards a bright, open "
+    "horizon that stands for the business moving forward. The character is medium sized and never "
+    "dominates the metaphor. He keeps the same identity as the reference: oval face with a defined "
+    "jawline, short dark side-parted hair, trimmed full beard, warm medium-brown skin tone, dark brown "
+    "eyes, slim build, navy blazer over a white shirt. "
+    "Top left: the title in bold sans-serif using the primary brand color, with the key words highlighted "
+    "in bold black, and below it the subtitle in a smaller sans-serif using the secondary brand color. "
+    "A subtle pill with the address sits just above the footer. "
+    "A rounded floating footer bar in the primary brand color runs along the bottom, with the website on "
+    "the left and the phone number as a white-outlined button on the right, all text in white. "
+    "Minimal and uncluttered composition, generous white space, soft shadows, no decorative icons, "
+    "no sticker-like UI elements, no social media logos, crisp edges, balanced layout, high detail."
+)
+
+
+def reply_for(prompt: str) -> str:
+    """Canned answer in the format each prompt_core stage parses."""
+    # The final-prompt templates embed the concept (ACTION_ID: ...), so they are matched first
+    if "AI Image Prompt Engineer" in prompt:
+        return _FINAL_PROMPT
+    if "PRIMARY Brand Color" in prompt:
+        return "#1A73E8, #F4B400"
+    if "IDENTITY-LOCK" in prompt:
+        return "\n".join([
+            "- Oval face with a defined jawline",
+            "- Short dark hair, neatly side-parted",
+            "- Trimmed full beard",
+            "- Warm medium-brown skin tone",
+            "- Dark brown eyes under straight eyebrows",
+            "- Slim build, average height",
+            "- Navy blazer over a white shirt",
+        ])
+    if "ACTION_ID:" in prompt:
+        return "\n".join([
+            f"ACTION_ID: fake-{uuid.uuid4().hex[:8]}",
+            "ACTION: He aligns a row of glowing modular blocks into a single structure.",
+            "SCENE: A bright studio space where loose components snap together into a clean bridge.",
+            "LOGICAL: Assembling parts into one working whole mirrors how the service connects a business.",
+        ])
+    if "HEADLINE:" in prompt:
+        return "HEADLINE: Build Smarter, Grow Faster"
+    if "TITLE:" in prompt and "SUBTITLE:" in prompt:
+        return "\n".join([
+            "TITLE: We're Hiring Talent",
+            "SUBTITLE: Join a team that ships",
+            "ADDRESS: Mehsana, Gujarat",
+        ])
+    return _FINAL_PROMPT
+
+
+class FakeOpenAI(FakeService):
+    """
+    OpenAI chat completions (plain and streamed) with canned stage answers.
+
+    latency is the time to the first token; each output token then costs
+    token_delay, so long answers (the final prompt) take longer like they do
+    against the real API.
+    """
+
+    name = "openai"
+
+    def handle(self, request):
+        if request.method != "POST" or not request.path.endswith("/chat/completions"):
+            return not_found(request)
+        body = request.json()
+        model = body.get("model", "gpt-4o-mini")
+        text = reply_for(_prompt_text(body.get("messages")))
+        tokens = [word + " " for word in text.split(" ")]
+        tokens[-1] = tokens[-1].rstrip(" ")
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": len(_prompt_text(body.get("messages")).split()),
+            "completion_tokens": len(tokens),
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            stream = self._stream(completion_id, model, tokens, usage if include_usage else None)
+            return 200, stream, {"Content-Type": "text/event-stream"}
+
+        time.sleep(self.profile.token_delay * len(tokens))
+        return 200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }, {}
+
+    def _stream(self, completion_id, model, tokens, usage=None):
+        def chunk(delta, finish_reason=None, **extra):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n".encode()
+
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            time.sleep(self.profile.token_delay)
+            yield chunk({"content": token})
+        yield chunk({}, "stop")
+        if usage:
+            # stream_options.include_usage: a final chunk with no choices carries the usage
+            yield chunk(None, usage=usage)
+        yield b"data: [DONE]\n\n"
@@ -0,0 +1,148 @@
+import math
+import random
+
+# z-score of the 99th percentile, used to turn (median, p99) into a lognormal sigma
+_Z_P99 = 2.326
+
+
+def _lognormal(median: float, p99: float) -> float:
+    """Sample a right-skewed duration with the given median and 99th percentile."""
+    if median <= 0:
+        return 0.0
+    if p99 <= median:
+        return median
+    sigma = math.log(p99 / median) / _Z_P99
+    return random.lognormvariate(math.log(median), sigma)
+
+
+class Profile:
+    """
+    How one fake upstream behaves under load.
+
+    latency        (median, p99) seconds before every response starts
+    error_rate     fraction of requests answered with a 500
+    throttle_rate  fraction answered with a 429 + Retry-After
+    stall_rate     fraction that hang for stall_seconds before answering
+    task_seconds   (median, p99) until an async task (KIE image, n8n render) finishes
+    task_failure_rate  fraction of async tasks that end in failure
+    token_delay    seconds per streamed token (OpenAI completions)
+    """
+
+    FIELDS = (
+        "latency", "error_rate", "throttle_rate", "stall_rate", "stall_seconds",
+        "task_seconds", "task_failure_rate", "token_delay",
+    )
+    RANGE_FIELDS = ("latency", "task_seconds")
+
+    def __init__(
+        self,
+        latency=(0.01, 0.05),
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 60.0,
+        task_seconds=(1.0, 3.0),
+        task_failure_rate: float = 0.0,
+        token_delay: float = 0.0,
+    ):
+        self.latency = tuple(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.task_seconds = tuple(task_seconds)
+        self.task_failure_rate = task_failure_rate
+        self.token_delay = token_delay
+
+    def sample_latency(self) -> float:
+        return _lognormal(*self.latency)
+
+    def sample_task_seconds(self) -> float:
+        return _lognormal(*self.task_seconds)
+
+    def task_fails(self) -> bool:
+        return random.random() < self.task_failure_rate
+
+    def draw_fault(self):
+        """'error', 'throttle', 'stall' or None for this request."""
+        r = random.random()
+        for fault, rate in (("error", self.error_rate), ("throttle", self.throttle_rate), ("stall", self.stall_rate)):
+            if r < rate:
+                return fault
+            r -= rate
+        return None
+
+    def update(self, **values):
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown profile field: {name}")
+            if name in self.RANGE_FIELDS:
+                # A single number means a fixed duration
+                value = tuple(float(v) for v in value) if isinstance(value, (list, tuple)) else (float(value),) * 2
+                if len(value) != 2:
+                    raise ValueError(f"{name} takes a median and a p99")
+            else:
+                value = float(value)
+            setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+# Preset name -> service -> Profile arguments. "production" mirrors what the
+# real services do on a normal day; "degraded" reproduces the slow days.
+PROFILES = {
+    "fast": {
+        "kie": dict(latency=(0.005, 0.02), task_seconds=(0.5, 1.5)),
+        "n8n": dict(latency=(0.005, 0.02), task_seconds=(1.0, 3.0)),
+        "cloudinary": dict(latency=(0.005, 0.02)),
+        "openai": dict(latency=(0.02, 0.1), token_delay=0.0),
+    },
+    "production": {
+        "kie": dict(latency=(0.3, 1.5), task_seconds=(45, 120), task_failure_rate=0.02),
+        "n8n": dict(latency=(0.2, 1.0), task_seconds=(240, 480), task_failure_rate=0.03),
+        "cloudinary": dict(latency=(0.3, 2.0)),
+        "openai": dict(latency=(0.8, 4.0), token_delay=0.015),
+    },
+    "degraded": {
+        "kie": dict(latency=(1.0, 8.0), task_seconds=(90, 300), task_failure_rate=0.1,
+                    error_rate=0.03, stall_rate=0.01, stall_seconds=45),
+        "n8n": dict(latency=(0.5, 5.0), task_seconds=(400, 900), task_failure_rate=0.1, stall_rate=0.02),
+        "cloudinary": dict(latency=(1.0, 10.0), error_rate=0.02),
+        "openai": dict(latency=(3.0, 20.0), token_delay=0.05, throttle_rate=0.08, error_rate=0.02),
+    },
+    "outage": {
+        "kie": dict(latency=(2.0, 30.0), error_rate=0.5, stall_rate=0.2, stall_seconds=90),
+        "n8n": dict(latency=(2.0, 30.0), error_rate=0.5, stall_rate=0.2),
+        "cloudinary": dict(latency=(2.0, 30.0), error_rate=0.5),
+        "openai": dict(latency=(2.0, 30.0), error_rate=0.3, throttle_rate=0.4),
+    },
+}
+
+
+def parse_overrides(specs) -> dict:
+    """
+    ["kie.error_rate=0.1", "openai.latency=1,4"] -> {"kie": {"error_rate": 0.1}, "openai": {"latency": (1.0, 4.0)}}
+    """
+    overrides = {}
+    for spec in specs or ():
+        try:
+            target, value = spec.split("=", 1)
+            service, field = target.split(".", 1)
+            numbers = tuple(float(v) for v in value.split(","))
+        except ValueError:
+            raise ValueError(f"Bad override {spec!r}, expected service.field=value[,value]")
+        overrides.setdefault(service.strip(), {})[field.strip()] = numbers if len(numbers) > 1 else numbers[0]
+    return overrides
+
+
+def build_profiles(name: str = "fast", overrides=None) -> dict:
+    """Service name -> Profile for a preset, with per-field overrides applied."""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile {name!r} (choose from {', '.join(PROFILES)})")
+    profiles = {service: Profile(**args) for service, args in PROFILES[name].items()}
+    for service, values in (overrides or {}).items():
+        if service not in profiles:
+            raise ValueError(f"Unknown service {service!r} in overrides")
+        profiles[service].update(**values)
+    return profiles
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn starts in this directory.
+
+Every open tab holds a /api/changes event stream for as long as it is open,
+so workers must be threaded: a sync worker would spend its only slot on the
+stream and be killed by the worker timeout. Each stream takes one thread;
+size GUNICORN_THREADS for the expected tabs plus concurrent requests.
+
+Every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR and /metrics
+merges them. Start worker.py from the same directory (or with the same
+variable) so background job metrics are included too.
+"""
+import os
+
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+
+# Must be set before a worker imports prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.abspath(".prometheus_multiproc"))
+
+
+def on_starting(server):
+    # --worker-class / -k on the command line overrides the setting above
+    from gunicorn.workers.sync import SyncWorker
+
+    if issubclass(server.cfg.worker_class, SyncWorker):
+        raise RuntimeError(
+            "IV Studio needs threaded workers for its /api/changes event streams; "
+            "run with --worker-class gthread --threads N"
+        )
+
+    import metrics
+
+    # Counters of a previous run would otherwise be merged into this one
+    metrics.remove_dead_process_files()
+
+
+def child_exit(server, worker):
+    import metrics
+
+    metrics.mark_process_dead(worker.pid)
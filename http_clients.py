@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import observe_upstream
+
+# Keep-alive connections kept per upstream host (size it to the job worker count)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+# Retries for idempotent requests (GET/HEAD) on connection errors and 429/5xx
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+
+_sessions = {}
+_sessions_guard = threading.Lock()
+
+
+class _InstrumentedSession(requests.Session):
+    """Session that reports every request's time and outcome to the upstream metrics."""
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        status = None
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            observe_upstream(urlsplit(url).netloc, time.perf_counter() - started, status)
+
+
+def _build_session(retries: bool) -> requests.Session:
+    retry = Retry(
+        total=HTTP_RETRIES if retries else 0,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # POSTs (task creation, uploads, the n8n webhook) are not safe to repeat
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session = _InstrumentedSession()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url: str, retries: bool = True) -> requests.Session:
+    """
+    Shared requests.Session for the host of url.
+
+    One session per upstream (KIE API, redpandaai upload, n8n, Cloudinary
+    delivery) so each keeps its own warm keep-alive pool and a slow host
+    cannot starve the others of connections. retries=False gives a separate
+    session without adapter-level retries, for callers that retry on their
+    own schedule (the KIE poller).
+    """
+    key = (urlsplit(url).netloc, retries)
+    with _sessions_guard:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _build_session(retries)
+        return session
@@ -0,0 +1,333 @@
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import metrics
+from db import connection
+
+# Worker threads per process (web process or worker.py)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+# Queued jobs allowed before submissions are rejected
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "32"))
+# Per job-type concurrency caps, e.g. "video=2,insta_image=4,image=4"
+# (a batch job fans out on its own thread pool, so one at a time is enough)
+JOB_TYPE_LIMITS = os.getenv("JOB_TYPE_LIMITS", "video=2,insta_image=4,image=4,insta_batch=1")
+# How long shutdown waits for running jobs (keep below gunicorn's graceful_timeout)
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "25"))
+# A running job whose lease is not renewed within this window is considered orphaned
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Idle workers look for jobs enqueued by other processes this often
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are kept this long so task status can still be read
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# job type -> (handler, on_abandon)
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type: str, on_abandon=None):
+    """
+    Register fn(job, **payload) as the handler for job_type.
+
+    on_abandon(payload, error) is called once when a job runs out of attempts
+    (e.g. the worker kept dying mid-job), so the owning row can be marked failed.
+    """
+    def decorator(fn):
+        JOB_HANDLERS[job_type] = (fn, on_abandon)
+        return fn
+    return decorator
+
+
+def _parse_type_limits(spec: str) -> dict:
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is saturated."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail its job right away instead of retrying it."""
+
+
+class Job:
+    """A claimed job as seen by its handler."""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.type = row['type']
+        self.payload = json.loads(row['payload'] or '{}')
+        self.checkpoint = json.loads(row['checkpoint'] or '{}')
+        self.attempts = row['attempts']
+
+    @property
+    def is_last_attempt(self) -> bool:
+        """True when a failure of this run is final (no retry follows)."""
+        return self.attempts >= JOB_MAX_ATTEMPTS
+
+    def save_checkpoint(self, **values):
+        """Persist progress (e.g. an upstream task id) so a retry can resume instead of redoing it."""
+        self.checkpoint.update(values)
+        with connection() as db:
+            db.execute(
+                'UPDATE jobs SET checkpoint = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (json.dumps(self.checkpoint), self.id)
+            )
+            db.commit()
+
+
+class JobQueue:
+    """
+    Durable job queue stored in the jobs table.
+
+    Any process that calls start() (the web app and/or worker.py) claims jobs
+    with a time-limited lease and renews it from a heartbeat thread. If a
+    process dies its leases expire and another worker picks the job up again,
+    with the handler's last checkpoint. Per-type caps apply per process.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, type_limits: dict | None = None):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.type_limits = type_limits or {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running = {}
+        self._avg_duration = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    # ---- producer side ----
+    def submit(self, job_type: str, **payload) -> int:
+        """Enqueue a job and return its id; raises QueueFull when the queue is at its limit."""
+        if self._stopping.is_set():
+            raise QueueFull(retry_after=30)
+        with connection() as db:
+            # Take the write lock before counting so concurrent processes cannot all pass the limit
+            db.execute("BEGIN IMMEDIATE")
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+            if queued >= self.queue_limit:
+                db.rollback()
+                raise QueueFull(retry_after=self._retry_after(queued))
+            cursor = db.execute(
+                "INSERT INTO jobs (type, payload, max_attempts) VALUES (?, ?, ?)",
+                (job_type, json.dumps(payload), JOB_MAX_ATTEMPTS)
+            )
+            db.commit()
+            job_id = cursor.lastrowid
+        # Wake a local worker right away instead of waiting for the next poll
+        with self._cond:
+            self._cond.notify()
+        return job_id
+
+    def _retry_after(self, queued: int) -> int:
+        # Rough time for the current backlog to clear, from recent job durations
+        avg = sum(self._avg_duration.values()) / len(self._avg_duration) if self._avg_duration else 10
+        return max(1, min(300, int(avg * queued / max(self.workers, 1))))
+
+    # ---- worker side ----
+    def start(self):
+        """Recover orphaned jobs and start worker + heartbeat threads in this process."""
+        if self._threads:
+            return
+        with connection() as db:
+            reclaimed = db.execute('''
+                UPDATE jobs SET state = 'queued', lease_owner = NULL, lease_expires_at = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE state = 'running' AND lease_expires_at < ?
+            ''', (time.time(),)).rowcount
+            db.commit()
+        if reclaimed:
+            print(f"[Jobs] Reclaimed {reclaimed} job(s) with expired leases")
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        print(f"[Jobs] {self.workers} workers started as {self.owner}")
+
+    def _claim(self):
+        """Lease the oldest runnable job whose type has spare capacity here."""
+        with self._lock:
+            types = [
+                t for t in JOB_HANDLERS
+                if self._running.get(t, 0) < self.type_limits.get(t, self.workers)
+            ]
+            if not types:
+                return None
+            now = time.time()
+            with connection() as db:
+                db.execute("BEGIN IMMEDIATE")
+                row = db.execute(f'''
+                    SELECT * FROM jobs
+                    WHERE type IN ({', '.join('?' for _ in types)})
+                      AND (state = 'queued' OR (state = 'running' AND lease_expires_at < ?))
+                    ORDER BY id LIMIT 1
+                ''', (*types, now)).fetchone()
+                if row is None:
+                    db.rollback()
+                    return None
+                if row['attempts'] >= row['max_attempts']:
+                    db.execute('''
+                        UPDATE jobs SET state = 'failed', lease_owner = NULL,
+                            last_error = COALESCE(last_error, 'worker lost during job'),
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (row['id'],))
+                    db.commit()
+                    self._abandon(row)
+                    return None
+                db.execute('''
+                    UPDATE jobs SET state = 'running', lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (self.owner, now + JOB_LEASE_SECONDS, row['id']))
+                db.commit()
+            job = Job(row)
+            job.attempts += 1
+            self._running[job.type] = self._running.get(job.type, 0) + 1
+            return job
+
+    def _abandon(self, row):
+        on_abandon = JOB_HANDLERS.get(row['type'], (None, None))[1]
+        print(f"[Jobs] Giving up on {row['type']} job {row['id']} after {row['attempts']} attempts")
+        if on_abandon:
+            try:
+                on_abandon(json.loads(row['payload'] or '{}'), row['last_error'] or 'worker lost during job')
+            except Exception:
+                traceback.print_exc()
+
+    def _finish(self, job: Job, state: str, result=None, error: str | None = None):
+        with connection() as db:
+            db.execute('''
+                UPDATE jobs SET state = ?, result = ?, last_error = ?, lease_owner = NULL,
+                    lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ?
+            ''', (state, json.dumps(result) if result is not None else None, error, job.id, self.owner))
+            db.commit()
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"[Jobs] Claim failed: {e}")
+                job = None
+            if job is None:
+                with self._cond:
+                    self._cond.wait(JOB_POLL_INTERVAL)
+                continue
+
+            handler = JOB_HANDLERS[job.type][0]
+            started = time.time()
+            outcome = 'done'
+            metrics.JOBS_IN_FLIGHT.labels(job.type).inc()
+            try:
+                result = handler(job, **job.payload)
+                self._finish(job, 'done', result=result)
+            except Exception as e:
+                print(f"[Jobs] {job.type} job {job.id} failed (attempt {job.attempts}): {e}")
+                traceback.print_exc()
+                retry = not isinstance(e, JobFailed) and not job.is_last_attempt
+                outcome = 'retry' if retry else 'failed'
+                self._finish(job, 'queued' if retry else 'failed', error=str(e))
+                if not retry:
+                    self._abandon({'id': job.id, 'type': job.type, 'attempts': job.attempts,
+                                   'payload': json.dumps(job.payload), 'last_error': str(e)})
+            finally:
+                duration = time.time() - started
+                metrics.JOBS_IN_FLIGHT.labels(job.type).dec()
+                metrics.JOB_DURATION.labels(job.type, outcome).observe(duration)
+                with self._lock:
+                    self._running[job.type] -= 1
+                    prev = self._avg_duration.get(job.type)
+                    self._avg_duration[job.type] = duration if prev is None else 0.8 * prev + 0.2 * duration
+
+    def _heartbeat(self):
+        last_prune = 0
+        while not self._stopping.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                with connection() as db:
+                    db.execute('''
+                        UPDATE jobs SET lease_expires_at = ?
+                        WHERE state = 'running' AND lease_owner = ?
+                    ''', (time.time() + JOB_LEASE_SECONDS, self.owner))
+                    if time.time() - last_prune > 3600:
+                        db.execute('''
+                            DELETE FROM jobs WHERE state IN ('done', 'failed')
+                              AND updated_at < datetime('now', ?)
+                        ''', (f'-{int(JOB_RETENTION_SECONDS)} seconds',))
+                        last_prune = time.time()
+                    db.commit()
+            except Exception as e:
+                print(f"[Jobs] Heartbeat failed: {e}")
+
+    def status(self, job_id: int):
+        """Public view of a job (no payload), or None if it does not exist or was pruned."""
+        with connection() as db:
+            row = db.execute('''
+                SELECT id, type, state, attempts, result, last_error, created_at, updated_at
+                FROM jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "task_id": row['id'],
+            "type": row['type'],
+            "status": row['state'],
+            "attempts": row['attempts'],
+            "result": json.loads(row['result']) if row['result'] else None,
+            "error": row['last_error'],
+            "created_at": row['created_at'],
+            "updated_at": row['updated_at'],
+        }
+
+    def stats(self) -> dict:
+        with connection() as db:
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+        with self._lock:
+            running = dict(self._running)
+        return {
+            "queued": queued,
+            "running": running,
+            "queue_limit": self.queue_limit,
+            "workers": self.workers,
+        }
+
+    def shutdown(self, timeout: float = JOB_DRAIN_TIMEOUT):
+        """Stop claiming jobs and wait up to timeout for running ones to finish."""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        deadline = time.time() + timeout
+        for t in self._threads:
+            t.join(max(0, deadline - time.time()))
+        with self._lock:
+            left = sum(self._running.values())
+        if left:
+            # Their leases will expire and another worker will resume them
+            print(f"[Jobs] Shutdown timed out with {left} job(s) still running")
+
+
+executor = JobQueue(JOB_WORKERS, JOB_QUEUE_LIMIT, _parse_type_limits(JOB_TYPE_LIMITS))
+# Drain on interpreter exit (gunicorn worker SIGTERM / Ctrl+C)
+atexit.register(executor.shutdown)
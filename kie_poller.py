@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+import metrics
+from http_clients import session_for
+
+# Most KIE image tasks finish in 30-90s, so the first check waits a bit and
+# later checks back off towards the cap instead of hammering every 3s.
+KIE_POLL_INITIAL_DELAY = float(os.getenv("KIE_POLL_INITIAL_DELAY", "5"))
+KIE_POLL_MAX_INTERVAL = float(os.getenv("KIE_POLL_MAX_INTERVAL", "15"))
+KIE_POLL_BACKOFF = float(os.getenv("KIE_POLL_BACKOFF", "1.5"))
+# +/- fraction applied to every delay so tasks created together do not poll in lockstep
+KIE_POLL_JITTER = float(os.getenv("KIE_POLL_JITTER", "0.2"))
+# Consecutive status-request errors tolerated before a task is failed
+KIE_POLL_MAX_ERRORS = int(os.getenv("KIE_POLL_MAX_ERRORS", "5"))
+# Per-request timeout of a status check; a failed check is simply retried on the next tick
+KIE_POLL_REQUEST_TIMEOUT = float(os.getenv("KIE_POLL_REQUEST_TIMEOUT", "10"))
+# Status checks in flight at once, so one slow response does not hold up every other task
+KIE_POLL_CONCURRENCY = int(os.getenv("KIE_POLL_CONCURRENCY", "4"))
+
+
+def _retry_after(response) -> float:
+    """Seconds a throttled (429/503) status response asks us to wait, 0 if none."""
+    if response is None or response.status_code not in (429, 503):
+        return 0.0
+    try:
+        return max(float(response.headers.get("Retry-After", 0)), 0.0)
+    except ValueError:
+        return 0.0
+
+
+class _Watch:
+    def __init__(self, task_id: str, deadline: float):
+        self.task_id = task_id
+        self.future = Future()
+        self.started = time.time()
+        self.deadline = deadline
+        self.interval = KIE_POLL_INITIAL_DELAY
+        self.errors = 0
+
+
+class KiePoller:
+    """
+    One background thread that schedules polls of every outstanding KIE task.
+
+    Callers register a task id with watch() and block on the returned future.
+    Each task is checked on its own backoff schedule (initial delay, then
+    growing by KIE_POLL_BACKOFF up to KIE_POLL_MAX_INTERVAL, with jitter), so
+    outbound requests and threads stay flat no matter how many jobs wait.
+    The checks themselves run on a small pool (KIE_POLL_CONCURRENCY) with a
+    short timeout and no adapter-level retries, so the scheduler never blocks
+    on a hung or throttled request; the per-task error count covers failures.
+    """
+
+    def __init__(self, status_url: str, api_key: str | None, request_timeout: float = KIE_POLL_REQUEST_TIMEOUT):
+        self.status_url = status_url
+        self.api_key = api_key
+        self.request_timeout = request_timeout
+        self._watches = {}
+        self._schedule = []  # heap of (due_at, seq, task_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._checks = ThreadPoolExecutor(max_workers=KIE_POLL_CONCURRENCY, thread_name_prefix="kie-poll")
+
+    def watch(self, task_id: str, timeout_sec: float = 240) -> Future:
+        """Future resolving to the task's result URLs (RuntimeError on failure, TimeoutError on deadline)."""
+        with self._cond:
+            watch = self._watches.get(task_id)
+            if watch is None:
+                watch = self._watches[task_id] = _Watch(task_id, time.time() + timeout_sec)
+                metrics.KIE_WATCHED_TASKS.inc()
+                self._schedule_next(watch, watch.interval)
+                self._cond.notify()
+            else:
+                # Same task awaited twice (e.g. a resumed job): share one poll, keep the later deadline
+                watch.deadline = max(watch.deadline, time.time() + timeout_sec)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="kie-poller", daemon=True)
+                self._thread.start()
+            return watch.future
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._watches)
+
+    def _schedule_next(self, watch: _Watch, delay: float):
+        delay *= 1 + random.uniform(-KIE_POLL_JITTER, KIE_POLL_JITTER)
+        heapq.heappush(self._schedule, (time.time() + delay, next(self._seq), watch.task_id))
+
+    def _next_due(self):
+        """Block until a task is due and return its watch (called without the lock held)."""
+        with self._cond:
+            while True:
+                if not self._schedule:
+                    self._cond.wait()
+                    continue
+                due_at, _, task_id = self._schedule[0]
+                now = time.time()
+                if due_at > now:
+                    self._cond.wait(due_at - now)
+                    continue
+                heapq.heappop(self._schedule)
+                watch = self._watches.get(task_id)
+                if watch is not None:
+                    return watch
+
+    def _resolve(self, watch: _Watch, result=None, error: Exception | None = None):
+        with self._cond:
+            removed = self._watches.pop(watch.task_id, None)
+        if removed is not None:
+            metrics.KIE_WATCHED_TASKS.dec()
+            outcome = "success" if error is None else "timeout" if isinstance(error, TimeoutError) else "failed"
+            metrics.KIE_TASK_WAIT.labels(outcome).observe(time.time() - watch.started)
+        if error is not None:
+            watch.future.set_exception(error)
+        else:
+            watch.future.set_result(result)
+
+    def _run(self):
+        while True:
+            # A watch is only rescheduled once its check finishes, so it is never checked twice at once
+            self._checks.submit(self._safe_check, self._next_due())
+
+    def _safe_check(self, watch: _Watch):
+        try:
+            self._check(watch)
+        except Exception as e:
+            print(f"[KIE Poller] Unexpected error for task {watch.task_id}: {e}")
+            self._resolve(watch, error=e)
+
+    def _check(self, watch: _Watch):
+        started = time.perf_counter()
+        retry_after = 0.0
+        try:
+            r = session_for(self.status_url, retries=False).get(
+                self.status_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                params={"taskId": watch.task_id},
+                timeout=self.request_timeout
+            )
+            r.raise_for_status()
+            data = r.json().get("data") or {}
+            watch.errors = 0
+        except (requests.RequestException, ValueError) as e:
+            metrics.KIE_POLLS.labels("error").inc()
+            metrics.KIE_POLL_DURATION.observe(time.perf_counter() - started)
+            watch.errors += 1
+            retry_after = _retry_after(getattr(e, "response", None))
+            print(f"[KIE Poller] Status check {watch.errors}/{KIE_POLL_MAX_ERRORS} failed for {watch.task_id}: {e}")
+            if watch.errors >= KIE_POLL_MAX_ERRORS:
+                self._resolve(watch, error=e)
+                return
+            data = {}
+        else:
+            metrics.KIE_POLL_DURATION.observe(time.perf_counter() - started)
+            polled_state = (data.get("state") or "").lower().strip()
+            metrics.KIE_POLLS.labels(polled_state if polled_state in ("success", "fail") else "pending").inc()
+
+        state = (data.get("state") or "").lower().strip()
+        if state == "success":
+            result_obj = json.loads(data.get("resultJson") or "{}")
+            self._resolve(watch, result=result_obj.get("resultUrls") or [])
+        elif state == "fail":
+            self._resolve(watch, error=RuntimeError(f"Generation failed: {data.get('failMsg')}"))
+        elif time.time() >= watch.deadline:
+            self._resolve(watch, error=TimeoutError("Timed out waiting for image generation task."))
+        else:
+            watch.interval = min(watch.interval * KIE_POLL_BACKOFF, KIE_POLL_MAX_INTERVAL)
+            with self._cond:
+                delay = max(watch.interval, retry_after)
+                self._schedule_next(watch, min(delay, max(watch.deadline - time.time(), 0)))
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for the web app and the background job workers, served at /metrics.
+
+With PROMETHEUS_MULTIPROC_DIR set, every process (each gunicorn worker and
+worker.py) writes its samples to files in that directory and a scrape merges
+them, so counters and histograms add up across processes. gunicorn.conf.py
+sets a default directory and removes the files of dead workers. The variable
+must be in the environment before this module is first imported.
+"""
+import os
+import re
+import sqlite3
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROCESS_DIR:
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+
+# Upstream calls range from a ~50ms status check to minutes-long uploads / webhooks
+_UPSTREAM_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+_JOB_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+_SQLITE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "iv_http_request_duration_seconds",
+    "Time to build a Flask response (streamed bodies are not included), per route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+JOBS_IN_FLIGHT = Gauge(
+    "iv_jobs_in_flight", "Background jobs running right now, per type", ["type"], multiprocess_mode="livesum"
+)
+JOB_DURATION = Histogram(
+    "iv_job_duration_seconds", "Background job run time per type and outcome (done / retry / failed)",
+    ["type", "outcome"], buckets=_JOB_BUCKETS,
+)
+KIE_POLLS = Counter(
+    "iv_kie_polls_total", "KIE task status checks by result (pending / success / fail / error)", ["outcome"]
+)
+KIE_POLL_DURATION = Histogram(
+    "iv_kie_poll_duration_seconds", "Time of one KIE task status request", buckets=_UPSTREAM_BUCKETS
+)
+KIE_TASK_WAIT = Histogram(
+    "iv_kie_task_wait_seconds", "Time from watching a KIE task to its result, per outcome (success / failed / timeout)",
+    ["outcome"], buckets=(1, 5, 10, 20, 30, 45, 60, 90, 120, 180, 240, 600),
+)
+KIE_WATCHED_TASKS = Gauge(
+    "iv_kie_watched_tasks", "KIE tasks the poller is waiting on", multiprocess_mode="livesum"
+)
+UPSTREAM_REQUESTS = Counter(
+    "iv_upstream_requests_total", "Outbound requests per upstream host and outcome (2xx..5xx / error)",
+    ["upstream", "outcome"],
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "iv_upstream_request_duration_seconds", "Outbound request time per upstream host", ["upstream"],
+    buckets=_UPSTREAM_BUCKETS,
+)
+SQLITE_QUERY_DURATION = Histogram(
+    "iv_sqlite_query_duration_seconds", "SQLite statement execution and commit time per database and kind",
+    ["database", "kind"], buckets=_SQLITE_BUCKETS,
+)
+
+
+def observe_upstream(upstream: str, seconds: float, status: int | None) -> None:
+    """Count one outbound request; status None means it failed without a response."""
+    outcome = f"{status // 100}xx" if status else "error"
+    UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+    UPSTREAM_REQUEST_DURATION.labels(upstream).observe(seconds)
+
+
+def _statement_kind(sql: str) -> str:
+    verb = sql.lstrip()[:6].upper()
+    if verb.startswith(("SELECT", "WITH")):
+        return "read"
+    if verb.startswith("PRAGMA"):
+        return "pragma"
+    return "write"
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection (pass as factory=) that records execute / commit times."""
+
+    database = "app"
+
+    def _time_query(self, kind, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            SQLITE_QUERY_DURATION.labels(self.database, kind).observe(time.perf_counter() - started)
+
+    def execute(self, sql, *args):
+        return self._time_query(_statement_kind(sql), super().execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._time_query(_statement_kind(sql), super().executemany, sql, *args)
+
+    def commit(self):
+        return self._time_query("commit", super().commit)
+
+
+class CacheTimedConnection(TimedConnection):
+    database = "cache"
+
+
+class QueueDepthCollector:
+    """Jobs per state in the shared jobs table, counted at scrape time (one value for all processes)."""
+
+    def describe(self):
+        return [self._family()]
+
+    @staticmethod
+    def _family():
+        return GaugeMetricFamily("iv_job_queue_depth", "Jobs in the shared queue per state", labels=["state"])
+
+    def collect(self):
+        from db import connection
+
+        family = self._family()
+        with connection() as db:
+            counts = dict(db.execute('''
+                SELECT state, COUNT(*) FROM jobs WHERE state IN ('queued', 'running') GROUP BY state
+            ''').fetchall())
+        for state in ("queued", "running"):
+            family.add_metric([state], counts.get(state, 0))
+        yield family
+
+
+_queue_depth = QueueDepthCollector()
+if not MULTIPROCESS_DIR:
+    REGISTRY.register(_queue_depth)
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition text of every process's metrics plus the queue depth, and its content type."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_queue_depth)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_dead_process_files() -> None:
+    """Delete metric files left by processes that no longer exist (on gunicorn start)."""
+    if not MULTIPROCESS_DIR:
+        return
+    for name in os.listdir(MULTIPROCESS_DIR):
+        match = re.search(r"_(\d+)\.db$", name)
+        if match and not _process_alive(int(match.group(1))):
+            os.remove(os.path.join(MULTIPROCESS_DIR, name))
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop the live gauges (in-flight jobs, watched KIE tasks) of an exited process."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROCESS_DIR)
@@ -1,24 +1,51 @@
+import contextvars
+import hashlib
+import json
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
-import cloudinary
-import cloudinary.uploader
-
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
+from openai import APIConnectionError
 from langchain_core.prompts import PromptTemplate
 
-load_dotenv()
+from cache_store import cache, llm_response_cache
+from metrics import observe_upstream
+from uploads import cloudinary_upload_bytes
 
-DEFAULT_LOGO_URL = "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770974447/mwkdoaojy5wpwzoewyb5.png"
-DEFAULT_CHARACTER_URL = "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770972383/jyn46erxuogos2dlgmae.jpg"
+load_dotenv()
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
+DEFAULT_LOGO_URL = os.getenv("DEFAULT_LOGO_URL", "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770974447/mwkdoaojy5wpwzoewyb5.png")
+DEFAULT_CHARACTER_URL = os.getenv("DEFAULT_CHARACTER_URL", "https://res.cloudinary.com/dgtlwozlu/image/upload/v1770972383/jyn46erxuogos2dlgmae.jpg")
+
+# Run the independent pipeline branches (colors / character+concept / copy) in parallel.
+PIPELINE_CONCURRENT = os.getenv("PIPELINE_CONCURRENT", "1") == "1"
+
+# Logo colors / character descriptions only depend on the image bytes (default 30 days).
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))
+
+# OpenAI request timeout (seconds) and retries on connection errors / 429 / 5xx.
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# Alternative API endpoint, e.g. a local fake_upstream server for offline load tests.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Upstream label of OpenAI requests in the metrics
+OPENAI_HOST = urlsplit(OPENAI_BASE_URL).netloc if OPENAI_BASE_URL else "api.openai.com"
+
+# Opt-in cache of LLM text responses keyed on (model, params, rendered prompt).
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+# Per-stage TTLs in seconds; stages not listed are not cached.
+LLM_CACHE_TTLS = os.getenv(
+    "LLM_CACHE_TTLS",
+    "marketing_copy=604800,hiring_copy=604800,concept=86400,final_prompt=86400"
 )
 
 COMPANY_CONTEXT = {
@@ -40,35 +67,270 @@ COMPANY_CONTEXT = {
 # ======================
 # HELPERS
 # ======================
-def cloudinary_upload_bytes(file_bytes: bytes, filename: str, folder="kie-inputs") -> str:
-    """Upload image bytes to Cloudinary and return a public HTTPS URL."""
-    if not (
-        os.getenv("CLOUDINARY_CLOUD_NAME")
-        and os.getenv("CLOUDINARY_API_KEY")
-        and os.getenv("CLOUDINARY_API_SECRET")
-    ):
-        raise RuntimeError("Cloudinary credentials missing (CLOUDINARY_CLOUD_NAME / KEY / SECRET).")
-
-    result = cloudinary.uploader.upload(
-        file_bytes,
-        folder=folder,
-        public_id=os.path.splitext(filename)[0],
-        overwrite=True,
-        resource_type="image"
-    )
-    return result["secure_url"]
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+
+
+def _parse_stage_ttls(spec: str) -> dict:
+    ttls = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            ttls[name.strip()] = float(value)
+    return ttls
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM text responses.
+
+    A small in-process LRU answers repeat requests without touching disk;
+    misses fall through to the shared SQLite LLM cache table (one namespace
+    per stage) so every worker benefits from a response generated anywhere.
+    """
+
+    def __init__(self, ttls: dict, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.ttls = ttls
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, stage: str, key: str):
+        ttl = self.ttls.get(stage)
+        if ttl is None:
+            return None
+        with self._lock:
+            entry = self._memory.get((stage, key))
+            if entry is not None:
+                value, stored_at = entry
+                if time.time() - stored_at <= ttl:
+                    self._memory.move_to_end((stage, key))
+                    return value
+                del self._memory[(stage, key)]
+        entry = llm_response_cache.get_entry(f"llm:{stage}", key, ttl=ttl)
+        if entry is None:
+            return None
+        value, created_at = entry
+        # Keep the SQLite creation time so the memory copy expires with the shared entry
+        self._remember(stage, key, value, created_at)
+        return value
+
+    def set(self, stage: str, key: str, value: str) -> None:
+        if stage not in self.ttls:
+            return
+        self._remember(stage, key, value, time.time())
+        llm_response_cache.set(f"llm:{stage}", key, value)
+
+    def _remember(self, stage: str, key: str, value: str, stored_at: float):
+        with self._lock:
+            self._memory[(stage, key)] = (value, stored_at)
+            self._memory.move_to_end((stage, key))
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+
+llm_cache = LLMResponseCache(_parse_stage_ttls(LLM_CACHE_TTLS))
+
+
+# Span of the stage running on this thread (every pipeline branch runs on its own thread)
+_current_span = contextvars.ContextVar("prompt_stage_span", default=None)
+
+
+class StageTimings:
+    """
+    Spans recorded during one pipeline run: one per stage, one per concept attempt.
+
+    A span holds its start offset and wall time, the model and the prompt /
+    completion tokens summed over its LLM calls, and the cache hits that
+    answered it. status is "ok", "error" or (for a concept) "rejected".
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        span = {
+            "stage": stage,
+            **attrs,
+            "start_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "duration_ms": None,
+            "model": None,
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cache_hits": [],
+            "status": "ok",
+        }
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["status"] = "error"
+            span["detail"] = str(e)[:200]
+            raise
+        finally:
+            span["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def summary(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "spans": spans,
+        }
+
+
+def _record_llm_call(llm: ChatOpenAI, message) -> None:
+    """Add the model and token usage of one LLM response to the current stage span."""
+    span = _current_span.get()
+    if span is None:
+        return
+    usage = getattr(message, "usage_metadata", None) or {}
+    span["model"] = llm.model_name
+    span["llm_calls"] += 1
+    span["prompt_tokens"] += usage.get("input_tokens", 0)
+    span["completion_tokens"] += usage.get("output_tokens", 0)
+
+
+@contextmanager
+def _openai_request():
+    """Report the time and outcome of one OpenAI call to the upstream metrics."""
+    started = time.perf_counter()
+    status = None
+    try:
+        yield
+        status = 200
+    except Exception as e:
+        status = getattr(e, "status_code", None)
+        raise
+    finally:
+        observe_upstream(OPENAI_HOST, time.perf_counter() - started, status)
 
 
-def ensure_image_url(image_bytes: bytes | None, default_url: str, filename: str) -> str:
+def is_transient_llm_error(error: Exception) -> bool:
+    """True for OpenAI failures worth retrying later: throttling, 5xx, timeouts and dropped connections."""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _note_cache_hit(cache_hits: list | None, name: str) -> None:
+    if cache_hits is not None:
+        cache_hits.append(name)
+    span = _current_span.get()
+    if span is not None:
+        span["cache_hits"].append(name)
+
+
+def ensure_image_url(image_bytes: bytes | None, default_url: str) -> str:
     """
-    If image_bytes exists -> upload to cloudinary -> return URL
+    If image_bytes exists -> upload to cloudinary (deduplicated by content hash) -> return URL
     else -> return default_url
     """
     if image_bytes:
-        return cloudinary_upload_bytes(image_bytes, filename=filename)
+        return cloudinary_upload_bytes(image_bytes)
     return default_url
 
 
+def get_llm(api_key: str, model: str = "gpt-4o-mini", max_tokens: int | None = None) -> ChatOpenAI:
+    """
+    Shared ChatOpenAI client for (api_key, model, max_tokens).
+
+    Clients are thread-safe and keep their HTTP connection pool alive, so every
+    pipeline run reuses the same warm connections instead of building new ones.
+    """
+    key = (api_key, model, max_tokens)
+    with _llm_clients_lock:
+        llm = _llm_clients.get(key)
+        if llm is None:
+            llm = _llm_clients[key] = ChatOpenAI(
+                model=model,
+                openai_api_key=api_key,
+                max_tokens=max_tokens,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=OPENAI_MAX_RETRIES,
+                base_url=OPENAI_BASE_URL,
+                # Streamed answers end with a usage chunk, so streamed stages report tokens too
+                stream_usage=True,
+            )
+        return llm
+
+
+def _complete(llm: ChatOpenAI, prompt: str, on_token=None) -> str:
+    """llm.invoke(prompt).content, streamed chunk by chunk to on_token when it is given."""
+    if on_token is None:
+        with _openai_request():
+            message = llm.invoke(prompt)
+        _record_llm_call(llm, message)
+        return message.content
+    parts = []
+    usage_chunk = None
+    with _openai_request():
+        for chunk in llm.stream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                on_token(chunk.content)
+            if chunk.usage_metadata:
+                usage_chunk = chunk
+    _record_llm_call(llm, usage_chunk)
+    return "".join(parts)
+
+
+def _cached_complete(
+    llm: ChatOpenAI,
+    prompt: str,
+    stage: str,
+    *,
+    use_cache: bool = False,
+    cache_hits: list | None = None,
+    on_token=None,
+    cacheable=None,
+) -> str:
+    """
+    _complete() behind the LLM response cache when use_cache is set.
+
+    Hits are appended to cache_hits (as "llm:<stage>") and replayed to on_token
+    in one piece. cacheable(text) can veto storing a response, e.g. one that
+    failed a quality gate.
+    """
+    if not use_cache:
+        return _complete(llm, prompt, on_token)
+
+    key = hashlib.sha256(json.dumps(
+        [llm.model_name, llm.max_tokens, llm.temperature, prompt]
+    ).encode("utf-8")).hexdigest()
+    cached = llm_cache.get(stage, key)
+    if cached is not None:
+        print(f"[Cache] LLM {stage} hit")
+        _note_cache_hit(cache_hits, f"llm:{stage}")
+        if on_token is not None:
+            on_token(cached)
+        return cached
+
+    result = _complete(llm, prompt, on_token)
+    if result and (cacheable is None or cacheable(result)):
+        llm_cache.set(stage, key, result)
+    return result
+
+
+def image_cache_key(image_bytes: bytes | None, fallback_url: str) -> str:
+    """
+    Content hash of the image bytes. When no bytes were given the (versioned)
+    Cloudinary default URL is used instead, since it always serves the same file.
+    """
+    if image_bytes:
+        return "sha256:" + hashlib.sha256(image_bytes).hexdigest()
+    return "url:" + fallback_url
+
+
 # ======================
 # IMAGE ANALYSIS (URL-based)
 # ======================
@@ -80,7 +342,7 @@ Task 2: Identify a **SECONDARY/ACCENT Color**.
 OUTPUT FORMAT: Return ONLY two HEX codes separated by a comma.
 """
 
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key, max_tokens=50)
+    llm = get_llm(api_key, max_tokens=50)
 
     content = [{"type": "text", "text": prompt}]
     if logo_url:
@@ -89,7 +351,9 @@ OUTPUT FORMAT: Return ONLY two HEX codes separated by a comma.
     print("Sending logo URL to LLM for color analysis:", logo_url)
 
     try:
-        response = llm.invoke([HumanMessage(content=content)])
+        with _openai_request():
+            response = llm.invoke([HumanMessage(content=content)])
+        _record_llm_call(llm, response)
         text = (response.content or "").strip()
         hex_colors = [c.strip() for c in text.split(",") if c.strip()]
 
@@ -112,7 +376,7 @@ Avoid mentioning photographic terms (studio lighting, bokeh, camera lens, HDR, u
 Write 6-10 bullet points. No JSON.
 """
 
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key, max_tokens=220)
+    llm = get_llm(api_key, max_tokens=220)
 
     content = [{"type": "text", "text": prompt}]
     if character_url:
@@ -121,13 +385,44 @@ Write 6-10 bullet points. No JSON.
     print("Sending character URL to LLM for description:", character_url)
 
     try:
-        response = llm.invoke([HumanMessage(content=content)])
+        with _openai_request():
+            response = llm.invoke([HumanMessage(content=content)])
+        _record_llm_call(llm, response)
         return (response.content or "").strip()
     except Exception as e:
         print(f"Error in character description: {e}")
         return "Character description not available."
 
 
+def get_brand_colors_cached(image_key: str, logo_url: str, api_key: str, cache_hits: list | None = None):
+    """get_brand_colors_with_ai_url behind the content-addressed analysis cache."""
+    cached = cache.get("brand_colors:gpt-4o-mini", image_key, ttl=ANALYSIS_CACHE_TTL)
+    if cached:
+        print(f"[Cache] Brand colors hit for {image_key[:19]}")
+        _note_cache_hit(cache_hits, "brand_colors")
+        return cached
+
+    colors = get_brand_colors_with_ai_url(logo_url, api_key)
+    # Don't pin the hardcoded fallback colors returned on errors
+    if colors != ["#0055FF", "#555555"]:
+        cache.set("brand_colors:gpt-4o-mini", image_key, colors)
+    return colors
+
+
+def get_character_description_cached(image_key: str, character_url: str, api_key: str, cache_hits: list | None = None):
+    """get_character_description_url behind the content-addressed analysis cache."""
+    cached = cache.get("character_description:gpt-4o-mini", image_key, ttl=ANALYSIS_CACHE_TTL)
+    if cached:
+        print(f"[Cache] Character description hit for {image_key[:19]}")
+        _note_cache_hit(cache_hits, "character_description")
+        return cached
+
+    description = get_character_description_url(character_url, api_key)
+    if description and description != "Character description not available.":
+        cache.set("character_description:gpt-4o-mini", image_key, description)
+    return description
+
+
 # -------------------------
 # Hiring details helper (single source of truth)
 # -------------------------
@@ -166,9 +461,11 @@ def generate_visual_concept(
     position: str = "",
     experience: str = "",
     post: str = "",
-    location: str = ""
+    location: str = "",
+    use_cache: bool = False,
+    cache_hits: list | None = None
 ):
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key)
+    llm = get_llm(api_key)
     hiring_details_block = _format_hiring_details(position, experience, post, location)
 
     template = """
@@ -299,15 +596,21 @@ Do NOT mention camera details.
         ],
     )
 
-    return llm.invoke(
+    # Only concepts that pass the quality gate are cached, so retries still get fresh candidates
+    return _cached_complete(
+        llm,
         prompt.format(
             banner_mode=banner_mode,
             keyword=keyword,
             services=services,
             character_description=character_description,
             hiring_details_block=hiring_details_block
-        )
-    ).content
+        ),
+        "concept",
+        use_cache=use_cache,
+        cache_hits=cache_hits,
+        cacheable=lambda text: validate_concept(text)[0]
+    )
 
 
 # -------------------------
@@ -348,8 +651,8 @@ def validate_concept(concept_text: str) -> tuple[bool, str]:
     return True, "ok"
 
 
-def get_marketing_copy(keyword, company_name, api_key):
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key)
+def get_marketing_copy(keyword, company_name, api_key, use_cache=False, cache_hits=None):
+    llm = get_llm(api_key)
 
     template = """
 Create a concise, professional headline for {company} centered on “{keyword}.”
@@ -363,15 +666,16 @@ HEADLINE: [Headline text]
     formatted = prompt.format(keyword=keyword, company=company_name)
 
     try:
-        response = llm.invoke([HumanMessage(content=formatted)])
-        return (response.content or "").strip()
+        response = _cached_complete(llm, formatted, "marketing_copy", use_cache=use_cache, cache_hits=cache_hits)
+        return (response or "").strip()
     except Exception as e:
         print(f"Error in marketing copy generation: {e}")
         return "Marketing copy generation failed."
 
 
-def get_hiring_copy(keyword, company_name, address, api_key, position="", experience="", location="", post=""):
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key)
+def get_hiring_copy(keyword, company_name, address, api_key, position="", experience="", location="", post="",
+                    use_cache=False, cache_hits=None):
+    llm = get_llm(api_key)
 
     template = """
 You are a senior copywriter creating text for a premium corporate hiring banner.
@@ -397,20 +701,33 @@ ADDRESS: [text]
     )
 
     try:
-        response = llm.invoke([HumanMessage(content=formatted)])
-        return (response.content or "").strip()
+        response = _cached_complete(llm, formatted, "hiring_copy", use_cache=use_cache, cache_hits=cache_hits)
+        return (response or "").strip()
     except Exception as e:
         print(f"Error in hiring copy generation: {e}")
         return "Hiring copy generation failed."
 
 
+_HIRING_RED_FLAGS = ["we're hiring", "apply now", "join our team", "candidate card", "resume tile", "skill badge"]
+
+
+def _find_hiring_leak(prompt_text: str) -> str | None:
+    """First hiring indicator found in a Marketing prompt, or None."""
+    lowercase_text = prompt_text.lower()
+    for flag in _HIRING_RED_FLAGS:
+        if flag in lowercase_text:
+            return flag
+    return None
+
+
 def get_final_prompt(
     banner_mode, keyword, title, subtitle, address_line,
     primary, secondary, visual_concept, website, phone, api_key,
     character_description,
-    position="", experience="", post="", location=""
+    position="", experience="", post="", location="",
+    on_token=None, use_cache=False, cache_hits=None
 ):
-    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key)
+    llm = get_llm(api_key)
 
     if banner_mode not in ["MARKETING", "HIRING"]:
         raise ValueError("Invalid banner_mode. Must be MARKETING or HIRING.")
@@ -496,14 +813,16 @@ Return ONE cohesive detailed image generation prompt only.
 Do NOT explain.
 """
 
-        result = llm.invoke(template_text).content
+        result = _cached_complete(
+            llm, template_text, "final_prompt",
+            use_cache=use_cache, cache_hits=cache_hits, on_token=on_token,
+            cacheable=lambda text: _find_hiring_leak(text) is None
+        )
 
         # Safety: prevent hiring leakage (check for specific hiring indicators, not just the word)
-        hiring_red_flags = ["we're hiring", "apply now", "join our team", "candidate card", "resume tile", "skill badge"]
-        lowercase_result = result.lower()
-        for flag in hiring_red_flags:
-            if flag in lowercase_result:
-                raise ValueError(f"Mode leakage detected: Hiring indicator '{flag}' found in Marketing prompt.")
+        flag = _find_hiring_leak(result)
+        if flag:
+            raise ValueError(f"Mode leakage detected: Hiring indicator '{flag}' found in Marketing prompt.")
 
         return result
 
@@ -581,62 +900,57 @@ Return ONE cohesive detailed image generation prompt only.
 Do NOT explain.
 """
 
-        return llm.invoke(template_text).content
+        return _cached_complete(
+            llm, template_text, "final_prompt",
+            use_cache=use_cache, cache_hits=cache_hits, on_token=on_token
+        )
+
 
 # ======================
-# MAIN PIPELINE (UPDATED: uses URL)
+# PIPELINE STAGES
 # ======================
-def run_prompt_pipeline(
+def _generate_checked_concept(
     *,
     keyword: str,
     banner_mode: str,
-    logo_bytes: bytes | None,
-    character_bytes: bytes | None,
     api_key: str,
-    post: str = "",
+    character_description: str,
     position: str = "",
     experience: str = "",
+    post: str = "",
     location: str = "",
-    # optional overrides from Flask:
-    logo_url: str = "",
-    character_url: str = "",
-):
-    # ✅ always end up with urls (uploaded if bytes exist, else default url)
-    final_logo_url = ensure_image_url(
-        logo_bytes,
-        default_url=(logo_url or DEFAULT_LOGO_URL),
-        filename="logo.jpg"
-    )
-    final_character_url = ensure_image_url(
-        character_bytes,
-        default_url=(character_url or DEFAULT_CHARACTER_URL),
-        filename="character.jpg"
-    )
-
-    # 1) Colors from logo URL
-    primary_hex, secondary_hex = get_brand_colors_with_ai_url(final_logo_url, api_key)
-
-    # 2) Character description from character URL
-    character_description = get_character_description_url(final_character_url, api_key)
-
-    # 3) Concept
-    # 3) Concept (with quality gate)
+    emit=lambda event, **data: None,
+    use_cache: bool = False,
+    cache_hits: list | None = None,
+    timings: StageTimings | None = None,
+) -> str:
+    """Generate a visual concept, retrying up to 3 times through the quality gate."""
+    timings = timings or StageTimings()
     concept = ""
     last_reason = ""
     for attempt in range(1, 4):  # up to 3 tries
-        concept_candidate = generate_visual_concept(
-            keyword=keyword,
-            services=COMPANY_CONTEXT["services_list"],
-            api_key=api_key,
-            character_description=character_description,
-            banner_mode=banner_mode,
-            position=position if banner_mode == "HIRING" else "",
-            experience=experience if banner_mode == "HIRING" else "",
-            post=post if banner_mode == "HIRING" else "",
-            location=location if banner_mode == "HIRING" else ""
-        )
-
-        ok, reason = validate_concept(concept_candidate)
+        emit("stage", stage="concept", status="attempt", attempt=attempt)
+        with timings.span("concept", attempt=attempt) as span:
+            concept_candidate = generate_visual_concept(
+                keyword=keyword,
+                services=COMPANY_CONTEXT["services_list"],
+                api_key=api_key,
+                character_description=character_description,
+                banner_mode=banner_mode,
+                position=position if banner_mode == "HIRING" else "",
+                experience=experience if banner_mode == "HIRING" else "",
+                post=post if banner_mode == "HIRING" else "",
+                location=location if banner_mode == "HIRING" else "",
+                use_cache=use_cache,
+                cache_hits=cache_hits
+            )
+
+            ok, reason = validate_concept(concept_candidate)
+            if not ok:
+                span["status"] = "rejected"
+                span["detail"] = reason
+        if not ok:
+            emit("stage", stage="concept", status="rejected", attempt=attempt, reason=reason)
         if ok:
             concept = concept_candidate
             break
@@ -649,7 +963,22 @@ def run_prompt_pipeline(
         concept = concept_candidate
         print(f"[WARN] Concept quality gate failed after 3 tries: {last_reason}")
 
-    # 4) Copy
+    return concept
+
+
+def _generate_copy(
+    *,
+    keyword: str,
+    banner_mode: str,
+    api_key: str,
+    position: str = "",
+    experience: str = "",
+    post: str = "",
+    location: str = "",
+    use_cache: bool = False,
+    cache_hits: list | None = None,
+) -> tuple[str, str, str]:
+    """Generate banner copy and parse it into (title, subtitle, address_line)."""
     title = ""
     subtitle = ""
     address_line = ""
@@ -663,7 +992,9 @@ def run_prompt_pipeline(
             position=position,
             experience=experience,
             location=location,
-            post=post
+            post=post,
+            use_cache=use_cache,
+            cache_hits=cache_hits
         )
 
         try:
@@ -676,7 +1007,10 @@ def run_prompt_pipeline(
             subtitle = (experience.strip() + " • Apply Now").strip(" •")
             address_line = location.strip() if location.strip() else "Mehsana, Gujarat"
     else:
-        copy_text = get_marketing_copy(keyword, COMPANY_CONTEXT["company_name"], api_key)
+        copy_text = get_marketing_copy(
+            keyword, COMPANY_CONTEXT["company_name"], api_key,
+            use_cache=use_cache, cache_hits=cache_hits
+        )
         try:
             lines = copy_text.split("\n")
             title = [l for l in lines if "HEADLINE:" in l][0].replace("HEADLINE:", "").strip()
@@ -685,25 +1019,203 @@ def run_prompt_pipeline(
         subtitle = ""
         address_line = ""
 
-    # 5) Final prompt
-    final_prompt = get_final_prompt(
-        banner_mode=banner_mode,
-        keyword=keyword,
-        title=title,
-        subtitle=subtitle,
-        address_line=address_line,
-        primary=primary_hex,
-        secondary=secondary_hex,
-        visual_concept=concept,
-        website=COMPANY_CONTEXT["contact_info"]["website"],
-        phone=COMPANY_CONTEXT["contact_info"]["footer_text"],
-        character_description=character_description,
-        api_key=api_key,
-        position=position if banner_mode == "HIRING" else "",
-        experience=experience if banner_mode == "HIRING" else "",
-        post=post if banner_mode == "HIRING" else "",
-        location=location if banner_mode == "HIRING" else ""
-    )
+    return title, subtitle, address_line
+
+
+# ======================
+# MAIN PIPELINE (UPDATED: uses URL)
+# ======================
+def _analyze_logo(logo_bytes, logo_url, api_key, cache_hits, timings):
+    # ✅ always end up with urls (uploaded if bytes exist, else default url)
+    with timings.span("logo_upload"):
+        url = ensure_image_url(
+            logo_bytes,
+            default_url=(logo_url or DEFAULT_LOGO_URL)
+        )
+    # 1) Colors from logo URL (cached by image content)
+    with timings.span("colors"):
+        image_key = image_cache_key(logo_bytes, logo_url or DEFAULT_LOGO_URL)
+        primary, secondary = get_brand_colors_cached(image_key, url, api_key, cache_hits=cache_hits)
+    return url, primary, secondary
+
+
+def _analyze_character(character_bytes, character_url, api_key, cache_hits, timings):
+    with timings.span("character_upload"):
+        url = ensure_image_url(
+            character_bytes,
+            default_url=(character_url or DEFAULT_CHARACTER_URL)
+        )
+    # 2) Character description from character URL (cached by image content)
+    with timings.span("character"):
+        image_key = image_cache_key(character_bytes, character_url or DEFAULT_CHARACTER_URL)
+        description = get_character_description_cached(image_key, url, api_key, cache_hits=cache_hits)
+    return url, description
+
+
+def analyze_brand_assets(
+    *,
+    logo_bytes: bytes | None,
+    character_bytes: bytes | None,
+    api_key: str,
+    logo_url: str = "",
+    character_url: str = "",
+):
+    """
+    Upload and analyse one logo / character pair (colors + description).
+
+    Pass the result to run_prompt_pipeline(analysis=...) for every post that
+    shares these assets (e.g. a batch) so the vision calls run once.
+    """
+    cache_hits = []
+    timings = StageTimings()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="asset-analysis") as pool:
+        logo_future = pool.submit(_analyze_logo, logo_bytes, logo_url, api_key, cache_hits, timings)
+        character_future = pool.submit(_analyze_character, character_bytes, character_url, api_key, cache_hits, timings)
+        final_logo_url, primary_hex, secondary_hex = logo_future.result()
+        final_character_url, character_description = character_future.result()
+    return {
+        "logo_url": final_logo_url,
+        "primary_hex": primary_hex,
+        "secondary_hex": secondary_hex,
+        "character_url": final_character_url,
+        "character_description": character_description,
+        "_cache_hits": cache_hits,
+        "_timings": timings.summary()
+    }
+
+
+def run_prompt_pipeline(
+    *,
+    keyword: str,
+    banner_mode: str,
+    logo_bytes: bytes | None,
+    character_bytes: bytes | None,
+    api_key: str,
+    post: str = "",
+    position: str = "",
+    experience: str = "",
+    location: str = "",
+    # optional overrides from Flask:
+    logo_url: str = "",
+    character_url: str = "",
+    concurrent: bool = PIPELINE_CONCURRENT,
+    on_event=None,
+    use_llm_cache: bool = LLM_CACHE_ENABLED,
+    analysis: dict | None = None,
+    timings: StageTimings | None = None,
+):
+    """
+    Build the final image prompt.
+
+    Stage graph (each arrow is a hard data dependency):
+        logo upload      -> colors        ─┐
+        character upload -> description -> concept -> final prompt
+        copy                               ─┘
+    With concurrent=True the three independent branches run on a small
+    thread pool and only the final prompt waits for all of them.
+
+    on_event(event, **data) is called (from pipeline threads) as work
+    progresses: "stage" events with stage/status and "token" events with
+    each chunk of the final prompt as it streams in.
+
+    With use_llm_cache=True the copy / concept / final prompt responses are
+    served from the LLM response cache when the rendered prompt was seen
+    before. Every cache hit (analysis or LLM) is listed in "_cache_hits".
+
+    "_timings" holds a StageTimings summary: total_ms and one span per stage
+    (logo_upload, colors, character_upload, character, each concept attempt,
+    copy, final_prompt) with wall time, model, tokens and cache hits.
+
+    analysis is a precomputed analyze_brand_assets() result; when given, the
+    upload / colors / character stages are skipped and its values are used.
+
+    Pass your own timings to keep the spans of a run that raises.
+    """
+    hiring = dict(position=position, experience=experience, post=post, location=location)
+    cache_hits = []
+    timings = timings or StageTimings()
+    llm_cache_args = dict(use_cache=use_llm_cache, cache_hits=cache_hits)
+
+    def emit(event, **data):
+        if on_event is not None:
+            on_event(event, **data)
+
+    def logo_branch():
+        if analysis is not None:
+            return analysis["logo_url"], analysis["primary_hex"], analysis["secondary_hex"]
+        emit("stage", stage="colors", status="started")
+        url, primary, secondary = _analyze_logo(logo_bytes, logo_url, api_key, cache_hits, timings)
+        emit("stage", stage="colors", status="done", primary_hex=primary, secondary_hex=secondary)
+        return url, primary, secondary
+
+    def character_branch():
+        if analysis is not None:
+            url, description = analysis["character_url"], analysis["character_description"]
+        else:
+            emit("stage", stage="character", status="started")
+            url, description = _analyze_character(character_bytes, character_url, api_key, cache_hits, timings)
+            emit("stage", stage="character", status="done")
+        # 3) Concept (with quality gate)
+        concept = _generate_checked_concept(
+            keyword=keyword,
+            banner_mode=banner_mode,
+            api_key=api_key,
+            character_description=description,
+            emit=emit,
+            timings=timings,
+            **llm_cache_args,
+            **hiring
+        )
+        emit("stage", stage="concept", status="done")
+        return url, description, concept
+
+    def copy_branch():
+        # 4) Copy (independent of colors / character)
+        emit("stage", stage="copy", status="started")
+        with timings.span("copy"):
+            title, subtitle, address_line = _generate_copy(
+                keyword=keyword, banner_mode=banner_mode, api_key=api_key, **llm_cache_args, **hiring
+            )
+        emit("stage", stage="copy", status="done", title=title, subtitle=subtitle)
+        return title, subtitle, address_line
+
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="prompt-pipeline") as pool:
+            logo_future = pool.submit(logo_branch)
+            character_future = pool.submit(character_branch)
+            copy_future = pool.submit(copy_branch)
+            final_logo_url, primary_hex, secondary_hex = logo_future.result()
+            final_character_url, character_description, concept = character_future.result()
+            title, subtitle, address_line = copy_future.result()
+    else:
+        final_logo_url, primary_hex, secondary_hex = logo_branch()
+        final_character_url, character_description, concept = character_branch()
+        title, subtitle, address_line = copy_branch()
+
+    # 5) Final prompt (streamed token by token when someone is listening)
+    emit("stage", stage="final_prompt", status="started")
+    with timings.span("final_prompt"):
+        final_prompt = get_final_prompt(
+            banner_mode=banner_mode,
+            keyword=keyword,
+            title=title,
+            subtitle=subtitle,
+            address_line=address_line,
+            primary=primary_hex,
+            secondary=secondary_hex,
+            visual_concept=concept,
+            website=COMPANY_CONTEXT["contact_info"]["website"],
+            phone=COMPANY_CONTEXT["contact_info"]["footer_text"],
+            character_description=character_description,
+            api_key=api_key,
+            position=position if banner_mode == "HIRING" else "",
+            experience=experience if banner_mode == "HIRING" else "",
+            post=post if banner_mode == "HIRING" else "",
+            location=location if banner_mode == "HIRING" else "",
+            on_token=(lambda text: emit("token", text=text)) if on_event is not None else None,
+            **llm_cache_args
+        )
+    emit("stage", stage="final_prompt", status="done")
 
     return {
         "primary_hex": primary_hex,
@@ -720,7 +1232,9 @@ def run_prompt_pipeline(
             "experience": experience,
             "location": location,
             "post": post
-        } if banner_mode == "HIRING" else {}
+        } if banner_mode == "HIRING" else {},
+        "_cache_hits": cache_hits,
+        "_timings": timings.summary()
     }
 
 
@@ -92,7 +92,7 @@ const fullViewModal = document.getElementById('fullViewModal');
 
 let selectedFile = null;
 let currentProject = null;
-let statusCheckInterval = null;
+let stopProjectWatch = null;
 let progressInterval = null;
 
 // Will be initialized in DOMContentLoaded
@@ -144,19 +144,57 @@ function resetCreateForm() {
 }
 
 // ==================== API FUNCTIONS ====================
-async function fetchProjects() {
+// Build a list query string (limit / cursor / status / fields), skipping empty values
+function buildListQuery(params = {}) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== '') query.set(key, value);
+    });
+    const qs = query.toString();
+    return qs ? `?${qs}` : '';
+}
+
+// ==================== CHANGE FEED ====================
+// One EventSource per tab, shared by everything that waits on a status change.
+// It is opened on the first subscription and closed when the last one goes away.
+let changeFeed = null;
+const changeListeners = new Set();
+
+function subscribeChanges(listener) {
+    changeListeners.add(listener);
+    
+    if (!changeFeed) {
+        changeFeed = new EventSource(`${API_BASE_URL}/changes`, { withCredentials: true });
+        changeFeed.addEventListener('change', event => {
+            const change = JSON.parse(event.data);
+            changeListeners.forEach(fn => fn(change));
+        });
+    }
+    
+    return () => {
+        changeListeners.delete(listener);
+        if (changeListeners.size === 0 && changeFeed) {
+            changeFeed.close();
+            changeFeed = null;
+        }
+    };
+}
+
+// Returns one page: { items, next_cursor }
+async function fetchProjects(params = {}) {
     try {
-        console.log('Fetching projects from:', `${API_BASE_URL}/projects`);
-        const response = await fetch(`${API_BASE_URL}/projects`);
+        const url = `${API_BASE_URL}/projects${buildListQuery(params)}`;
+        console.log('Fetching projects from:', url);
+        const response = await fetch(url);
         console.log('Response status:', response.status);
         if (!response.ok) throw new Error('Failed to fetch projects');
         const data = await response.json();
-        console.log('Projects loaded:', data.length);
+        console.log('Projects loaded:', data.items.length);
         return data;
     } catch (error) {
         console.error('Error fetching projects:', error);
         showNotification('Failed to load projects: ' + error.message, 'error');
-        return [];
+        return { items: [], next_cursor: null };
     }
 }
 
@@ -213,7 +251,7 @@ async function loadDashboard() {
     });
     document.getElementById('lastCreated').textContent = lastUpdated;
 
-    const projects = await fetchProjects();
+    const { items: projects } = await fetchProjects({ limit: 4 });
     console.log('Projects for dashboard:', projects);
     console.log('Projects length:', projects.length);
     const recentProjectsContainer = document.getElementById('recentProjects');
@@ -237,16 +275,30 @@ async function loadDashboard() {
 }
 
 // ==================== PROJECTS LIST ====================
+const PROJECTS_PER_PAGE = 10;
+// Cursors of the pages visited so far (index 0 = first page)
+let projectPageCursors = [null];
+let projectPageIndex = 0;
+
 async function loadProjectsList() {
     console.log('📁 Loading Projects List...');
-    const projects = await fetchProjects();
+    projectPageCursors = [null];
+    projectPageIndex = 0;
+    await renderProjectsPage();
+}
+
+async function renderProjectsPage() {
+    const { items: projects, next_cursor: nextCursor } = await fetchProjects({
+        limit: PROJECTS_PER_PAGE,
+        cursor: projectPageCursors[projectPageIndex]
+    });
     console.log('Projects for list:', projects);
     console.log('Projects count:', projects.length);
     
     const projectsGrid = document.getElementById('projectsList');
     console.log('projectsList element:', projectsGrid);
 
-    if (projects.length === 0) {
+    if (projects.length === 0 && projectPageIndex === 0) {
         console.log('No projects, showing empty state');
         projectsGrid.innerHTML = `
             <div style="grid-column: 1 / -1; text-align: center; padding: 80px 20px; color: var(--color-grey);">
@@ -261,76 +313,51 @@ async function loadProjectsList() {
         return;
     }
 
-    console.log('Rendering all projects...');
+    console.log('Rendering projects page', projectPageIndex + 1);
     
-    // Pagination settings
-    const projectsPerPage = 10;
-    let currentPage = 1;
-    const totalPages = Math.ceil(projects.length / projectsPerPage);
+    // Remember where the next page starts
+    projectPageCursors[projectPageIndex + 1] = nextCursor;
+    const page = projectPageIndex + 1;
+    const hasPrev = projectPageIndex > 0;
+    const hasNext = !!nextCursor;
     
-    function renderProjects(page) {
-        const startIndex = (page - 1) * projectsPerPage;
-        const endIndex = startIndex + projectsPerPage;
-        const projectsToShow = projects.slice(startIndex, endIndex);
-        
-        let html = projectsToShow.map(project => createProjectCard(project, false)).join('');
-        
-        // Add pagination controls if more than 1 page
-        if (totalPages > 1) {
-            html += `
-                <div style="grid-column: 1 / -1; display: flex; justify-content: center; align-items: center; gap: 12px; margin-top: 40px; padding: 20px;">
-                    <button onclick="loadProjectsPage(${page - 1})" 
-                        ${page === 1 ? 'disabled' : ''}
-                        style="padding: 10px 16px; background: ${page === 1 ? 'rgba(128, 128, 128, 0.3)' : 'rgba(255, 215, 0, 0.1)'}; color: ${page === 1 ? 'var(--color-grey)' : 'var(--color-primary)'}; border: 2px solid ${page === 1 ? 'var(--color-grey-dark)' : 'var(--color-primary)'}; border-radius: 8px; font-weight: 700; cursor: ${page === 1 ? 'not-allowed' : 'pointer'}; transition: all 0.3s;">
-                        ← Previous
-                    </button>
-                    <div style="display: flex; gap: 8px;">
-            `;
-            
-            // Page numbers
-            for (let i = 1; i <= totalPages; i++) {
-                if (i === 1 || i === totalPages || (i >= page - 1 && i <= page + 1)) {
-                    html += `
-                        <button onclick="loadProjectsPage(${i})"
-                            style="width: 40px; height: 40px; background: ${i === page ? 'linear-gradient(135deg, var(--color-primary), var(--color-primary-dark))' : 'rgba(255, 215, 0, 0.1)'}; color: ${i === page ? 'var(--color-black)' : 'var(--color-primary)'}; border: 2px solid var(--color-primary); border-radius: 8px; font-weight: 700; cursor: pointer; transition: all 0.3s; font-size: 14px;">
-                            ${i}
-                        </button>
-                    `;
-                } else if (i === page - 2 || i === page + 2) {
-                    html += '<span style="color: var(--color-grey); padding: 0 8px;">...</span>';
-                }
-            }
-            
-            html += `
-                    </div>
-                    <button onclick="loadProjectsPage(${page + 1})"
-                        ${page === totalPages ? 'disabled' : ''}
-                        style="padding: 10px 16px; background: ${page === totalPages ? 'rgba(128, 128, 128, 0.3)' : 'rgba(255, 215, 0, 0.1)'}; color: ${page === totalPages ? 'var(--color-grey)' : 'var(--color-primary)'}; border: 2px solid ${page === totalPages ? 'var(--color-grey-dark)' : 'var(--color-primary)'}; border-radius: 8px; font-weight: 700; cursor: ${page === totalPages ? 'not-allowed' : 'pointer'}; transition: all 0.3s;">
-                        Next →
-                    </button>
-                    <div style="margin-left: 20px; color: var(--color-grey); font-size: 14px;">
-                        Page ${page} of ${totalPages} (${projects.length} total projects)
-                    </div>
+    let html = projects.map(project => createProjectCard(project, false)).join('');
+    
+    // Add pagination controls if more than 1 page
+    if (hasPrev || hasNext) {
+        html += `
+            <div style="grid-column: 1 / -1; display: flex; justify-content: center; align-items: center; gap: 12px; margin-top: 40px; padding: 20px;">
+                <button onclick="loadProjectsPage(${projectPageIndex - 1})" 
+                    ${!hasPrev ? 'disabled' : ''}
+                    style="padding: 10px 16px; background: ${!hasPrev ? 'rgba(128, 128, 128, 0.3)' : 'rgba(255, 215, 0, 0.1)'}; color: ${!hasPrev ? 'var(--color-grey)' : 'var(--color-primary)'}; border: 2px solid ${!hasPrev ? 'var(--color-grey-dark)' : 'var(--color-primary)'}; border-radius: 8px; font-weight: 700; cursor: ${!hasPrev ? 'not-allowed' : 'pointer'}; transition: all 0.3s;">
+                    ← Previous
+                </button>
+                <div style="color: var(--color-grey); font-size: 14px; padding: 0 8px;">
+                    Page ${page}
                 </div>
-            `;
-        }
-        
-        projectsGrid.innerHTML = html;
+                <button onclick="loadProjectsPage(${projectPageIndex + 1})"
+                    ${!hasNext ? 'disabled' : ''}
+                    style="padding: 10px 16px; background: ${!hasNext ? 'rgba(128, 128, 128, 0.3)' : 'rgba(255, 215, 0, 0.1)'}; color: ${!hasNext ? 'var(--color-grey)' : 'var(--color-primary)'}; border: 2px solid ${!hasNext ? 'var(--color-grey-dark)' : 'var(--color-primary)'}; border-radius: 8px; font-weight: 700; cursor: ${!hasNext ? 'not-allowed' : 'pointer'}; transition: all 0.3s;">
+                    Next →
+                </button>
+            </div>
+        `;
     }
     
-    // Store for global access
-    window.loadProjectsPage = function(page) {
-        if (page < 1 || page > totalPages) return;
-        currentPage = page;
-        renderProjects(currentPage);
-        // Scroll to top of projects list
-        projectsGrid.scrollIntoView({ behavior: 'smooth', block: 'start' });
-    };
-    
-    renderProjects(currentPage);
+    projectsGrid.innerHTML = html;
     console.log('Projects list loaded successfully with pagination');
 }
 
+// Store for global access
+window.loadProjectsPage = async function(index) {
+    if (index < 0 || index >= projectPageCursors.length) return;
+    if (index > 0 && !projectPageCursors[index]) return;
+    projectPageIndex = index;
+    await renderProjectsPage();
+    // Scroll to top of projects list
+    document.getElementById('projectsList').scrollIntoView({ behavior: 'smooth', block: 'start' });
+};
+
 function createProjectCard(project, isRecent) {
     if (!project || !project.id) {
         console.error('Invalid project data:', project);
@@ -701,14 +728,15 @@ function showProjectLoading(project) {
 }
 
 async function checkProjectStatus(projectId) {
-    if (statusCheckInterval) clearInterval(statusCheckInterval);
+    if (stopProjectWatch) stopProjectWatch();
 
-    statusCheckInterval = setInterval(async () => {
+    const handleProject = async () => {
         const project = await fetchProject(projectId);
+        if (!project) return;
         
         if (project.status === 'completed') {
-            clearInterval(statusCheckInterval);
-            statusCheckInterval = null;
+            if (stopProjectWatch) stopProjectWatch();
+            stopProjectWatch = null;
             completeProgress();
             
             showNotification('🎉 Video generation completed successfully!', 'success');
@@ -719,8 +747,8 @@ async function checkProjectStatus(projectId) {
                 loadProjectsList();
             }, 2000);
         } else if (project.status === 'failed') {
-            clearInterval(statusCheckInterval);
-            statusCheckInterval = null;
+            if (stopProjectWatch) stopProjectWatch();
+            stopProjectWatch = null;
             clearInterval(progressInterval);
             progressInterval = null;
             showForm();
@@ -728,7 +756,14 @@ async function checkProjectStatus(projectId) {
             loadDashboard();
             loadProjectsList();
         }
-    }, 3000);
+    };
+    
+    // Re-check only when the server pushes a status change for this project
+    stopProjectWatch = subscribeChanges(change => {
+        if (change.entity === 'project' && change.entity_id === projectId) handleProject();
+    });
+    // It may have finished before we subscribed
+    handleProject();
 }
 
 // ==================== FILE UPLOAD ====================
@@ -1124,8 +1159,8 @@ document.addEventListener('DOMContentLoaded', async () => {
     await loadDashboard();
     
     // Check for active/processing projects on page load
-    const projects = await fetchProjects();
-    const activeProject = projects.find(p => p.status === 'processing' || p.status === 'pending');
+    const { items: activeProjects } = await fetchProjects({ status: 'processing,pending', limit: 1 });
+    const activeProject = activeProjects[0];
     
     if (activeProject) {
         // If there's an active project, show it
@@ -1306,6 +1341,26 @@ function toggleHiringFields() {
     }
 }
 
+// Short-poll interval for background tasks; each check returns at once so no server thread waits on it
+const TASK_POLL_INTERVAL_MS = 2000;
+
+// Follow a background task from /api/tasks/<id> until it finishes; resolves with its result
+async function waitForTask(taskId) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/tasks/${taskId}?wait=0`, {
+            credentials: 'include'
+        });
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.error || 'Failed to check task status');
+        }
+        const task = await response.json();
+        if (task.status === 'done') return task.result;
+        if (task.status === 'failed') throw new Error(task.error || 'Task failed');
+        await new Promise(resolve => setTimeout(resolve, TASK_POLL_INTERVAL_MS));
+    }
+}
+
 // Generate banner image using Flux2 Pro
 async function generateInstaImage() {
     const generateImageBtn = document.getElementById('generateImageBtn');
@@ -1356,7 +1411,9 @@ async function generateInstaImage() {
             throw new Error(errorData.error || 'Failed to generate image');
         }
         
-        const result = await response.json();
+        // The server queues the generation and hands back a task to follow
+        const { task_id } = await response.json();
+        const result = await waitForTask(task_id);
         
         if (result.image_urls && Array.isArray(result.image_urls)) {
             // Display generated images
@@ -1473,7 +1530,9 @@ async function generateImageForViewingPost() {
             throw new Error(errorData.error || 'Failed to generate image');
         }
         
-        const result = await response.json();
+        // The server queues the generation and hands back a task to follow
+        const { task_id } = await response.json();
+        const result = await waitForTask(task_id);
         
         if (result.image_urls && Array.isArray(result.image_urls)) {
             // Save images to database
@@ -1760,19 +1819,9 @@ function initializeInstaPost() {
             try {
                 showNotification('Starting Instagram post generation...', 'info');
                 
-                // Call backend API
-                const response = await fetch(`${API_BASE_URL}/generate-insta-post`, {
-                    method: 'POST',
-                    body: formData,
-                    credentials: 'include'
-                });
-                
-                if (!response.ok) {
-                    const errorData = await response.json();
-                    throw new Error(errorData.error || 'Failed to generate post');
-                }
-                
-                const result = await response.json();
+                // Call backend API; stage events and prompt tokens stream in while it works
+                resetInstaProgress();
+                const result = await streamInstaPost(formData, updateInstaProgress);
                 
                 // Hide loading overlay
                 loadingOverlay.style.display = 'none';
@@ -1807,22 +1856,124 @@ function initializeInstaPost() {
     }
 }
 
+// ==================== INSTAGRAM POST PROGRESS (SSE) ====================
+const INSTA_STAGE_LABELS = {
+    queued: 'Starting pipeline...',
+    colors: 'Reading brand colors from logo...',
+    character: 'Describing character...',
+    concept: 'Designing visual concept...',
+    copy: 'Writing banner copy...',
+    final_prompt: 'Writing final prompt...'
+};
+
+// POST the form to the streaming endpoint and feed each Server-Sent Event to onEvent.
+// Resolves with the saved post (the 'done' event) or rejects on 'error'.
+async function streamInstaPost(formData, onEvent) {
+    const response = await fetch(`${API_BASE_URL}/generate-insta-post/stream`, {
+        method: 'POST',
+        body: formData,
+        credentials: 'include'
+    });
+    
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || 'Failed to generate post');
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (!data) continue;  // keep-alive comment
+            
+            const payload = JSON.parse(data);
+            if (event === 'done') return payload;
+            if (event === 'error') throw new Error(payload.error || 'Failed to generate post');
+            onEvent(event, payload);
+        }
+    }
+    throw new Error('Connection closed before the post was generated');
+}
+
+function resetInstaProgress() {
+    const label = document.getElementById('instaProgressLabel');
+    const detail = document.getElementById('instaProgressDetail');
+    const promptStream = document.getElementById('instaPromptStream');
+    if (label) label.textContent = 'Generating Prompt...';
+    if (detail) detail.textContent = 'Please wait while AI creates your content';
+    if (promptStream) {
+        promptStream.textContent = '';
+        promptStream.style.display = 'none';
+    }
+}
+
+function updateInstaProgress(event, data) {
+    const label = document.getElementById('instaProgressLabel');
+    const detail = document.getElementById('instaProgressDetail');
+    const promptStream = document.getElementById('instaPromptStream');
+    
+    if (event === 'token') {
+        if (promptStream) {
+            promptStream.style.display = 'block';
+            promptStream.textContent += data.text;
+            promptStream.scrollTop = promptStream.scrollHeight;
+        }
+        return;
+    }
+    
+    if (event !== 'stage') return;
+    
+    if (data.status === 'started' || data.status === 'attempt') {
+        if (label) label.textContent = INSTA_STAGE_LABELS[data.stage] || 'Working...';
+        if (detail) {
+            detail.textContent = data.status === 'attempt' && data.attempt > 1
+                ? `Concept attempt ${data.attempt} of 3`
+                : 'Please wait while AI creates your content';
+        }
+    } else if (data.status === 'done' && detail) {
+        if (data.stage === 'colors') detail.textContent = `Brand colors: ${data.primary_hex} / ${data.secondary_hex}`;
+        else if (data.stage === 'copy' && data.title) detail.textContent = `Headline: ${data.title}`;
+    } else if (data.status === 'rejected' && detail) {
+        detail.textContent = `Concept attempt ${data.attempt} rejected, retrying...`;
+    }
+}
+
 function displayInstaResults(data) {
     // This function is no longer used - posts are shown in the list
     // Keeping for backward compatibility
     console.log('Post generated:', data);
 }
 
-// Poll for post completion and display results
-async function pollForPostCompletion(postId, maxAttempts = 45, interval = 2000) {
-    let attempts = 0;
-    let pollInterval = null;
-    let promptGenerated = false;
-    
+// Wait for post completion (pushed by the change feed) and display results
+async function pollForPostCompletion(postId, timeoutMs = 120000) {
     return new Promise((resolve, reject) => {
-        pollInterval = setInterval(async () => {
-            attempts++;
-            
+        let finished = false;
+        let stopWatch = null;
+        
+        const finish = () => {
+            finished = true;
+            clearTimeout(safetyTimer);
+            if (stopWatch) stopWatch();
+        };
+        
+        const checkPost = async () => {
+            if (finished) return;
             try {
                 const response = await fetch(`${API_BASE_URL}/insta-posts/${postId}`, {
                     credentials: 'include'
@@ -1833,27 +1984,23 @@ async function pollForPostCompletion(postId, maxAttempts = 45, interval = 2000)
                 }
                 
                 const post = await response.json();
+                if (finished) return;
                 
-                // Stop polling once prompt is generated (status = pending_image)
+                // Stop watching once prompt is generated (status = pending_image)
                 if (post.status === 'pending_image') {
-                    if (!promptGenerated) {
-                        promptGenerated = true;
-                        clearInterval(pollInterval);
-                        
-                        // Reload posts list to show the new post with prompt
-                        setTimeout(() => {
-                            loadInstaPostsList();
-                        }, 500);
-                        
-                        showNotification('Prompt generated! Click on the post to generate the image.', 'success');
-                        resolve(post);
-                    }
-                    return;
-                }
-                
-                // If completed (including image), stop polling
-                if (post.status === 'completed') {
-                    clearInterval(pollInterval);
+                    finish();
+                    
+                    // Reload posts list to show the new post with prompt
+                    setTimeout(() => {
+                        loadInstaPostsList();
+                    }, 500);
+                    
+                    showNotification('Prompt generated! Click on the post to generate the image.', 'success');
+                    resolve(post);
+                    
+                } else if (post.status === 'completed') {
+                    // If completed (including image), stop watching
+                    finish();
                     
                     // Store post data for image generation
                     currentInstaPost = post;
@@ -1868,30 +2015,29 @@ async function pollForPostCompletion(postId, maxAttempts = 45, interval = 2000)
                     resolve(post);
                     
                 } else if (post.status === 'failed' || post.status === 'error') {
-                    clearInterval(pollInterval);
+                    finish();
                     showNotification(`Post generation failed: ${post.error || 'Unknown error'}`, 'error');
                     reject(new Error(`Post generation failed: ${post.error || 'Unknown error'}`));
-                    
-                } else if (attempts >= maxAttempts) {
-                    clearInterval(pollInterval);
-                    console.error(`Polling stopped after ${maxAttempts} attempts`);
-                    showNotification('Polling stopped. Post generation taking longer than expected.', 'warning');
-                    resolve(post);
                 }
                 
             } catch (error) {
-                clearInterval(pollInterval);
-                console.error('Error polling post status:', error);
+                finish();
+                console.error('Error checking post status:', error);
             }
-        }, interval);
+        };
         
         // Safety timeout after 2 minutes
-        setTimeout(() => {
-            if (pollInterval) {
-                clearInterval(pollInterval);
-                console.error('Polling safety timeout after 2 minutes');
-            }
-        }, maxAttempts * interval + 5000);
+        const safetyTimer = setTimeout(() => {
+            if (finished) return;
+            finish();
+            console.error('Post status watch timed out after 2 minutes');
+            showNotification('Stopped waiting. Post generation taking longer than expected.', 'warning');
+        }, timeoutMs);
+        
+        stopWatch = subscribeChanges(change => {
+            if (change.entity === 'insta_post' && change.entity_id === postId) checkPost();
+        });
+        checkPost();
     });
 }
 
@@ -1938,34 +2084,45 @@ function displayGeneratedPost(post) {
     }
 }
 
-// ==================== INSTAGRAM POST POLLING ====================
+// ==================== INSTAGRAM POST STATUS WATCH ====================
 
-let instaPostPollingInterval = null;
+let stopInstaPostChanges = null;
+let instaPostsCheckTimer = null;
 let instaPostsSignature = '';
 
 function startInstaPostPolling() {
-    // Clear any existing interval
+    // Drop any existing subscription
     stopInstaPostPolling();
     
     // Check immediately
     checkInstaPostsStatus();
     
-    // Then check every 3 seconds
-    instaPostPollingInterval = setInterval(checkInstaPostsStatus, 3000);
+    // Then re-check only when the server pushes an Instagram post change (bursts are coalesced)
+    stopInstaPostChanges = subscribeChanges(change => {
+        if (change.entity !== 'insta_post') return;
+        clearTimeout(instaPostsCheckTimer);
+        instaPostsCheckTimer = setTimeout(checkInstaPostsStatus, 300);
+    });
 }
 
 function stopInstaPostPolling() {
-    if (instaPostPollingInterval) {
-        clearInterval(instaPostPollingInterval);
-        instaPostPollingInterval = null;
+    clearTimeout(instaPostsCheckTimer);
+    if (stopInstaPostChanges) {
+        stopInstaPostChanges();
+        stopInstaPostChanges = null;
     }
 }
 
+function instaPostsSignatureOf(posts) {
+    return posts.map(p => `${p.id}:${p.status}:${p.updated_at || ''}`).join('|');
+}
+
 async function checkInstaPostsStatus() {
     try {
-        const posts = await fetchInstaPosts();
+        // Cover every page the user has loaded, not just the first one
+        const { items: posts } = await fetchInstaPostsFromTop(instaPostsShownCount(), 'id,status,updated_at');
         const processingPosts = posts.filter(p => p.status === 'processing');
-        const signature = posts.map(p => `${p.id}:${p.status}:${p.updated_at || ''}`).join('|');
+        const signature = instaPostsSignatureOf(posts);
         const signatureChanged = signature !== instaPostsSignature;
         
         if (signatureChanged) {
@@ -1977,10 +2134,10 @@ async function checkInstaPostsStatus() {
             stopInstaPostPolling();
         }
         
-        // Reload the list only when something changed
+        // Refresh the list only when something changed, keeping the pages already loaded
         const instaPostView = document.getElementById('instaPostView');
         if (instaPostView && instaPostView.classList.contains('active') && signatureChanged) {
-            loadInstaPostsList();
+            refreshInstaPostsList();
         }
         
         // Update dashboard stats only when changes occur or processing finished
@@ -2036,9 +2193,10 @@ function resetInstaForm() {
 
 // ==================== INSTAGRAM POSTS LIST & VIEW ====================
 
-async function fetchInstaPosts() {
+// Returns one page: { items, next_cursor }
+async function fetchInstaPosts(params = {}) {
     try {
-        const response = await fetch(`${API_BASE_URL}/insta-posts`, {
+        const response = await fetch(`${API_BASE_URL}/insta-posts${buildListQuery(params)}`, {
             credentials: 'include'
         });
         if (!response.ok) throw new Error('Failed to fetch posts');
@@ -2046,7 +2204,7 @@ async function fetchInstaPosts() {
     } catch (error) {
         console.error('Error fetching Instagram posts:', error);
         showNotification('Failed to load Instagram posts', 'error');
-        return [];
+        return { items: [], next_cursor: null };
     }
 }
 
@@ -2079,12 +2237,65 @@ async function deleteInstaPostAPI(id) {
     }
 }
 
-async function loadInstaPostsList() {
+const INSTA_POSTS_PER_PAGE = 24;
+// Largest page the list endpoint returns (LIST_MAX_LIMIT on the server)
+const INSTA_POSTS_MAX_FETCH = 100;
+let instaPostsNextCursor = null;
+
+// Posts currently in the grid (at least one page), i.e. the first page plus every "Load more"
+function instaPostsShownCount() {
+    const postsGrid = document.getElementById('instaPostsList');
+    const loaded = (postsGrid && postsGrid._loadedPosts) || [];
+    return Math.max(loaded.length, INSTA_POSTS_PER_PAGE);
+}
+
+// Newest `count` posts, fetched in as few pages as the server allows; next_cursor continues after them
+async function fetchInstaPostsFromTop(count, fields) {
+    let items = [];
+    let cursor = null;
+    do {
+        const page = await fetchInstaPosts({
+            limit: Math.min(count - items.length, INSTA_POSTS_MAX_FETCH),
+            cursor,
+            fields
+        });
+        items = items.concat(page.items);
+        cursor = page.next_cursor;
+    } while (cursor && items.length < count);
+    return { items, next_cursor: cursor };
+}
+
+async function loadInstaPostsList(append = false) {
     console.log('📸 Loading Instagram Posts List...');
-    const posts = await fetchInstaPosts();
-    console.log('Posts:', posts);
+    const { items: pagePosts, next_cursor: nextCursor } = await fetchInstaPosts({
+        limit: INSTA_POSTS_PER_PAGE,
+        cursor: append ? instaPostsNextCursor : null
+    });
+    console.log('Posts:', pagePosts);
     
     const postsGrid = document.getElementById('instaPostsList');
+    const loadedPosts = append ? (postsGrid._loadedPosts || []) : [];
+    instaPostsNextCursor = nextCursor;
+    renderInstaPostsList(loadedPosts.concat(pagePosts));
+    
+    // Check if there are processing posts and start polling
+    const processingPosts = postsGrid._loadedPosts.filter(p => p.status === 'processing');
+    if (processingPosts.length > 0 && !stopInstaPostChanges) {
+        startInstaPostPolling();
+    }
+}
+
+// Reload every page already shown after a status change, so "Load more" pages and the cursor survive
+async function refreshInstaPostsList() {
+    const { items: posts, next_cursor: nextCursor } = await fetchInstaPostsFromTop(instaPostsShownCount());
+    instaPostsNextCursor = nextCursor;
+    renderInstaPostsList(posts);
+}
+
+function renderInstaPostsList(posts) {
+    const postsGrid = document.getElementById('instaPostsList');
+    postsGrid._loadedPosts = posts;
+    instaPostsSignature = instaPostsSignatureOf(posts);
     
     if (posts.length === 0) {
         postsGrid.innerHTML = `
@@ -2101,6 +2312,16 @@ async function loadInstaPostsList() {
     }
     
     postsGrid.innerHTML = posts.map(post => createInstaPostCard(post)).join('');
+    
+    if (instaPostsNextCursor) {
+        postsGrid.innerHTML += `
+            <div style="grid-column: 1 / -1; display: flex; justify-content: center; margin-top: 24px;">
+                <button onclick="loadInstaPostsList(true)" style="padding: 10px 24px; background: rgba(255, 215, 0, 0.1); color: var(--color-primary); border: 2px solid var(--color-primary); border-radius: 8px; font-weight: 700; cursor: pointer; transition: all 0.3s;">
+                    Load more
+                </button>
+            </div>
+        `;
+    }
 
     // Bind click handlers to completed cards only
     const instaCards = postsGrid.querySelectorAll('.insta-post-card');
@@ -2114,12 +2335,6 @@ async function loadInstaPostsList() {
             }
         });
     });
-    
-    // Check if there are processing posts and start polling
-    const processingPosts = posts.filter(p => p.status === 'processing');
-    if (processingPosts.length > 0) {
-        startInstaPostPolling();
-    }
 }
 
 function createInstaPostCard(post) {
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import threading
+
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+from dotenv import load_dotenv
+
+from cache_store import cache
+
+load_dotenv()
+
+cloudinary.config(
+    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+    api_key=os.getenv("CLOUDINARY_API_KEY"),
+    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+    # API host; overridable so uploads can go to a local fake_upstream server
+    upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX", "https://api.cloudinary.com"),
+    secure=True
+)
+
+# Locks striped by content hash so concurrent requests in this worker upload a file once;
+# a fixed array keeps memory flat, at the cost of the odd unrelated upload waiting its turn
+_HASH_LOCK_STRIPES = 64
+_hash_locks = [threading.Lock() for _ in range(_HASH_LOCK_STRIPES)]
+# content hash -> public URL for files that are already hosted (the default images)
+_existing_assets = {}
+
+
+def content_hash(file_bytes: bytes) -> str:
+    """Hex sha256 of the bytes, used as the asset name everywhere."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def register_existing_asset(digest: str, url: str) -> None:
+    """Make cloudinary_upload_bytes return url for these bytes instead of uploading a copy."""
+    _existing_assets[digest] = url
+
+
+def _lock_for(digest: str) -> threading.Lock:
+    return _hash_locks[int(digest[:8], 16) % _HASH_LOCK_STRIPES]
+
+
+def cloudinary_upload_bytes(file_bytes: bytes, folder="kie-inputs") -> str:
+    """
+    Upload image bytes to Cloudinary and return public HTTPS URL.
+
+    Assets are named by content hash, so the same bytes always map to the same
+    public_id and different users never overwrite each other. The hash -> URL
+    mapping is remembered in the shared cache DB; on a miss we ask Cloudinary
+    whether the asset already exists before sending the bytes.
+    """
+    digest = content_hash(file_bytes)
+    if digest in _existing_assets:
+        return _existing_assets[digest]
+
+    if not (os.getenv("CLOUDINARY_CLOUD_NAME") and os.getenv("CLOUDINARY_API_KEY") and os.getenv("CLOUDINARY_API_SECRET")):
+        raise RuntimeError("Cloudinary credentials missing (CLOUDINARY_CLOUD_NAME / KEY / SECRET).")
+
+    public_id = f"{folder}/{digest}"
+
+    with _lock_for(digest):
+        url = cache.get("cloudinary_asset", public_id)
+        if url:
+            return url
+
+        try:
+            url = cloudinary.api.resource(public_id, resource_type="image")["secure_url"]
+            print(f"[Upload] Reusing existing Cloudinary asset {public_id}")
+        except cloudinary.exceptions.NotFound:
+            url = None
+        except Exception as e:
+            # Admin API is rate limited; fall through to a non-overwriting upload
+            print(f"[Upload] Existence check failed for {public_id}: {e}")
+            url = None
+
+        if not url:
+            result = cloudinary.uploader.upload(
+                file_bytes,
+                folder=folder,
+                public_id=digest,
+                overwrite=False,
+                resource_type="image"
+            )
+            url = result["secure_url"]
+            print(f"[Upload] Uploaded {len(file_bytes)} bytes as {public_id}")
+
+        cache.set("cloudinary_asset", public_id, url)
+        return url
@@ -0,0 +1,40 @@
+"""
+Standalone background worker.
+
+    JOB_WORKERS_IN_WEB=0 gunicorn app:app      # web workers only enqueue
+    python worker.py                          # this process drains the jobs table
+
+Jobs are leased from the shared SQLite jobs table, so several worker
+processes (or a crashed-and-restarted one) can safely share the queue.
+"""
+import os
+import signal
+import threading
+
+# Importing app registers the job handlers and runs migrations; don't let it start its own workers
+os.environ['JOB_WORKERS_IN_WEB'] = '0'
+# Share the metrics directory of gunicorn.conf.py so /metrics includes this process
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.abspath('.prometheus_multiproc'))
+
+import app  # noqa: E402
+import metrics  # noqa: E402
+from jobs import executor  # noqa: E402
+
+
+def main():
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    executor.start()
+    app.start_video_callback_watchdog()
+    print('🛠️  IV Studio worker running - Ctrl+C to stop')
+    stop.wait()
+
+    print('Draining background jobs...')
+    executor.shutdown()
+    metrics.mark_process_dead()
+
+
+if __name__ == '__main__':
+    main()